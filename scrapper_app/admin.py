@@ -1,3 +1,35 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Company, CompanySnapshot, DividendChange, DividendEvent, YearlyDividend
+
+
+@admin.register(Company)
+class CompanyAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'details_fetched_at', 'yearly_fetched_at', 'monthly_fetched_at')
+    search_fields = ('ticker',)
+
+
+@admin.register(CompanySnapshot)
+class CompanySnapshotAdmin(admin.ModelAdmin):
+    list_display = ('company', 'fetched_at')
+    list_filter = ('company',)
+
+
+@admin.register(DividendEvent)
+class DividendEventAdmin(admin.ModelAdmin):
+    list_display = ('company', 'ex_date', 'payment_date', 'dividend_type', 'value', 'shares_ratio')
+    list_filter = ('dividend_type',)
+    search_fields = ('company__ticker',)
+
+
+@admin.register(YearlyDividend)
+class YearlyDividendAdmin(admin.ModelAdmin):
+    list_display = ('company', 'year', 'value')
+    search_fields = ('company__ticker',)
+
+
+@admin.register(DividendChange)
+class DividendChangeAdmin(admin.ModelAdmin):
+    list_display = ('seq', 'company', 'kind', 'ex_date', 'dividend_type', 'value', 'recorded_at')
+    list_filter = ('kind',)
+    search_fields = ('company__ticker',)
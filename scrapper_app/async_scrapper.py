@@ -0,0 +1,217 @@
+import asyncio
+import random
+import weakref
+from abc import ABC, abstractmethod
+
+import httpx
+
+from .cache import MISSING, build_recorder
+from .extraction import DETAILS_STRAINER, PROVENTOS_STRAINER
+from .errors import RateLimitedError, ScrapingError, TickerNotFoundError, UpstreamUnavailableError
+from .records import DividendEvent, YearlyDividend
+from .scrapper import FundamentusScraper
+from .throttle import get_upstream_guard
+from .transport import get_transport_config
+
+# --- Cliente HTTP assíncrono compartilhado ---
+# Um AsyncClient só pode ser usado no event loop em que foi criado, então mantemos
+# um cliente (e seu pool de conexões) por loop. Sob WSGI, cada async_to_sync roda em
+# um loop novo (asyncio.run), então o cliente é fechado junto com o loop que o criou.
+
+_clients = weakref.WeakKeyDictionary()
+
+
+async def _close_with_loop(client: httpx.AsyncClient):
+    """
+    Gerador assíncrono registrado no loop: ao terminar, asyncio.run finaliza os geradores
+    pendentes (loop.shutdown_asyncgens) e o finally fecha o cliente e suas conexões.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def _bind_to_loop(client: httpx.AsyncClient):
+    closer = _close_with_loop(client)
+    # Avança o gerador até o yield (sem await no caminho), o que o registra no loop atual.
+    try:
+        closer.asend(None).send(None)
+    except StopIteration:
+        pass
+    return closer
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Retorna o AsyncClient compartilhado do event loop atual, criando-o se necessário.
+    """
+    loop = asyncio.get_running_loop()
+    client, _ = _clients.get(loop, (None, None))
+    if client is None or client.is_closed:
+        config = get_transport_config()
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config['POOL_MAXSIZE'],
+                max_keepalive_connections=config['POOL_MAXSIZE'],
+            ),
+            timeout=httpx.Timeout(config['READ_TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+            follow_redirects=True,
+        )
+        # O loop só guarda referências fracas aos geradores; o par mantém o gerador vivo.
+        _clients[loop] = (client, _bind_to_loop(client))
+    return client
+
+
+async def close_async_client():
+    _, closer = _clients.pop(asyncio.get_running_loop(), (None, None))
+    if closer is not None:
+        await closer.aclose()
+
+
+# --- Interface Genérica Assíncrona ---
+class AsyncGenericWebScraper(ABC):
+    """
+    Contraparte assíncrona de GenericWebScraper. O download não bloqueia o event loop e
+    o parsing (CPU) é feito em uma thread, mantendo a mesma hierarquia de erros.
+    """
+    def __init__(self, base_url: str, headers: dict = None):
+        self.base_url = base_url
+        self.headers = headers if headers is not None else {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/555.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/555.36'
+        }
+        self.guard = get_upstream_guard(base_url)
+        self.recorder = build_recorder()
+
+    async def _fetch_content(self, path: str) -> bytes:
+        """
+        Faz a requisição HTTP com retries (backoff exponencial com jitter) para 5xx e timeouts.
+        Cada tentativa passa pelo mesmo guarda de host do scraper síncrono; a espera por
+        vaga roda em uma thread para não bloquear o event loop.
+        Levanta ScrapingError em caso de erro na requisição.
+        """
+        config = get_transport_config()
+        url = f"{self.base_url}{path}"
+        if self.recorder is not None and self.recorder.replaying:
+            return self.recorder.replay(url).content
+        attempt = 0
+        while True:
+            ticket = await self._acquire()
+            try:
+                response = await get_async_client().get(url, headers=self.headers)
+            except httpx.RequestError as e:
+                self.guard.release(ticket, failed=True)
+                error = e
+            except BaseException:
+                # Cancelamento ou erro inesperado: a vaga sempre volta para o guarda.
+                self.guard.cancel(ticket)
+                raise
+            else:
+                self.guard.release(ticket, status=response.status_code)
+                if response.status_code not in config['RETRY_STATUSES']:
+                    try:
+                        response.raise_for_status()
+                    except httpx.HTTPStatusError as e:
+                        raise ScrapingError(f"Erro ao acessar a URL {url}: {e}") from e
+                    if self.recorder is not None:
+                        self.recorder.record(url, response.content, response.headers)
+                    return response.content
+                error = httpx.HTTPStatusError(
+                    f"Status {response.status_code}", request=response.request, response=response
+                )
+            if attempt >= config['MAX_RETRIES']:
+                raise ScrapingError(f"Erro ao acessar a URL {url}: {error}") from error
+            delay = min(config['BACKOFF_FACTOR'] * (2 ** attempt), config['BACKOFF_MAX'])
+            await asyncio.sleep(delay + random.uniform(0, config['BACKOFF_JITTER']))
+            attempt += 1
+
+    async def _acquire(self) -> float:
+        """
+        Espera a vaga do guarda em uma thread. Se a tarefa for cancelada durante a
+        espera, a thread continua; a vaga que ela obtiver é devolvida ao terminar.
+        """
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.guard.acquire))
+        try:
+            return await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(self._cancel_abandoned)
+            raise
+
+    def _cancel_abandoned(self, acquiring: asyncio.Future):
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self.guard.cancel(acquiring.result())
+
+    @abstractmethod
+    async def get_company_details(self, ticker: str) -> dict:
+        pass
+
+    @abstractmethod
+    async def get_yearly_dividends(self, ticker: str) -> list[YearlyDividend]:
+        pass
+
+    @abstractmethod
+    async def get_monthly_dividends(self, ticker: str) -> list[DividendEvent]:
+        pass
+
+
+# --- Implementação Assíncrona do FundamentusScraper ---
+class AsyncFundamentusScraper(AsyncGenericWebScraper):
+    """
+    Versão assíncrona do FundamentusScraper. Reaproveita as rotinas de extração e o cache
+    de proventos do scraper síncrono passado em `scraper`.
+    """
+    def __init__(self, scraper: FundamentusScraper = None):
+        self.scraper = scraper if scraper is not None else FundamentusScraper()
+        super().__init__(base_url=self.scraper.base_url, headers=self.scraper.headers)
+
+    async def get_company_details(self, ticker: str) -> dict:
+        cached = self.scraper.cache.get((FundamentusScraper.DETAILS_KEY, ticker.upper()))
+        if cached is not MISSING:
+            return dict(cached)
+        details = await self.scraper.flight.do_async(
+            ('detalhes.php', ticker.upper()), lambda: self._load_details(ticker)
+        )
+        return dict(details)
+
+    async def _load_details(self, ticker: str) -> dict:
+        path = f"detalhes.php?papel={ticker.upper()}"
+        try:
+            content = await self._fetch_content(path)
+        except (UpstreamUnavailableError, RateLimitedError):
+            raise
+        except ScrapingError as e:
+            raise TickerNotFoundError(f"Não foi possível acessar a página para o ticker '{ticker}'.") from e
+        details = await asyncio.to_thread(self._parse_company_details, content, ticker)
+        self.scraper.cache.set((FundamentusScraper.DETAILS_KEY, ticker.upper()), details)
+        return details
+
+    async def get_yearly_dividends(self, ticker: str) -> list[YearlyDividend]:
+        return await self._get_proventos(ticker, FundamentusScraper.YEARLY_KEY)
+
+    async def get_monthly_dividends(self, ticker: str) -> list[DividendEvent]:
+        return await self._get_proventos(ticker, FundamentusScraper.MONTHLY_KEY)
+
+    async def _get_proventos(self, ticker: str, want: str) -> list:
+        cached = self.scraper.cache.get((want, ticker.upper()))
+        if cached is not MISSING:
+            return list(cached)
+        tables = await self.scraper.flight.do_async(
+            ('proventos.php', ticker.upper()), lambda: self._load_proventos_tables(ticker)
+        )
+        return list(self.scraper.pick_table(tables, want))
+
+    async def _load_proventos_tables(self, ticker: str) -> dict:
+        path = f"proventos.php?papel={ticker.upper()}"
+        try:
+            content = await self._fetch_content(path)
+        except (UpstreamUnavailableError, RateLimitedError):
+            raise
+        except ScrapingError as e:
+            raise TickerNotFoundError(f"Não foi possível acessar a página de proventos para o ticker '{ticker}'.") from e
+        return await asyncio.to_thread(self._extract_proventos, content, ticker)
+
+    def _parse_company_details(self, content: bytes, ticker: str) -> dict:
+        return self.scraper._parse_company_details(self.scraper._parse_html(content, DETAILS_STRAINER), ticker)
+
+    def _extract_proventos(self, content: bytes, ticker: str) -> dict:
+        return self.scraper._extract_proventos(self.scraper._parse_html(content, PROVENTOS_STRAINER), ticker)
@@ -0,0 +1,127 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection
+
+from .errors import (
+    ColumnNotFoundError, RateLimitedError, ScrapingError, TableNotFoundError, TickerNotFoundError,
+    UpstreamUnavailableError,
+)
+
+# --- Execução Concorrente de Lotes de Tickers ---
+
+DEFAULT_BATCH = {
+    'MAX_WORKERS': 8,
+    'MAX_TICKERS': 300,
+    'DEADLINE': 30.0,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_config() -> dict:
+    config = dict(DEFAULT_BATCH)
+    config.update(getattr(settings, 'SCRAPER_BATCH', {}))
+    return config
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Pool de threads compartilhado pelo processo; limita a concorrência total de upstream
+    mesmo com vários lotes simultâneos.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_batch_config()['MAX_WORKERS'],
+                    thread_name_prefix='scraper-batch',
+                )
+    return _executor
+
+
+def error_entry(exc: Exception) -> dict:
+    """
+    Converte uma exceção no mesmo par mensagem/status usado pelas views individuais.
+    """
+    if isinstance(exc, (TickerNotFoundError, TableNotFoundError)):
+        return {"error": str(exc), "status": 404}
+    if isinstance(exc, ColumnNotFoundError):
+        return {"error": str(exc), "status": 400}
+    if isinstance(exc, (UpstreamUnavailableError, RateLimitedError)):
+        return {"error": str(exc), "status": 503}
+    if isinstance(exc, ScrapingError):
+        return {"error": f"Erro inesperado no scraping: {exc}", "status": 500}
+    return {"error": f"Ocorreu um erro interno: {exc}", "status": 500}
+
+
+def _run_one(func, *args):
+    try:
+        return func(*args)
+    finally:
+        # Cada thread do pool abre sua própria conexão; não a deixamos pendurada.
+        connection.close()
+
+
+def submit(func, *args):
+    """
+    Agenda `func(*args)` no pool compartilhado, fechando a conexão do banco ao final.
+    A tarefa roda com uma cópia do contexto atual, para que as etapas medidas nela
+    entrem no Server-Timing da requisição que a agendou.
+    """
+    return get_executor().submit(contextvars.copy_context().run, _run_one, func, *args)
+
+
+def normalize_tickers(tickers) -> list[str]:
+    """
+    Valida a lista recebida e remove duplicatas, preservando a ordem.
+    Levanta ValueError se a entrada for inválida.
+    """
+    if not isinstance(tickers, list) or not tickers:
+        raise ValueError("'tickers' deve ser uma lista não vazia de strings.")
+    max_tickers = get_batch_config()['MAX_TICKERS']
+    normalized = []
+    for ticker in tickers:
+        if not isinstance(ticker, str) or not ticker.strip():
+            raise ValueError(f"Ticker inválido: {ticker!r}")
+        ticker = ticker.strip().upper()
+        if ticker not in normalized:
+            normalized.append(ticker)
+    if len(normalized) > max_tickers:
+        raise ValueError(f"No máximo {max_tickers} tickers por lote.")
+    return normalized
+
+
+def run_batch(func, tickers: list[str], deadline: float = None) -> list[dict]:
+    """
+    Executa `func(ticker)` para cada ticker no pool compartilhado e retorna uma entrada
+    por ticker, na ordem recebida: {"ticker", "data"} em caso de sucesso ou
+    {"ticker", "error", "status"} em caso de falha. Tickers que não terminarem até o
+    prazo do lote recebem status 504.
+    """
+    deadline = deadline if deadline is not None else get_batch_config()['DEADLINE']
+    futures = {submit(func, ticker): ticker for ticker in tickers}
+    results = {}
+    pending = set(futures)
+    expires_at = time.monotonic() + deadline
+    while pending:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            ticker = futures[future]
+            try:
+                results[ticker] = {"ticker": ticker, "data": future.result()}
+            except Exception as e:
+                results[ticker] = {"ticker": ticker, **error_entry(e)}
+    for future in pending:
+        future.cancel()
+        ticker = futures[future]
+        results[ticker] = {"ticker": ticker, "error": f"Tempo limite do lote ({deadline}s) excedido.", "status": 504}
+    return [results[ticker] for ticker in tickers]
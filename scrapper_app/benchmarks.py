@@ -0,0 +1,243 @@
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import requests
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from . import scrapper, views
+from .cache import TTLCache
+from .calculator import DividendCalculator, DividendSeries
+from .normalization import normalize_details
+from .records import DividendEvent, YearlyDividend
+from .scrapper import FundamentusScraper
+from .throttle import NULL_GUARD
+
+# --- Benchmarks Offline sobre Páginas Gravadas ---
+# Mede o parsing, o cálculo e o caminho completo das views sem acessar o Fundamentus:
+# a camada HTTP é substituída por uma Session falsa que serve as páginas de testdata/.
+
+TESTDATA_DIR = Path(__file__).resolve().parent / 'testdata'
+BASELINE_PATH = TESTDATA_DIR / 'benchmark_baseline.json'
+
+# Histórico de proventos curto, típico e muito longo.
+CORPUS = {
+    'small': ('MGLU3', 'proventos_MGLU3.html'),
+    'typical': ('PETR4', 'proventos_PETR4.html'),
+    'long': ('TAEE11', 'proventos_TAEE11.html'),
+}
+DETAILS_PAGE = 'detalhes_PETR4.html'
+CALCULATOR_SIZES = (10, 100, 1000, 10000)
+
+
+class BenchmarkError(Exception):
+    """
+    Um caso de benchmark não se comportou como esperado (ex: a view respondeu com erro).
+    """
+
+
+class FixtureSession:
+    """
+    Substituto da requests.Session que responde com as páginas gravadas.
+    """
+    def __init__(self, proventos_page: str):
+        self.pages = {
+            'detalhes.php': (TESTDATA_DIR / DETAILS_PAGE).read_bytes(),
+            'proventos.php': (TESTDATA_DIR / proventos_page).read_bytes(),
+        }
+
+    def get(self, url, headers=None, timeout=None):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.pages[url.rsplit('/', 1)[-1].split('?')[0]]
+        response.url = url
+        return response
+
+
+class ScraperOnlyService:
+    """
+    Expõe a interface de leitura do StockDataService sem tocar no banco.
+    """
+    def __init__(self, scraper: FundamentusScraper):
+        self.scraper = scraper
+
+    def get_company_details(self, ticker, raw: bool = False):
+        details = self.scraper.get_company_details(ticker)
+        return details if raw else normalize_details(details)
+
+    def get_yearly_dividends(self, ticker):
+        return self.scraper.get_yearly_dividends(ticker)
+
+    def get_monthly_dividends(self, ticker):
+        return self.scraper.get_monthly_dividends(ticker)
+
+    # Sem cache de séries: o benchmark mede o caminho completo de cada requisição.
+    def get_yearly_series(self, ticker):
+        return DividendSeries.from_yearly(self.get_yearly_dividends(ticker))
+
+    def get_monthly_series(self, ticker):
+        return DividendSeries.from_monthly(self.get_monthly_dividends(ticker))
+
+    def fetched_at(self, ticker, kind):
+        return None
+
+
+def uncached_scraper() -> FundamentusScraper:
+    """
+    Scraper sem cache de páginas nem de validadores, para que cada chamada parseie de novo.
+    """
+    scraper = FundamentusScraper(cache=TTLCache(maxsize=0))
+    scraper.validators = TTLCache(maxsize=0)
+    # O limite de taxa do site real não faz sentido sobre as páginas gravadas.
+    scraper.guard = NULL_GUARD
+    return scraper
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Executa `func` `repeat` vezes e retorna o menor tempo (segundos por operação), a
+    vazão e o pico de memória alocada (tracemalloc) de uma execução adicional.
+    Como no timeit, o coletor de lixo fica desligado e o mínimo é usado por ser a
+    medida menos sensível a ruído da máquina.
+    """
+    func()  # aquecimento
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = min(timings)
+    return {"seconds": best, "ops_per_second": 1 / best if best else None, "peak_bytes": peak}
+
+
+def bench_parsing(repeat: int) -> dict:
+    results = {}
+    for size, (ticker, page) in CORPUS.items():
+        scraper = uncached_scraper()
+        with mock.patch.object(scrapper, 'get_session', return_value=FixtureSession(page)):
+            for method in ('get_company_details', 'get_yearly_dividends', 'get_monthly_dividends'):
+                results[f"parse.{method}.{size}"] = measure(lambda: getattr(scraper, method)(ticker), repeat)
+    return results
+
+
+def synthetic_monthly(size: int, today: date) -> list[DividendEvent]:
+    return [
+        DividendEvent(today - timedelta(days=7 * i), 0.1 + (i % 7) * 0.01, "DIVIDENDO", None, 1)
+        for i in range(size)
+    ]
+
+
+def bench_calculator(repeat: int) -> dict:
+    calculator = DividendCalculator()
+    results = {}
+    for size in CALCULATOR_SIZES:
+        monthly = synthetic_monthly(size, date.today())
+        yearly = [YearlyDividend(2026 - i, 1.0 + i % 3) for i in range(size)]
+        cases = {
+            "calculate_accumulated_monthly": lambda: calculator.calculate_accumulated_monthly(monthly, 60),
+            "calculate_accumulated_yearly": lambda: calculator.calculate_accumulated_yearly(yearly, 5),
+            "calculate_accumulated_monthly_many": lambda: calculator.calculate_accumulated_monthly_many(monthly, [12, 24, 60]),
+            "calculate_rolling_ttm": lambda: calculator.calculate_rolling_ttm(monthly),
+        }
+        for name, func in cases.items():
+            results[f"calculator.{name}.{size}"] = measure(func, repeat)
+    return results
+
+
+def bench_views(repeat: int) -> dict:
+    results = {}
+    client = Client()
+    setup_test_environment()
+    try:
+        for size, (ticker, page) in CORPUS.items():
+            service = ScraperOnlyService(uncached_scraper())
+            with mock.patch.object(scrapper, 'get_session', return_value=FixtureSession(page)), \
+                    mock.patch.object(views, 'service', service):
+                for name, url in (
+                    ('details', f'/api/details/{ticker}/'),
+                    ('monthly_dividends', f'/api/monthly_dividends/{ticker}/'),
+                    ('accumulated_monthly_dividends', f'/api/accumulated_monthly_dividends/{ticker}/60/'),
+                ):
+                    # Uma view com erro responderia bem mais rápido e pareceria uma melhora.
+                    status = client.get(url).status_code
+                    if status != 200:
+                        raise BenchmarkError(f"view.{name}.{size}: GET {url} respondeu {status}, esperado 200.")
+                    results[f"view.{name}.{size}"] = measure(lambda: client.get(url), repeat)
+    finally:
+        teardown_test_environment()
+    return results
+
+
+def calibration_workload():
+    """
+    Carga de referência em Python puro, usada para normalizar os tempos entre
+    máquinas e entre variações de clock da mesma máquina.
+    """
+    rows = [{"Data": f"2026-01-{i % 28 + 1:02d}", "Valor": i * 0.01} for i in range(2000)]
+    json.loads(json.dumps(rows))
+    sorted(rows, key=lambda row: (row["Data"], -row["Valor"]))
+
+
+def run_benchmarks(repeat: int = 20) -> dict:
+    calibration = measure(calibration_workload, repeat)["seconds"]
+    results = {**bench_parsing(repeat), **bench_calculator(repeat), **bench_views(repeat)}
+    # Mede de novo ao final e fica com o menor valor, cobrindo variações durante a execução.
+    calibration = min(calibration, measure(calibration_workload, repeat)["seconds"])
+    for result in results.values():
+        result["relative"] = result["seconds"] / calibration
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+            "calibration_seconds": calibration,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Lista as regressões: benchmarks cujo tempo (normalizado pela carga de calibração)
+    ou pico de memória excedeu o da linha de base em mais de `tolerance`
+    (fração, ex: 0.5 = 50%).
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        for metric in ("relative", "peak_bytes"):
+            if base[metric] and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.6g} > {base[metric]:.6g} (+{result[metric] / base[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def load_results(path) -> dict:
+    with open(path, encoding='utf-8') as results_file:
+        return json.load(results_file)
+
+
+def save_results(results: dict, path):
+    with open(path, 'w', encoding='utf-8') as results_file:
+        json.dump(results, results_file, indent=2, sort_keys=True)
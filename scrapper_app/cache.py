@@ -0,0 +1,448 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+from .errors import ScrapingError
+
+# --- Cache LRU+TTL para páginas já extraídas ---
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache em memória, limitado por tamanho (LRU) e com tempo de vida (TTL) por entrada.
+    As chaves são tuplas (página, ticker) e os valores são as linhas já extraídas,
+    nunca o HTML bruto. É seguro para uso entre threads.
+    """
+    def __init__(self, maxsize: int = 512, ttl: float = 900.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        """
+        Retorna o valor da chave, ou `default` se ela não existir ou tiver expirado.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Armazena o valor, removendo as entradas menos usadas se o limite for excedido.
+        `ttl` substitui o tempo de vida padrão só para esta entrada.
+        """
+        with self._lock:
+            self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_ticker(self, ticker: str) -> int:
+        """
+        Remove todas as entradas de um ticker. Retorna quantas foram removidas.
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            keys = [key for key in self._data if key[1] == ticker]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        Retorna os contadores de acertos, falhas, remoções e o tamanho atual.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+# --- Segundo Nível: Cache Persistente em Disco ---
+# Um arquivo SQLite compartilhado por todos os processos da máquina guarda os mesmos
+# resultados do cache em memória (pickle comprimido com zlib), sobrevive a deploys e
+# reinícios e é limitado em bytes: ao passar de `max_bytes`, as entradas acessadas há
+# mais tempo são removidas. Entradas fixadas (`pinned`, ex: páginas gravadas para o
+# modo replay) não expiram nem são removidas pelo limite.
+
+class DiskCache:
+    """
+    Cache chave/valor em SQLite, separado por `namespace` (ex: o host de origem).
+    As chaves são tuplas (página, ticker), como no TTLCache.
+    """
+    # Verificação do tamanho total a cada N gravações, para não somar a tabela sempre.
+    EVICTION_CHECK_INTERVAL = 32
+    # Ao exceder o limite, remove até sobrar esta fração de `max_bytes`.
+    EVICTION_TARGET = 0.9
+    # Leituras só atualizam o instante de acesso se ele for mais antigo que isto (segundos).
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(self, path: str, namespace: str = '', max_bytes: int = 256 * 1024 * 1024, clock=time.time):
+        self.path = path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, ticker TEXT NOT NULL, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL, accessed_at REAL NOT NULL, pinned INTEGER NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (pinned, accessed_at)")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _encode_key(key) -> tuple[str, str]:
+        parts = list(key) if isinstance(key, tuple) else [key]
+        ticker = str(parts[1]).upper() if len(parts) > 1 else ''
+        return json.dumps(parts, ensure_ascii=False), ticker
+
+    def get(self, key, default=MISSING):
+        entry = self.get_entry(key)
+        return default if entry is MISSING else entry[0]
+
+    def get_entry(self, key):
+        """
+        Retorna (valor, segundos restantes ou None se não expira), ou MISSING.
+        """
+        encoded, _ = self._encode_key(key)
+        now = self._clock()
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, encoded),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            if row is not None:
+                connection.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, encoded)
+                )
+            with self._lock:
+                self.misses += 1
+            return MISSING
+        if now - row[2] > self.TOUCH_INTERVAL:
+            connection.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, encoded),
+            )
+        value = self._load(encoded, row[0])
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+        return value, None if row[1] is None else row[1] - now
+
+    def _load(self, encoded: str, blob: bytes):
+        """
+        Desserializa uma entrada. Se ela foi gravada por outra versão do código (ex: uma
+        classe de records.py renomeada) e não puder ser lida, é removida e vira MISSING.
+        """
+        try:
+            return pickle.loads(zlib.decompress(blob))
+        except Exception:
+            # pickle pode levantar praticamente qualquer exceção (AttributeError,
+            # ImportError, UnpicklingError, erros do __setstate__...).
+            self._connection().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, encoded)
+            )
+            return MISSING
+
+    def set(self, key, value, ttl: float = None, pinned: bool = False):
+        """
+        Grava o valor; sem `ttl` (ou com `pinned`), a entrada não expira.
+        """
+        encoded, ticker = self._encode_key(key)
+        blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        now = self._clock()
+        expires_at = None if ttl is None or pinned else now + ttl
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries "
+            "(namespace, key, ticker, value, size, expires_at, accessed_at, pinned) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.namespace, encoded, ticker, blob, len(blob), expires_at, now, int(pinned)),
+        )
+        with self._lock:
+            self._writes += 1
+            check = self._writes % self.EVICTION_CHECK_INTERVAL == 1
+        if check:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove as entradas não fixadas acessadas há mais tempo (de todos os namespaces)
+        até o total caber em EVICTION_TARGET x max_bytes. Retorna quantas foram removidas.
+        """
+        connection = self._connection()
+        connection.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (self._clock(),))
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        excess = total - self.max_bytes * self.EVICTION_TARGET
+        rows = connection.execute(
+            "SELECT namespace, key, size FROM cache_entries WHERE pinned = 0 ORDER BY accessed_at"
+        ).fetchall()
+        victims = []
+        for namespace, key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((namespace, key))
+            excess -= size
+        connection.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+        removed = len(victims)
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def recent(self, limit: int) -> list[tuple]:
+        """
+        As `limit` entradas não fixadas e válidas acessadas mais recentemente, como
+        (chave, valor, segundos restantes ou None). Entradas ilegíveis são descartadas.
+        """
+        now = self._clock()
+        rows = self._connection().execute(
+            "SELECT key, value, expires_at FROM cache_entries "
+            "WHERE namespace = ? AND pinned = 0 AND (expires_at IS NULL OR expires_at > ?) "
+            "ORDER BY accessed_at DESC LIMIT ?",
+            (self.namespace, now, limit),
+        ).fetchall()
+        entries = []
+        for key, blob, expires_at in rows:
+            value = self._load(key, blob)
+            if value is not MISSING:
+                entries.append((tuple(json.loads(key)), value, None if expires_at is None else expires_at - now))
+        return entries
+
+    def invalidate_ticker(self, ticker: str) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND ticker = ? AND pinned = 0",
+            (self.namespace, ticker.upper()),
+        )
+        return cursor.rowcount
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ? AND pinned = 0", (self.namespace,))
+
+    def stats(self) -> dict:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        return {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "entries": entries, "bytes": size, "max_bytes": self.max_bytes,
+        }
+
+
+class TieredCache:
+    """
+    Cache em dois níveis com a interface do TTLCache: o LRU em memória do processo na
+    frente e o DiskCache compartilhado atrás. Acertos no disco são promovidos para a
+    memória; gravações vão para os dois níveis.
+    """
+    def __init__(self, memory: TTLCache, disk: DiskCache):
+        self.memory = memory
+        self.disk = disk
+        self.ttl = memory.ttl
+        self.maxsize = memory.maxsize
+
+    def get(self, key, default=MISSING):
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+        entry = self.disk.get_entry(key)
+        if entry is MISSING:
+            return default
+        value, remaining = entry
+        # Promovida só pelo tempo que ainda resta no disco, como em warm().
+        self.memory.set(key, value, remaining if remaining is None else min(remaining, self.memory.ttl))
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        self.memory.set(key, value, ttl)
+        self.disk.set(key, value, ttl=self.ttl if ttl is None else ttl)
+
+    def warm(self, limit: int) -> int:
+        """
+        Pré-carrega na memória as `limit` entradas do disco usadas mais recentemente.
+        """
+        entries = self.disk.recent(min(limit, self.memory.maxsize))
+        # Da menos para a mais recente, para que a ordem LRU em memória fique igual à do disco.
+        for key, value, remaining in reversed(entries):
+            self.memory.set(key, value, remaining)
+        return len(entries)
+
+    def invalidate_ticker(self, ticker: str) -> int:
+        return max(self.memory.invalidate_ticker(ticker), self.disk.invalidate_ticker(ticker))
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self) -> dict:
+        """
+        Acertos e falhas consideram os dois níveis: só é falha o que não estava em nenhum.
+        """
+        memory, disk = self.memory.stats(), self.disk.stats()
+        return dict(memory, hits=memory["hits"] + disk["hits"], misses=disk["misses"], disk=disk)
+
+    def __len__(self):
+        return len(self.memory)
+
+
+def get_disk_cache_config() -> dict:
+    config = getattr(settings, 'SCRAPER_CACHE', {})
+    return {
+        'PATH': config.get('DISK_PATH', ''),
+        'MAX_BYTES': config.get('DISK_MAX_BYTES', 256 * 1024 * 1024),
+        'WARM_ENTRIES': config.get('WARM_ENTRIES', 256),
+        'MODE': config.get('MODE', 'live'),
+    }
+
+
+# Versão do formato dos valores guardados no cache de páginas (linhas extraídas e
+# registros de records.py). Incremente ao mudar esse formato: entradas gravadas pela
+# versão anterior ficam em outro namespace e saem do disco pelo limite de tamanho.
+PAGE_CACHE_VERSION = 1
+
+
+def cache_namespace(base_url: str) -> str:
+    return f"{urlsplit(base_url).netloc or base_url}/v{PAGE_CACHE_VERSION}"
+
+
+def build_page_cache(base_url: str = '') -> TTLCache | TieredCache:
+    """
+    Cria o cache de páginas a partir de settings.SCRAPER_CACHE. Com DISK_PATH, o cache
+    ganha o segundo nível em disco (separado pelo host de `base_url` e pela versão do
+    formato, PAGE_CACHE_VERSION) e é pré-carregado
+    com as WARM_ENTRIES entradas mais recentes.
+    """
+    config = getattr(settings, 'SCRAPER_CACHE', {})
+    memory = TTLCache(maxsize=config.get('MAXSIZE', 512), ttl=config.get('TTL', 900))
+    disk_config = get_disk_cache_config()
+    if not disk_config['PATH']:
+        return memory
+    disk = DiskCache(disk_config['PATH'], cache_namespace(base_url), disk_config['MAX_BYTES'])
+    cache = TieredCache(memory, disk)
+    cache.warm(disk_config['WARM_ENTRIES'])
+    return cache
+
+
+def build_validator_cache() -> TTLCache:
+    """
+    Cria o cache de validadores HTTP (ETag, Last-Modified e hash) das páginas baixadas,
+    junto com o resultado já extraído de cada uma (nunca o HTML nem a árvore parseada).
+    Ele vive mais que o cache de páginas, pois serve apenas para revalidar o conteúdo.
+    """
+    config = getattr(settings, 'SCRAPER_CACHE', {})
+    return TTLCache(maxsize=config.get('MAXSIZE', 512), ttl=config.get('VALIDATORS_TTL', 24 * 60 * 60))
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+# --- Gravação e Reprodução de Páginas (record/replay) ---
+
+RECORDED_PAGES = 'recorded-pages'
+
+
+class PageRecorder:
+    """
+    No modo 'record', guarda cada resposta 200 do site de origem no DiskCache (entradas
+    fixadas, sem expiração); no modo 'replay', responde a partir delas sem acessar a
+    rede, para rodar a aplicação offline sobre páginas capturadas.
+    """
+    def __init__(self, disk: DiskCache, mode: str):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Modo de gravação inválido: '{mode}'.")
+        self.disk = disk
+        self.mode = mode
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def record(self, url: str, content: bytes, headers):
+        if self.mode == 'record':
+            kept = {name: headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified') if name in headers}
+            self.disk.set(('page', url), {"content": content, "headers": kept}, pinned=True)
+
+    def replay(self, url: str) -> requests.Response:
+        """
+        Resposta gravada para `url`. Levanta ScrapingError se a página não foi capturada.
+        """
+        entry = self.disk.get(('page', url))
+        if entry is MISSING:
+            raise ScrapingError(f"Página não gravada para o modo replay: {url}")
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = entry["content"]
+        response.headers.update(entry["headers"])
+        return response
+
+
+def build_recorder() -> PageRecorder | None:
+    """
+    PageRecorder para settings.SCRAPER_CACHE['MODE'] ('record' ou 'replay'), ou None no
+    modo padrão 'live'. As páginas ficam no mesmo arquivo do cache em disco.
+    """
+    config = get_disk_cache_config()
+    if config['MODE'] == 'live':
+        return None
+    if not config['PATH']:
+        raise ValueError("SCRAPER_CACHE['MODE'] 'record'/'replay' exige SCRAPER_CACHE['DISK_PATH'].")
+    return PageRecorder(DiskCache(config['PATH'], RECORDED_PAGES, config['MAX_BYTES']), config['MODE'])
@@ -1,72 +1,193 @@
 from .errors import DataParsingError
-from datetime import datetime
+from .metrics import timed
+from .records import DividendEvent, YearlyDividend
+from datetime import date, datetime
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 import calendar
 
+
+def months_ago(today: date, num_months: int) -> date:
+    """
+    Retorna o mesmo dia de `today`, `num_months` meses antes. Se o dia não existir
+    no mês de destino (ex: 31 de fevereiro), usa o último dia desse mês.
+    """
+    year = today.year - (num_months // 12)
+    month = today.month - (num_months % 12)
+    if month <= 0:
+        year -= 1
+        month += 12
+    last_day_of_month = calendar.monthrange(year, month)[1]
+    return date(year, month, min(today.day, last_day_of_month))
+
+
+# --- Série de Dividendos Indexada ---
+class DividendSeries:
+    """
+    Série de proventos ordenada por uma chave inteira (ordinal da data-com ou ano),
+    com somas de prefixo. Qualquer soma em uma janela [início, fim] custa duas buscas
+    binárias, então muitas janelas podem ser respondidas a partir da mesma série.
+    """
+    __slots__ = ('keys', 'values', 'prefix')
+
+    def __init__(self, pairs):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.values = [value for _, value in pairs]
+        self.prefix = [0.0, *accumulate(self.values)]
+
+    @classmethod
+    def from_monthly(cls, monthly_data: list[DividendEvent]) -> 'DividendSeries':
+        """
+        Constrói a série a partir de get_monthly_dividends (chave: ordinal da data-com).
+        """
+        if not isinstance(monthly_data, list):
+            raise TypeError("monthly_data deve ser uma lista de DividendEvent.")
+        try:
+            pairs = [(event.ex_date.toordinal(), event.value) for event in monthly_data]
+        except AttributeError as e:
+            raise DataParsingError(f"Formato de dados mensal inválido (data-com ausente?): {e}")
+        return cls(pairs)
+
+    @classmethod
+    def from_yearly(cls, yearly_data: list[YearlyDividend]) -> 'DividendSeries':
+        """
+        Constrói a série a partir de get_yearly_dividends (chave: ano).
+        """
+        if not isinstance(yearly_data, list):
+            raise TypeError("yearly_data deve ser uma lista de YearlyDividend.")
+        try:
+            pairs = [(entry.year, entry.value) for entry in yearly_data]
+        except AttributeError as e:
+            raise DataParsingError(f"Formato de dados anual inválido: {e}")
+        return cls(pairs)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def window_sum(self, start: int, end: int) -> float:
+        """
+        Soma dos valores com chave em [start, end], em O(log n).
+        """
+        if start > end:
+            return 0.0
+        lo = bisect_left(self.keys, start)
+        hi = bisect_right(self.keys, end)
+        return self.prefix[hi] - self.prefix[lo] if hi > lo else 0.0
+
+    def window_sums(self, windows) -> list[float]:
+        return [self.window_sum(start, end) for start, end in windows]
+
+    # --- Janelas por data (séries mensais) ---
+
+    def trailing_months(self, num_months: int, today: date = None) -> float:
+        """
+        Soma dos proventos com data-com entre hoje menos `num_months` meses e hoje.
+        """
+        today = today or datetime.now().date()
+        return self.window_sum(months_ago(today, num_months).toordinal(), today.toordinal())
+
+    def trailing_months_many(self, months_list, today: date = None) -> dict[int, float]:
+        today = today or datetime.now().date()
+        return {num_months: self.trailing_months(num_months, today) for num_months in months_list}
+
+    def rolling_ttm(self, today: date = None) -> list[dict]:
+        """
+        Série completa dos proventos nos últimos 12 meses, calculada ao fim de cada mês
+        desde o primeiro provento até o mês corrente.
+        """
+        if not self.keys:
+            return []
+        today = today or datetime.now().date()
+        first = date.fromordinal(self.keys[0])
+        year, month = first.year, first.month
+        series = []
+        while (year, month) <= (today.year, today.month):
+            month_end = date(year, month, calendar.monthrange(year, month)[1])
+            start_year, start_month = (year, month - 11) if month > 11 else (year - 1, month + 1)
+            start = date(start_year, start_month, 1)
+            series.append({
+                "Mes": f"{year:04d}-{month:02d}",
+                "Valor": self.window_sum(start.toordinal(), month_end.toordinal()),
+            })
+            year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+        return series
+
+    # --- Janelas por ano (séries anuais) ---
+
+    def trailing_years(self, num_years: int, current_year: int = None) -> float:
+        """
+        Soma dos proventos anuais entre o ano corrente menos `num_years` e o ano corrente.
+        """
+        current_year = current_year or datetime.now().year
+        return self.window_sum(current_year - num_years, current_year)
+
+    def trailing_years_many(self, years_list, current_year: int = None) -> dict[int, float]:
+        current_year = current_year or datetime.now().year
+        return {num_years: self.trailing_years(num_years, current_year) for num_years in years_list}
+
+
+SERIES_BUILDERS = {
+    'yearly': DividendSeries.from_yearly,
+    'monthly': DividendSeries.from_monthly,
+}
+
+
+def as_series(data, kind: str) -> DividendSeries:
+    """
+    Retorna `data` se já for uma DividendSeries (ex: a guardada por ticker no
+    StockDataService); senão, indexa a lista de registros de `kind` ('yearly' ou 'monthly').
+    """
+    return data if isinstance(data, DividendSeries) else SERIES_BUILDERS[kind](data)
+
+
 # --- Novo Serviço de Cálculos de Dividendos ---
 class DividendCalculator:
     """
     Classe responsável por calcular somas de dividendos a partir de dados brutos.
+    Os cálculos são delegados a uma DividendSeries indexada; passando uma série já
+    construída no lugar da lista, cada consulta custa O(log n).
     """
-    def calculate_accumulated_yearly(self, yearly_data: list[dict], num_years: int) -> float:
+    @timed('calc')
+    def calculate_accumulated_yearly(self, yearly_data: list[YearlyDividend] | DividendSeries, num_years: int) -> float:
         """
         Calcula a soma dos dividendos anuais de uma lista de dados brutos.
         """
-        if not isinstance(yearly_data, list):
-            raise TypeError("yearly_data deve ser uma lista de dicionários.")
-        
-        total_accumulated_dividends = 0.0
-        current_year = datetime.now().year
-        cut_off_year = current_year - num_years
-
-        for entry in yearly_data:
-            try:
-                year = entry['Ano']
-                value = entry['Valor']
-                if year >= cut_off_year and year <= current_year:
-                    total_accumulated_dividends += value
-            except KeyError as e:
-                raise DataParsingError(f"Formato de dados anual inválido: chave ausente {e}")
-            except (TypeError, ValueError) as e:
-                raise DataParsingError(f"Erro de tipo/valor ao processar dados anuais: {e}")
-        return total_accumulated_dividends
-
-    def calculate_accumulated_monthly(self, monthly_data: list[dict], num_months: int) -> float:
+        return as_series(yearly_data, 'yearly').trailing_years(num_years)
+
+    @timed('calc')
+    def calculate_accumulated_monthly(self, monthly_data: list[DividendEvent] | DividendSeries, num_months: int) -> float:
         """
         Calcula a soma dos dividendos mensais de uma lista de dados brutos para um período de meses.
         """
-        if not isinstance(monthly_data, list):
-            raise TypeError("monthly_data deve ser uma lista de dicionários.")
-        
-        total_accumulated_dividends = 0.0
-        today = datetime.now()
-        
-        # Calculate the cut-off date: today's day, N months ago.
-        year_n_months_ago = today.year - (num_months // 12)
-        month_n_months_ago = today.month - (num_months % 12)
-        if month_n_months_ago <= 0:
-            year_n_months_ago -= 1
-            month_n_months_ago += 12
-        
-        try:
-            # Try to create the date with the current day.
-            # If the day doesn't exist in the month (e.g., 31st of Feb), get the last day of the month.
-            cut_off_date = datetime(year_n_months_ago, month_n_months_ago, today.day)
-        except ValueError:
-            last_day_of_month = calendar.monthrange(year_n_months_ago, month_n_months_ago)[1]
-            cut_off_date = datetime(year_n_months_ago, month_n_months_ago, last_day_of_month)
-
-        for entry in monthly_data:
-            try:
-                # Ensure 'Data' is in 'YYYY-MM-DD' format if it came from the scraper already processed,
-                # or handle 'DD/MM/YYYY' if you decide to keep it raw from the scraper.
-                # Here, we assume the scraper returns 'YYYY-MM-DD' for 'Data'.
-                ex_date = datetime.strptime(entry['Data'], '%Y-%m-%d')
-                value = entry['Valor']
-                
-                if ex_date >= cut_off_date and ex_date <= today:
-                    total_accumulated_dividends += value
-            except KeyError as e:
-                raise DataParsingError(f"Formato de dados mensal inválido: chave ausente {e}")
-            except (TypeError, ValueError) as e:
-                raise DataParsingError(f"Erro de tipo/valor ao processar dados mensais: {e}")
-        return total_accumulated_dividends
\ No newline at end of file
+        return as_series(monthly_data, 'monthly').trailing_months(num_months)
+
+    @timed('calc')
+    def calculate_accumulated_yearly_many(self, yearly_data: list[YearlyDividend] | DividendSeries, years_list) -> dict[int, float]:
+        """
+        Calcula as somas anuais para várias janelas, indexando os dados uma única vez.
+        """
+        return as_series(yearly_data, 'yearly').trailing_years_many(years_list)
+
+    @timed('calc')
+    def calculate_accumulated_monthly_many(self, monthly_data: list[DividendEvent] | DividendSeries, months_list) -> dict[int, float]:
+        """
+        Calcula as somas mensais para várias janelas, indexando os dados uma única vez.
+        """
+        return as_series(monthly_data, 'monthly').trailing_months_many(months_list)
+
+    @timed('calc')
+    def calculate_rolling_ttm(self, monthly_data: list[DividendEvent] | DividendSeries) -> list[dict]:
+        """
+        Retorna a série móvel de proventos dos últimos 12 meses, mês a mês.
+        """
+        return as_series(monthly_data, 'monthly').rolling_ttm()
+
+    @timed('calc')
+    def rank_dividend_yield(self, monthly_by_ticker: dict, prices: dict, num_years: int = 5) -> list[dict]:
+        """
+        Ranqueia vários tickers por dividend yield (TTM / cotação) e consistência de
+        pagamento em N anos, usando o motor vetorizado de rankings.
+        """
+        from .rankings import DividendRankingEngine
+        return DividendRankingEngine.from_monthly(monthly_by_ticker, prices).rank(num_years)
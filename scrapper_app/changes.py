@@ -0,0 +1,89 @@
+from .models import DividendChange, FeedSequence
+from .records import DividendEvent
+
+# --- Feed de Alterações de Proventos ---
+# A ingestão de proventos mensais (StockDataService.store_monthly_dividends) registra
+# cada evento novo ou corrigido em DividendChange. Um cliente guarda o `next` da última
+# resposta e pede ?since=<next> para receber só o que mudou desde então, em vez de
+# baixar o histórico completo de cada ticker.
+# A sequência não é o id autoincremental: em bancos como o PostgreSQL, transações de
+# tickers diferentes podem confirmar ids fora de ordem, e um cliente que já avançou
+# `since` pularia para sempre o id menor confirmado depois. Ela é reservada em
+# FeedSequence, travado até o commit, então cresce na ordem em que as alterações aparecem.
+
+FEED_NAME = 'dividend_changes'
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+# Campos de DividendChange.previous -> rótulos usados pela API de proventos mensais.
+PREVIOUS_LABELS = {
+    'payment_date': 'Data de Pagamento',
+    'value': 'Valor',
+    'shares_ratio': 'Por quantas ações',
+}
+
+
+def parse_change_filters(params) -> dict:
+    """
+    Valida os parâmetros do feed (since, tickers, limit) a partir de um dicionário de
+    parâmetros. Levanta ValueError se algum for inválido.
+    """
+    try:
+        since = int(params.get('since') or 0)
+        limit = int(params.get('limit') or DEFAULT_LIMIT)
+    except ValueError as e:
+        raise ValueError("Os parâmetros 'since' e 'limit' devem ser inteiros.") from e
+    if since < 0:
+        raise ValueError("O parâmetro 'since' deve ser o 'next' da resposta anterior (ou 0).")
+    if not 0 < limit <= MAX_LIMIT:
+        raise ValueError(f"O parâmetro 'limit' deve estar entre 1 e {MAX_LIMIT}.")
+    tickers = sorted({ticker.strip().upper() for ticker in params.get('tickers', '').split(',') if ticker.strip()})
+    return {'since': since, 'tickers': tickers, 'limit': limit}
+
+
+def reserve_sequence(count: int, name: str = FEED_NAME) -> int:
+    """
+    Reserva `count` números consecutivos do feed e retorna o primeiro. Deve ser chamada
+    dentro da transação que grava as alterações, o mais perto possível do commit: a
+    linha do contador fica travada até lá.
+    """
+    sequence, _ = FeedSequence.objects.select_for_update().get_or_create(name=name)
+    FeedSequence.objects.filter(pk=sequence.pk).update(value=sequence.value + count)
+    return sequence.value + 1
+
+
+def serialize_change(change: DividendChange, ticker: str) -> dict:
+    event = DividendEvent(change.ex_date, change.value, change.dividend_type, change.payment_date, change.shares_ratio)
+    previous = {
+        PREVIOUS_LABELS[field]: value
+        for field, value in change.previous.items()
+    }
+    return {
+        "seq": change.seq,
+        "ticker": ticker,
+        "kind": change.kind,
+        "recorded_at": change.recorded_at.isoformat(),
+        "occurrence": change.occurrence,
+        "event": event.to_dict(),
+        "previous": previous,
+    }
+
+
+def list_changes(since: int = 0, tickers=None, limit: int = DEFAULT_LIMIT) -> dict:
+    """
+    Alterações com sequência maior que `since`, em ordem, de todo o mercado ou só de
+    `tickers`. `next` é a sequência a repassar na próxima chamada e `has_more` indica
+    que há mais alterações além de `limit`.
+    """
+    queryset = DividendChange.objects.filter(seq__gt=since).order_by('seq')
+    if tickers:
+        queryset = queryset.filter(company__ticker__in=tickers)
+    rows = list(queryset.select_related('company')[:limit + 1])
+    page = rows[:limit]
+    return {
+        "since": since,
+        "next": page[-1].seq if page else since,
+        "has_more": len(rows) > limit,
+        "changes": [serialize_change(change, change.company.ticker) for change in page],
+    }
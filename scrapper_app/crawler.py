@@ -0,0 +1,276 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import content_hash
+from .errors import ScrapingError, TickerNotFoundError
+from .models import Company
+from .parsing import ParsePipeline
+from .scrapper import FundamentusScraper
+from .services import StockDataService
+
+# --- Crawler do Universo de Tickers ---
+
+DEFAULT_CRAWLER = {
+    'CONCURRENCY': 4,
+    'REQUESTS_PER_SECOND': 2.0,
+    'CHECKPOINT_PATH': os.path.join(settings.BASE_DIR, '.crawl_checkpoint.json'),
+    'PROGRESS_INTERVAL': 5.0,
+    # O checkpoint é regravado a cada N tickers concluídos ou a cada N segundos.
+    'CHECKPOINT_EVERY': 50,
+    'CHECKPOINT_INTERVAL': 5.0,
+}
+
+
+def get_crawler_config() -> dict:
+    config = dict(DEFAULT_CRAWLER)
+    config.update(getattr(settings, 'SCRAPER_CRAWLER', {}))
+    return config
+
+
+class RateLimiter:
+    """
+    Token bucket global e thread-safe: no máximo `rate` aquisições por segundo,
+    com rajadas de até `burst`.
+    """
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class CrawlCheckpoint:
+    """
+    Progresso de uma execução do crawler, salvo em JSON para que uma execução
+    interrompida possa ser retomada. Os tickers concluídos são gravados em lotes
+    (mark_done); flush() grava o que faltar.
+    """
+    def __init__(self, path: str, save_every: int = 50, save_interval: float = 5.0, clock=time.monotonic):
+        self.path = path
+        self.tickers = []
+        self.done = set()
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self._clock = clock
+        self._unsaved = 0
+        self._saved_at = clock()
+
+    def load(self) -> bool:
+        """
+        Carrega o checkpoint do disco. Retorna False se ele não existir.
+        """
+        try:
+            with open(self.path, encoding='utf-8') as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return False
+        self.tickers = data['tickers']
+        self.done = set(data['done'])
+        return True
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump({"tickers": self.tickers, "done": sorted(self.done)}, checkpoint_file)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+        self._saved_at = self._clock()
+
+    def mark_done(self, ticker: str):
+        """
+        Marca o ticker como concluído, salvando a cada `save_every` tickers ou
+        `save_interval` segundos desde a última gravação, o que vier primeiro.
+        """
+        self.done.add(ticker)
+        self._unsaved += 1
+        if self._unsaved >= self.save_every or self._clock() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def flush(self):
+        if self._unsaved:
+            self.save()
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def pending(self) -> list[str]:
+        return [ticker for ticker in self.tickers if ticker not in self.done]
+
+
+class ProgressReporter:
+    """
+    Emite periodicamente o progresso (concluídos, vazão e ETA) por meio de `write`.
+    """
+    def __init__(self, total: int, write, interval: float, clock=time.monotonic):
+        self.total = total
+        self.write = write
+        self.interval = interval
+        self._clock = clock
+        self.started_at = clock()
+        self._last_report = self.started_at
+        self.done = 0
+
+    def advance(self, force: bool = False):
+        self.done += 1
+        now = self._clock()
+        if force or self.done == self.total or now - self._last_report >= self.interval:
+            self._last_report = now
+            self.write(self.format(now))
+
+    def format(self, now: float) -> str:
+        elapsed = max(now - self.started_at, 1e-9)
+        rate = self.done / elapsed
+        remaining = self.total - self.done
+        eta = remaining / rate if rate else float('inf')
+        return f"{self.done}/{self.total} tickers | {rate:.2f} tickers/s | ETA {eta:.0f}s"
+
+
+class FundamentusCrawler:
+    """
+    Busca detalhes e proventos de muitos tickers com concorrência limitada e um
+    limite global de requisições por segundo. Páginas cujo hash não mudou desde a
+    última coleta não são parseadas nem regravadas. Downloads ocorrem nas threads do
+    pool, o parsing no pool de processos do ParsePipeline (ou na própria thread, com
+    `parse_workers=0`) e a gravação no banco fica na thread principal.
+    """
+    def __init__(self, scraper: FundamentusScraper = None, concurrency: int = None,
+                 requests_per_second: float = None, force: bool = False, write=print,
+                 parse_workers: int = None):
+        config = get_crawler_config()
+        self.scraper = scraper if scraper is not None else FundamentusScraper()
+        self.parser = ParsePipeline(self.scraper, workers=parse_workers)
+        self.service = StockDataService(self.scraper)
+        self.concurrency = concurrency or config['CONCURRENCY']
+        self.rate_limiter = RateLimiter(requests_per_second if requests_per_second is not None else config['REQUESTS_PER_SECOND'])
+        self.force = force
+        self.write = write
+        self.progress_interval = config['PROGRESS_INTERVAL']
+
+    def discover(self) -> list[str]:
+        self.rate_limiter.acquire()
+        return self.scraper.get_ticker_list()
+
+    def _fetch(self, path: str) -> bytes:
+        self.rate_limiter.acquire()
+        return self.scraper._fetch_content(path)
+
+    def fetch_ticker(self, ticker: str, known_hashes: tuple) -> dict:
+        """
+        Baixa as duas páginas do ticker e agenda o parsing apenas das que mudaram; as
+        chaves "details" e "proventos" do resultado são Futures (ver resolve).
+        """
+        details_hash, proventos_hash = known_hashes
+        result = {"ticker": ticker}
+        try:
+            content = self._fetch(f"detalhes.php?papel={ticker}")
+        except ScrapingError as e:
+            raise TickerNotFoundError(f"Não foi possível acessar a página para o ticker '{ticker}'.") from e
+        result["details_hash"] = content_hash(content)
+        if self.force or result["details_hash"] != details_hash:
+            result["details"] = self.parser.submit('details', content, ticker)
+
+        try:
+            content = self._fetch(f"proventos.php?papel={ticker}")
+        except ScrapingError as e:
+            raise TickerNotFoundError(f"Não foi possível acessar a página de proventos para o ticker '{ticker}'.") from e
+        result["proventos_hash"] = content_hash(content)
+        if self.force or result["proventos_hash"] != proventos_hash:
+            result["proventos"] = self.parser.submit('proventos', content, ticker)
+        return result
+
+    @staticmethod
+    def resolve(result: dict) -> dict:
+        """
+        Aguarda o parsing agendado por fetch_ticker, trocando os Futures pelos dados extraídos.
+        """
+        for page in ("details", "proventos"):
+            if page in result:
+                result[page] = result[page].result()
+        return result
+
+    def store(self, result: dict) -> dict:
+        """
+        Grava o resultado de fetch_ticker e retorna quais páginas foram atualizadas.
+        """
+        ticker = result["ticker"]
+        now = timezone.now()
+        updated = {"details": "details" in result, "proventos": "proventos" in result}
+        if updated["details"]:
+            self.service.store_details(ticker, result["details"])
+        if updated["proventos"]:
+            if result["proventos"]["yearly"] is not None:
+                self.service.store_yearly_dividends(ticker, result["proventos"]["yearly"])
+            if result["proventos"]["monthly"] is not None:
+                self.service.store_monthly_dividends(ticker, result["proventos"]["monthly"])
+
+        # Páginas inalteradas continuam frescas: apenas renovamos o instante da coleta.
+        fields = {"details_hash": result["details_hash"], "proventos_hash": result["proventos_hash"]}
+        if not updated["details"]:
+            fields["details_fetched_at"] = now
+        if not updated["proventos"]:
+            fields["yearly_fetched_at"] = now
+            fields["monthly_fetched_at"] = now
+        Company.objects.update_or_create(ticker=ticker, defaults=fields)
+        return updated
+
+    def crawl(self, tickers: list[str], checkpoint: CrawlCheckpoint = None) -> dict:
+        """
+        Processa os tickers e retorna contadores: atualizados, inalterados e com erro.
+        """
+        known = {
+            ticker: (details_hash, proventos_hash)
+            for ticker, details_hash, proventos_hash in Company.objects.filter(ticker__in=tickers)
+            .values_list('ticker', 'details_hash', 'proventos_hash')
+        }
+        stats = {"updated": 0, "unchanged": 0, "errors": 0}
+        progress = ProgressReporter(len(tickers), self.write, self.progress_interval)
+        with self.parser, ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawler') as executor:
+            futures = {
+                executor.submit(self.fetch_ticker, ticker, known.get(ticker, ('', ''))): ticker
+                for ticker in tickers
+            }
+            try:
+                for future in as_completed(futures):
+                    ticker = futures[future]
+                    try:
+                        updated = self.store(self.resolve(future.result()))
+                    except Exception as e:
+                        stats["errors"] += 1
+                        self.write(f"Erro em {ticker}: {e}")
+                    else:
+                        stats["updated" if any(updated.values()) else "unchanged"] += 1
+                        if checkpoint is not None:
+                            checkpoint.mark_done(ticker)
+                    progress.advance()
+            finally:
+                # Também ao ser interrompido (ex: Ctrl+C), para que a retomada não repita o lote.
+                if checkpoint is not None:
+                    checkpoint.flush()
+        return stats
@@ -17,4 +17,14 @@ class ColumnNotFoundError(ScrapingError):
 
 class DataParsingError(ScrapingError):
     """Exceção levantada quando há um erro ao parsear dados (ex: valor, data)."""
-    pass
\ No newline at end of file
+    pass
+
+class UpstreamUnavailableError(ScrapingError):
+    """Exceção levantada quando o circuit breaker está aberto e o site de origem não é chamado."""
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimitedError(ScrapingError):
+    """Exceção levantada quando o limite de requisições ao site de origem não libera vaga a tempo."""
+    pass
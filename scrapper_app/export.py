@@ -0,0 +1,142 @@
+import csv
+import json
+from datetime import date
+
+from .models import CompanySnapshot, DividendEvent
+
+# --- Exportação em Streaming (NDJSON/CSV) ---
+# As linhas são lidas do banco em blocos (cursor do lado do servidor quando o banco
+# suporta) e escritas uma a uma, então o uso de memória não cresce com o volume.
+# Cada linha traz seu `id`; repassar o último recebido em `after` retoma a exportação.
+
+CHUNK_SIZE = 2000
+# Linhas agrupadas por trecho enviado, para não pagar o custo de um write por linha.
+LINES_PER_WRITE = 200
+
+DATASETS = {
+    'dividends': ['id', 'ticker', 'ex_date', 'payment_date', 'dividend_type', 'value', 'shares_ratio', 'occurrence'],
+    'snapshots': ['id', 'ticker', 'fetched_at', 'data', 'values'],
+}
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def parse_export_filters(params, dataset: str = 'dividends') -> dict:
+    """
+    Valida os filtros de exportação (tickers, start, end, type, after) de `dataset` a
+    partir de um dicionário de parâmetros. Levanta ValueError se algum for inválido ou
+    não se aplicar ao conjunto (type só existe em proventos).
+    """
+    filters = {}
+    if params.get('tickers'):
+        filters['tickers'] = sorted({ticker.strip().upper() for ticker in params['tickers'].split(',') if ticker.strip()})
+    for name in ('start', 'end'):
+        if params.get(name):
+            try:
+                filters[name] = date.fromisoformat(params[name])
+            except ValueError as e:
+                raise ValueError(f"Data inválida em '{name}': use o formato AAAA-MM-DD.") from e
+    if params.get('type'):
+        if dataset != 'dividends':
+            raise ValueError(f"O filtro 'type' só se aplica ao conjunto 'dividends', não a '{dataset}'.")
+        filters['dividend_type'] = params['type'].upper()
+    if params.get('after'):
+        try:
+            filters['after'] = int(params['after'])
+        except ValueError as e:
+            raise ValueError("O token 'after' deve ser o id da última linha recebida.") from e
+    return filters
+
+
+def iter_dividend_events(tickers=None, start=None, end=None, dividend_type=None, after=None, chunk_size=CHUNK_SIZE):
+    queryset = DividendEvent.objects.order_by('id')
+    if tickers:
+        queryset = queryset.filter(company__ticker__in=tickers)
+    if start:
+        queryset = queryset.filter(ex_date__gte=start)
+    if end:
+        queryset = queryset.filter(ex_date__lte=end)
+    if dividend_type:
+        queryset = queryset.filter(dividend_type=dividend_type)
+    if after:
+        queryset = queryset.filter(id__gt=after)
+    rows = queryset.values_list(
+        'id', 'company__ticker', 'ex_date', 'payment_date', 'dividend_type', 'value', 'shares_ratio', 'occurrence'
+    )
+    for pk, ticker, ex_date, payment_date, dividend_type, value, shares_ratio, occurrence in rows.iterator(chunk_size=chunk_size):
+        yield {
+            "id": pk,
+            "ticker": ticker,
+            "ex_date": ex_date.isoformat(),
+            "payment_date": payment_date.isoformat() if payment_date else None,
+            "dividend_type": dividend_type,
+            "value": value,
+            "shares_ratio": shares_ratio,
+            "occurrence": occurrence,
+        }
+
+
+def iter_snapshots(tickers=None, start=None, end=None, after=None, chunk_size=CHUNK_SIZE):
+    queryset = CompanySnapshot.objects.order_by('id')
+    if tickers:
+        queryset = queryset.filter(company__ticker__in=tickers)
+    if start:
+        queryset = queryset.filter(fetched_at__date__gte=start)
+    if end:
+        queryset = queryset.filter(fetched_at__date__lte=end)
+    if after:
+        queryset = queryset.filter(id__gt=after)
+    rows = queryset.values_list('id', 'company__ticker', 'fetched_at', 'data', 'values')
+    for pk, ticker, fetched_at, data, values in rows.iterator(chunk_size=chunk_size):
+        yield {"id": pk, "ticker": ticker, "fetched_at": fetched_at.isoformat(), "data": data, "values": values}
+
+
+ITERATORS = {
+    'dividends': iter_dividend_events,
+    'snapshots': iter_snapshots,
+}
+
+
+class _Echo:
+    """
+    Pseudo-arquivo para o csv.writer: devolve a linha formatada em vez de guardá-la.
+    """
+    def write(self, value):
+        return value
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def render_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(row[column], ensure_ascii=False) if isinstance(row[column], dict) else row[column]
+            for column in columns
+        ])
+
+
+def _grouped(lines, size: int):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= size:
+            yield ''.join(buffer)
+            buffer.clear()
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_export(dataset: str, fmt: str, filters: dict):
+    """
+    Retorna um iterador de trechos de texto com o `dataset` no formato `fmt`.
+    """
+    rows = ITERATORS[dataset](**filters)
+    lines = render_csv(rows, DATASETS[dataset]) if fmt == 'csv' else render_ndjson(rows)
+    return _grouped(lines, LINES_PER_WRITE)
@@ -0,0 +1,85 @@
+import re
+from functools import lru_cache
+from importlib.util import find_spec
+
+from bs4 import BeautifulSoup, SoupStrainer
+from django.conf import settings
+
+# --- Motor de Extração de HTML ---
+# Parsing restrito às tabelas necessárias, backend de parser selecionável e
+# detecção de classes ignoráveis em uma única passada pelo documento.
+
+_NON_WORD_RE = re.compile(r'[^\w\sÀ-ÿ]')
+_SPACES_RE = re.compile(r'\s+')
+
+# Apenas as tabelas são necessárias nas páginas do Fundamentus.
+DETAILS_STRAINER = SoupStrainer('table')
+PROVENTOS_STRAINER = SoupStrainer('table', id=['resultado', 'resultado-anual'])
+LISTING_STRAINER = SoupStrainer('a')
+
+
+def get_parser_backend() -> str:
+    """
+    Retorna o parser do BeautifulSoup definido em settings.SCRAPER_HTML_PARSER.
+    Em 'auto' (padrão), usa lxml se estiver instalado e html.parser caso contrário.
+    """
+    backend = getattr(settings, 'SCRAPER_HTML_PARSER', 'auto')
+    if backend == 'auto':
+        return 'lxml' if find_spec('lxml') is not None else 'html.parser'
+    return backend
+
+
+def parse_html(content, parse_only: SoupStrainer = None, backend: str = None) -> BeautifulSoup:
+    return BeautifulSoup(content, backend or get_parser_backend(), parse_only=parse_only)
+
+
+@lru_cache(maxsize=2048)
+def normalize_label(label_raw: str) -> str:
+    """
+    Converte um rótulo como 'Div. Yield' em 'DIV_YIELD'.
+    """
+    label = _NON_WORD_RE.sub('', label_raw).strip()
+    return _SPACES_RE.sub('_', label).upper()
+
+
+def find_ignorable_cells(soup: BeautifulSoup, ignorable_classes) -> set[int]:
+    """
+    Retorna os ids das células <td> que têm, nelas mesmas ou em algum descendente,
+    uma classe ignorável. Percorre o documento uma vez, subindo de cada elemento
+    marcado até a raiz, em vez de varrer os descendentes de cada célula.
+    """
+    ignorable_cells = set()
+    for tag in soup.find_all(class_=list(ignorable_classes)):
+        node = tag
+        while node is not None:
+            if node.name == 'td':
+                if id(node) in ignorable_cells:
+                    break
+                ignorable_cells.add(id(node))
+            node = node.parent
+    return ignorable_cells
+
+
+def extract_label_data_pairs(soup: BeautifulSoup, ignorable_classes) -> dict:
+    """
+    Extrai os pares label/data de todas as tabelas da página de detalhes.
+    Lida com múltiplas colunas label-data por linha e ignora linhas com classe 'nivel'.
+    """
+    ignorable_cells = find_ignorable_cells(soup, ignorable_classes)
+    pairs = {}
+    for table in soup.find_all('table'):
+        for row in table.find_all('tr'):
+            if 'nivel' in row.get('class', ()):
+                continue
+
+            cols = row.find_all('td')
+            for i in range(0, len(cols) - 1, 2):
+                first_col = cols[i]
+                second_col = cols[i + 1]
+                if id(first_col) in ignorable_cells or id(second_col) in ignorable_cells:
+                    continue
+
+                label = normalize_label(first_col.get_text(strip=True))
+                if label:
+                    pairs[label] = second_col.get_text(strip=True)
+    return pairs
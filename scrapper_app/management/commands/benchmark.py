@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapper_app.benchmarks import BASELINE_PATH, BenchmarkError, compare, load_results, run_benchmarks, save_results
+
+
+class Command(BaseCommand):
+    help = "Executa os benchmarks offline (páginas gravadas) e compara com a linha de base."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Execuções medidas por benchmark.")
+        parser.add_argument('--output', default='benchmark_results.json', help="Arquivo JSON com os resultados.")
+        parser.add_argument('--baseline', default=str(BASELINE_PATH))
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help="Piora máxima aceita em relação à linha de base (0.5 = 50%%).")
+        parser.add_argument('--update-baseline', action='store_true', help="Grava os resultados como nova linha de base.")
+
+    def handle(self, *args, **options):
+        try:
+            results = run_benchmarks(repeat=options['repeat'])
+        except BenchmarkError as e:
+            raise CommandError(f"Benchmark inválido: {e}") from e
+        save_results(results, options['output'])
+        for name, result in sorted(results["results"].items()):
+            self.stdout.write(
+                f"{name:<60} {result['seconds'] * 1e3:10.3f} ms  {result['relative']:8.2f}x  {result['peak_bytes'] / 1024:10.1f} KiB"
+            )
+
+        if options['update_baseline']:
+            save_results(results, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Linha de base atualizada em {options['baseline']}."))
+            return
+
+        try:
+            baseline = load_results(options['baseline'])
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING("Nenhuma linha de base encontrada; use --update-baseline."))
+            return
+        regressions = compare(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError("Regressões de desempenho:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Nenhuma regressão em relação à linha de base."))
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapper_app.cache import TTLCache
+from scrapper_app.crawler import CrawlCheckpoint, FundamentusCrawler, get_crawler_config
+from scrapper_app.errors import ScrapingError
+from scrapper_app.parsing import get_parsing_config
+from scrapper_app.scrapper import FundamentusScraper
+
+
+class Command(BaseCommand):
+    help = "Coleta detalhes e proventos de todos os tickers listados no Fundamentus."
+
+    def add_arguments(self, parser):
+        config = get_crawler_config()
+        parser.add_argument('--tickers', nargs='+', help="Coleta apenas estes tickers, sem descobrir o universo.")
+        parser.add_argument('--concurrency', type=int, default=config['CONCURRENCY'])
+        parser.add_argument('--rps', type=float, default=config['REQUESTS_PER_SECOND'],
+                            help="Limite global de requisições por segundo (0 desativa).")
+        parser.add_argument('--parse-workers', type=int, default=get_parsing_config()['WORKERS'],
+                            help="Processos de parsing do HTML (0 parseia nas threads de download).")
+        parser.add_argument('--checkpoint', default=config['CHECKPOINT_PATH'])
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignora um checkpoint existente (obrigatório com --tickers se houver um).")
+        parser.add_argument('--force', action='store_true', help="Reprocessa páginas mesmo com hash inalterado.")
+        parser.add_argument('--base-url', help="URL base alternativa (ex: servidor local com páginas gravadas).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Apenas mostra quantos tickers seriam coletados, sem baixar as páginas deles.")
+
+    def handle(self, *args, **options):
+        scraper_kwargs = {"cache": TTLCache(maxsize=1)}
+        if options['base_url']:
+            scraper_kwargs["base_url"] = options['base_url']
+        crawler = FundamentusCrawler(
+            scraper=FundamentusScraper(**scraper_kwargs),
+            concurrency=options['concurrency'],
+            requests_per_second=options['rps'],
+            force=options['force'],
+            write=self.stdout.write,
+            parse_workers=options['parse_workers'],
+        )
+
+        config = get_crawler_config()
+        checkpoint = CrawlCheckpoint(options['checkpoint'], config['CHECKPOINT_EVERY'], config['CHECKPOINT_INTERVAL'])
+        if not options['restart'] and checkpoint.load():
+            if options['tickers']:
+                raise CommandError(
+                    f"Há um checkpoint em {options['checkpoint']}; use --restart para coletar apenas --tickers."
+                )
+            self.stdout.write(f"Retomando checkpoint: {len(checkpoint.done)}/{len(checkpoint.tickers)} concluídos.")
+        else:
+            try:
+                tickers = options['tickers'] or crawler.discover()
+            except ScrapingError as e:
+                raise CommandError(str(e)) from e
+            checkpoint.tickers = [ticker.upper() for ticker in tickers]
+            checkpoint.done = set()
+
+        pending = checkpoint.pending
+        if options['dry_run']:
+            self.stdout.write(f"[dry-run] {len(pending)} tickers seriam coletados: {' '.join(pending[:20])}"
+                              + (" ..." if len(pending) > 20 else ""))
+            return
+
+        checkpoint.save()
+        stats = crawler.crawl(pending, checkpoint)
+        if stats["errors"] == 0:
+            checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído: {stats['updated']} atualizados, {stats['unchanged']} inalterados, {stats['errors']} com erro."
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapper_app.export import DATASETS, FORMATS, parse_export_filters, stream_export
+
+
+class Command(BaseCommand):
+    help = "Exporta em streaming (NDJSON ou CSV) o histórico salvo de proventos ou de snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=list(DATASETS), default='dividends')
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        parser.add_argument('--tickers', help="Lista separada por vírgulas, ex: PETR4,VALE3.")
+        parser.add_argument('--start', help="Data inicial (AAAA-MM-DD).")
+        parser.add_argument('--end', help="Data final (AAAA-MM-DD).")
+        parser.add_argument('--type', help="Tipo de provento, ex: DIVIDENDO (só com --dataset dividends).")
+        parser.add_argument('--after', help="Retoma após a linha com este id.")
+        parser.add_argument('--output', help="Arquivo de saída (padrão: stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_export_filters(options, options['dataset'])
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        chunks = stream_export(options['dataset'], options['format'], filters)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from scrapper_app import views
+from scrapper_app.scheduler import PrewarmLoop, get_scheduler_config
+
+
+class Command(BaseCommand):
+    help = "Mantém aquecidos os tickers de SCRAPER_SCHEDULER['HOT_TICKERS'] em um processo dedicado."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Executa as tarefas vencidas uma vez e sai.")
+
+    def handle(self, *args, **options):
+        config = get_scheduler_config()
+        loop = PrewarmLoop(views.service.scheduler, config)
+        if options['once']:
+            queued = loop.run_pending()
+            views.service.scheduler.shutdown(wait=True)
+            self.stdout.write(f"{queued} atualizações executadas.")
+            return
+        self.stdout.write(f"Pré-aquecendo {len(loop.tickers)} tickers (Ctrl+C para sair).")
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            loop.stop()
+            views.service.scheduler.shutdown(wait=False)
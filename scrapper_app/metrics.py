@@ -0,0 +1,308 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .errors import ScrapingError
+
+# --- Instrumentação por Etapa (Server-Timing e Prometheus) ---
+# Quando SCRAPER_METRICS['ENABLED'] é falso, stage() e timed() retornam imediatamente,
+# sem medir tempo nem tocar em locks.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = None
+_request_timings = ContextVar('request_timings', default=None)
+# Etapas da mesma requisição podem rodar em threads do pool (batch.submit) ao mesmo tempo.
+_request_timings_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        _enabled = bool(getattr(settings, 'SCRAPER_METRICS', {}).get('ENABLED', False))
+    return _enabled
+
+
+def set_enabled(enabled: bool | None):
+    """
+    Força a instrumentação ligada/desligada; None volta a ler settings.SCRAPER_METRICS.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def _format_labels(labelnames, values, extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Histograma cumulativo no formato do Prometheus, com uma série por combinação de rótulos.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'scraper_stage_seconds', "Duração de cada etapa (fetch, parse, extract, calc) por página ou método.",
+    ('stage', 'target'),
+)
+DOWNLOADED_BYTES = Counter('scraper_downloaded_bytes_total', "Bytes baixados do site de origem por página.", ('page',))
+SCRAPING_ERRORS = Counter('scraper_errors_total', "Erros de scraping por classe de exceção.", ('exception',))
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+@contextmanager
+def _timed_stage(name: str, target: str, count_errors: bool):
+    started = time.perf_counter()
+    try:
+        yield
+    except ScrapingError as e:
+        if count_errors:
+            SCRAPING_ERRORS.inc(type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, name, target)
+        timings = _request_timings.get()
+        if timings is not None:
+            with _request_timings_lock:
+                timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def stage(name: str, target: str = '', count_errors: bool = False):
+    """
+    Mede um trecho do caminho crítico, ex: `with stage('fetch', 'detalhes.php'): ...`.
+    Com `count_errors`, ScrapingErrors que atravessam o trecho são contados por classe.
+    """
+    if not is_enabled():
+        return _NULL_STAGE
+    return _timed_stage(name, target, count_errors)
+
+
+def timed(name: str):
+    """
+    Decorator que mede o método inteiro como a etapa `name`, usando o nome do método como alvo.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            with _timed_stage(name, func.__name__, count_errors=False):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_error(exc: ScrapingError):
+    if is_enabled():
+        SCRAPING_ERRORS.inc(type(exc).__name__)
+
+
+def record_bytes(page: str, size: int):
+    if is_enabled():
+        DOWNLOADED_BYTES.inc(page, amount=size)
+
+
+def page_name(path: str) -> str:
+    return path.split('?', 1)[0]
+
+
+@contextmanager
+def collect_request_timings():
+    """
+    Acumula, durante o bloco, a duração total de cada etapa executada neste contexto,
+    incluindo as de threads que recebem uma cópia dele (batch.submit).
+    """
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def format_server_timing(timings: dict, total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+
+def cache_lines(cache_stats: dict) -> list[str]:
+    hits, misses = cache_stats['hits'], cache_stats['misses']
+    ratio = hits / (hits + misses) if hits + misses else 0.0
+    return [
+        "# HELP scraper_cache_hits_total Acertos do cache de páginas.",
+        "# TYPE scraper_cache_hits_total counter",
+        f"scraper_cache_hits_total {hits}",
+        "# HELP scraper_cache_misses_total Falhas do cache de páginas.",
+        "# TYPE scraper_cache_misses_total counter",
+        f"scraper_cache_misses_total {misses}",
+        "# HELP scraper_cache_hit_ratio Proporção de acertos do cache de páginas.",
+        "# TYPE scraper_cache_hit_ratio gauge",
+        f"scraper_cache_hit_ratio {ratio}",
+    ]
+
+
+BREAKER_STATES = {'closed': 0, 'open': 1, 'half_open': 2}
+
+
+def upstream_lines(states: list[dict]) -> list[str]:
+    """
+    Estado dos guardas de cada host de origem (ver throttle.py) como gauges e contadores.
+    """
+    series = [
+        ('scraper_upstream_breaker_state', 'gauge', "Circuit breaker: 0 fechado, 1 aberto, 2 meio-aberto.",
+         lambda state: BREAKER_STATES[state['breaker']['state']]),
+        ('scraper_upstream_breaker_trips_total', 'counter', "Aberturas do circuit breaker.",
+         lambda state: state['breaker']['trips']),
+        ('scraper_upstream_rejected_total', 'counter', "Chamadas rejeitadas com o circuito aberto.",
+         lambda state: state['breaker']['rejected']),
+        ('scraper_upstream_rate_tokens', 'gauge', "Fichas disponíveis no token bucket compartilhado.",
+         lambda state: state['rate_limit']['tokens']),
+        ('scraper_upstream_rate_waits_total', 'counter', "Esperas por ficha no token bucket.",
+         lambda state: state['rate_limit']['waits']),
+        ('scraper_upstream_concurrency_limit', 'gauge', "Limite atual de requisições simultâneas (AIMD).",
+         lambda state: state['concurrency']['limit']),
+        ('scraper_upstream_in_flight', 'gauge', "Requisições em andamento ao site de origem.",
+         lambda state: state['concurrency']['in_flight']),
+    ]
+    lines = []
+    for name, kind, documentation, value in series:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{upstream="{state["upstream"]}"}} {value(state)}' for state in states]
+    return lines
+
+
+def render_metrics(cache_stats: dict = None, upstream_states: list[dict] = None) -> str:
+    """
+    Exporta todas as métricas no formato de texto do Prometheus.
+    """
+    lines = STAGE_SECONDS.expose() + DOWNLOADED_BYTES.expose() + SCRAPING_ERRORS.expose()
+    if cache_stats is not None:
+        lines += cache_lines(cache_stats)
+    if upstream_states:
+        lines += upstream_lines(upstream_states)
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    for metric in (STAGE_SECONDS, DOWNLOADED_BYTES, SCRAPING_ERRORS):
+        metric.clear()
+
+
+class ServerTimingMiddleware:
+    """
+    Adiciona o cabeçalho Server-Timing com a duração de cada etapa executada na requisição.
+    Funciona em WSGI e ASGI: sob ASGI, as views assíncronas continuam no event loop em
+    vez de serem adaptadas para uma thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not is_enabled():
+            return self.get_response(request)
+        started = time.perf_counter()
+        with collect_request_timings() as timings:
+            response = self.get_response(request)
+        response['Server-Timing'] = format_server_timing(timings, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not is_enabled():
+            return await self.get_response(request)
+        started = time.perf_counter()
+        with collect_request_timings() as timings:
+            response = await self.get_response(request)
+        response['Server-Timing'] = format_server_timing(timings, time.perf_counter() - started)
+        return response
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=12, unique=True)),
+                ('details_fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('yearly_fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('monthly_fetched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'companies',
+                'ordering': ['ticker'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CompanySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField()),
+                ('fetched_at', models.DateTimeField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='scrapper_app.company')),
+            ],
+            options={
+                'get_latest_by': 'fetched_at',
+                'indexes': [models.Index(fields=['company', '-fetched_at'], name='snapshot_company_fetched_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DividendEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ex_date', models.DateField()),
+                ('payment_date', models.DateField(blank=True, null=True)),
+                ('dividend_type', models.CharField(max_length=40)),
+                ('value', models.FloatField()),
+                ('shares_ratio', models.PositiveIntegerField(default=1)),
+                ('occurrence', models.PositiveSmallIntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dividend_events', to='scrapper_app.company')),
+            ],
+            options={
+                'ordering': ['company', '-ex_date', 'occurrence'],
+                'indexes': [models.Index(fields=['company', 'ex_date'], name='dividend_company_exdate_idx')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'ex_date', 'dividend_type', 'occurrence'), name='unique_dividend_event')],
+            },
+        ),
+        migrations.CreateModel(
+            name='YearlyDividend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('value', models.FloatField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='yearly_dividends', to='scrapper_app.company')),
+            ],
+            options={
+                'ordering': ['company', '-year'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'year'), name='unique_yearly_dividend')],
+            },
+        ),
+    ]
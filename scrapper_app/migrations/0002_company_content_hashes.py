@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='details_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='proventos_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-16 21:06
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper_app', '0002_company_content_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companysnapshot',
+            name='values',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+    ]
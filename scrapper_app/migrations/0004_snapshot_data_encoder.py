@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-16 21:13
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper_app', '0003_snapshot_values'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='companysnapshot',
+            name='data',
+            field=models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+    ]
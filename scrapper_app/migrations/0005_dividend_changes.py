@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-16 21:17
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper_app', '0004_snapshot_data_encoder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DividendChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('insert', 'Inserção'), ('update', 'Correção')], max_length=6)),
+                ('ex_date', models.DateField()),
+                ('dividend_type', models.CharField(max_length=40)),
+                ('occurrence', models.PositiveSmallIntegerField(default=0)),
+                ('payment_date', models.DateField(blank=True, null=True)),
+                ('value', models.FloatField()),
+                ('shares_ratio', models.PositiveIntegerField(default=1)),
+                ('previous', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('recorded_at', models.DateTimeField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dividend_changes', to='scrapper_app.company')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['company', 'id'], name='dividend_change_company_idx')],
+            },
+        ),
+    ]
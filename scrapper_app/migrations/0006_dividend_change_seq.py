@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:40
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def backfill_seq(apps, schema_editor):
+    # As alterações já gravadas mantêm a ordem do id; o contador continua a partir dele.
+    DividendChange = apps.get_model('scrapper_app', 'DividendChange')
+    FeedSequence = apps.get_model('scrapper_app', 'FeedSequence')
+    DividendChange.objects.update(seq=F('id'))
+    last = DividendChange.objects.aggregate(last=Max('id'))['last'] or 0
+    FeedSequence.objects.update_or_create(name='dividend_changes', defaults={'value': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper_app', '0005_dividend_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=40, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='dividendchange',
+            name='seq',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_seq, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dividendchange',
+            name='seq',
+            field=models.BigIntegerField(unique=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='dividendchange',
+            name='dividend_change_company_idx',
+        ),
+        migrations.AddIndex(
+            model_name='dividendchange',
+            index=models.Index(fields=['company', 'seq'], name='dividend_change_seq_idx'),
+        ),
+        migrations.AlterModelOptions(
+            name='dividendchange',
+            options={'ordering': ['seq']},
+        ),
+    ]
@@ -1,3 +1,137 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class Company(models.Model):
+    """
+    Empresa/ticker conhecido, com os instantes da última coleta de cada tipo de dado.
+    """
+    ticker = models.CharField(max_length=12, unique=True)
+    details_fetched_at = models.DateTimeField(null=True, blank=True)
+    yearly_fetched_at = models.DateTimeField(null=True, blank=True)
+    monthly_fetched_at = models.DateTimeField(null=True, blank=True)
+    # Hash (sha256) do HTML bruto da última coleta, usado pelo crawler para pular páginas inalteradas.
+    details_hash = models.CharField(max_length=64, blank=True, default='')
+    proventos_hash = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        ordering = ['ticker']
+        verbose_name_plural = 'companies'
+
+    def __str__(self):
+        return self.ticker
+
+
+class CompanySnapshot(models.Model):
+    """
+    Resultado de get_company_details em um determinado instante: `data` guarda os textos
+    brutos da página e `values` os mesmos indicadores normalizados (ver normalization.py).
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='snapshots')
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    values = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        get_latest_by = 'fetched_at'
+        indexes = [
+            models.Index(fields=['company', '-fetched_at'], name='snapshot_company_fetched_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.company} @ {self.fetched_at:%Y-%m-%d %H:%M}"
+
+
+class DividendEvent(models.Model):
+    """
+    Uma linha da tabela de proventos detalhada (id='resultado').
+    `occurrence` diferencia eventos repetidos com mesma data-com e tipo na mesma página;
+    é atribuída quando a linha aparece pela primeira vez e não muda se a página
+    reordenar as linhas (ver services.diff_dividend_events).
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='dividend_events')
+    ex_date = models.DateField()
+    payment_date = models.DateField(null=True, blank=True)
+    dividend_type = models.CharField(max_length=40)
+    value = models.FloatField()
+    shares_ratio = models.PositiveIntegerField(default=1)  # "Por quantas ações"
+    occurrence = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['company', '-ex_date', 'occurrence']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'ex_date', 'dividend_type', 'occurrence'],
+                name='unique_dividend_event',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'ex_date'], name='dividend_company_exdate_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.company} {self.dividend_type} {self.ex_date} {self.value}"
+
+
+class YearlyDividend(models.Model):
+    """
+    Uma linha da tabela de proventos anual (id='resultado-anual').
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='yearly_dividends')
+    year = models.PositiveSmallIntegerField()
+    value = models.FloatField()
+
+    class Meta:
+        ordering = ['company', '-year']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'year'], name='unique_yearly_dividend'),
+        ]
+
+    def __str__(self):
+        return f"{self.company} {self.year} {self.value}"
+
+
+class DividendChange(models.Model):
+    """
+    Entrada do feed de alterações de proventos: uma inserção ou correção de
+    DividendEvent detectada na ingestão. `seq` é o número de sequência do feed,
+    reservado em FeedSequence na mesma transação, e só cresce na ordem dos commits;
+    `previous` guarda os valores anteriores dos campos corrigidos.
+    """
+    INSERT = 'insert'
+    UPDATE = 'update'
+    KIND_CHOICES = [(INSERT, 'Inserção'), (UPDATE, 'Correção')]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='dividend_changes')
+    seq = models.BigIntegerField(unique=True)
+    kind = models.CharField(max_length=6, choices=KIND_CHOICES)
+    ex_date = models.DateField()
+    dividend_type = models.CharField(max_length=40)
+    occurrence = models.PositiveSmallIntegerField(default=0)
+    payment_date = models.DateField(null=True, blank=True)
+    value = models.FloatField()
+    shares_ratio = models.PositiveIntegerField(default=1)
+    previous = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['company', 'seq'], name='dividend_change_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} {self.company} {self.dividend_type} {self.ex_date}"
+
+
+class FeedSequence(models.Model):
+    """
+    Último número de sequência usado por um feed (ex: 'dividend_changes'). A linha fica
+    travada (select_for_update) da reserva até o commit, então transações concorrentes
+    recebem números na ordem em que são confirmadas, ao contrário de um autoincremento.
+    """
+    name = models.CharField(max_length=40, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
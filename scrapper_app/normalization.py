@@ -0,0 +1,189 @@
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from .records import parse_br_date
+
+# --- Normalização Numérica dos Detalhes ---
+# O Fundamentus exibe todos os indicadores como texto formatado ('1.234,56', '12,3%',
+# '-', 'dd/mm/aaaa'). normalize_details converte tudo em uma única passada usando o
+# esquema abaixo; rótulos desconhecidos têm o tipo inferido pelo formato do valor.
+
+TEXT = 'text'
+DECIMAL = 'decimal'    # Cotações e valores por ação (R$), sem perda de precisão.
+INTEGER = 'int'        # Montantes em R$ e quantidades.
+FLOAT = 'float'        # Múltiplos (P/L, P/VP, EV/EBITDA...).
+PERCENT = 'percent'    # Percentuais, guardados como fração (14,8% -> 0.148).
+DATE = 'date'
+
+DETAILS_SCHEMA = {
+    'PAPEL': TEXT,
+    'TIPO': TEXT,
+    'EMPRESA': TEXT,
+    'SETOR': TEXT,
+    'SUBSETOR': TEXT,
+    'COTAÇÃO': DECIMAL,
+    'MIN_52_SEM': DECIMAL,
+    'MAX_52_SEM': DECIMAL,
+    'LPA': DECIMAL,
+    'VPA': DECIMAL,
+    'DATA_ÚLT_COT': DATE,
+    'ÚLT_BALANÇO_PROCESSADO': DATE,
+    'VOL_MÉD_2M': INTEGER,
+    'VALOR_DE_MERCADO': INTEGER,
+    'VALOR_DA_FIRMA': INTEGER,
+    'NRO_AÇÕES': INTEGER,
+    'ATIVO': INTEGER,
+    'ATIVO_CIRCULANTE': INTEGER,
+    'DÍV_BRUTA': INTEGER,
+    'DÍV_LÍQUIDA': INTEGER,
+    'DISPONIBILIDADES': INTEGER,
+    'PATRIM_LÍQ': INTEGER,
+    'RECEITA_LÍQUIDA': INTEGER,
+    'EBIT': INTEGER,
+    'LUCRO_LÍQUIDO': INTEGER,
+    'DEPÓSITOS': INTEGER,
+    'CART_DE_CRÉDITO': INTEGER,
+    'RESULT_INT_FINANC': INTEGER,
+    'REC_SERVIÇOS': INTEGER,
+    'PL': FLOAT,
+    'PVP': FLOAT,
+    'PEBIT': FLOAT,
+    'PSR': FLOAT,
+    'PATIVOS': FLOAT,
+    'PCAP_GIRO': FLOAT,
+    'PATIV_CIRC_LIQ': FLOAT,
+    'EV_EBITDA': FLOAT,
+    'EV_EBIT': FLOAT,
+    'LIQUIDEZ_CORR': FLOAT,
+    'DIV_BR_PATRIM': FLOAT,
+    'GIRO_ATIVOS': FLOAT,
+    'DIV_YIELD': PERCENT,
+    'ROE': PERCENT,
+    'ROIC': PERCENT,
+    'MARG_BRUTA': PERCENT,
+    'MARG_EBIT': PERCENT,
+    'MARG_LÍQUIDA': PERCENT,
+    'EBIT_ATIVO': PERCENT,
+    'CRES_REC_5A': PERCENT,
+}
+
+_BR_DATE = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_BR_NUMBER = re.compile(r'^-?\d{1,3}(\.\d{3})*(,\d+)?$|^-?\d+(,\d+)?$')
+
+
+def _to_decimal(raw: str) -> Decimal | None:
+    try:
+        return Decimal(raw.replace('.', '').replace(',', '.'))
+    except InvalidOperation:
+        return None
+
+
+def parse_value(raw, kind: str):
+    """
+    Converte um valor bruto do Fundamentus segundo `kind`. Valores ausentes ('-', '')
+    ou fora do formato esperado viram None; texto é apenas aparado. Valores que já
+    chegam tipados (fontes que não exibem texto formatado) são apenas convertidos.
+    """
+    if raw is None:
+        return None
+    if not isinstance(raw, str) and kind != TEXT:
+        return _coerce(raw, kind)
+    raw = str(raw).strip()
+    if kind == TEXT:
+        return raw
+    if raw in ('', '-'):
+        return None
+    if kind == DATE:
+        return parse_br_date(raw)
+    if kind == PERCENT:
+        number = _to_decimal(raw.rstrip('%').strip())
+        return float(number / 100) if number is not None else None
+    number = _to_decimal(raw)
+    if number is None:
+        return None
+    if kind == DECIMAL:
+        return number
+    if kind == INTEGER:
+        return int(number) if number == number.to_integral_value() else float(number)
+    return float(number)
+
+
+def _coerce(value, kind: str):
+    if kind == DATE:
+        return value if isinstance(value, date) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+        return None
+    if kind == DECIMAL:
+        return value if isinstance(value, Decimal) else Decimal(str(value))
+    if kind == INTEGER:
+        return int(value) if value == int(value) else float(value)
+    return float(value)
+
+
+def infer_kind(raw) -> str:
+    """
+    Tipo de um rótulo fora do esquema, deduzido pelo formato do valor.
+    """
+    if isinstance(raw, date):
+        return DATE
+    if isinstance(raw, (int, float, Decimal)) and not isinstance(raw, bool):
+        return FLOAT
+    raw = str(raw).strip()
+    if raw.endswith('%') and _BR_NUMBER.match(raw[:-1].strip()):
+        return PERCENT
+    if _BR_DATE.match(raw):
+        return DATE
+    if _BR_NUMBER.match(raw):
+        return FLOAT
+    return TEXT
+
+
+def normalize_details(raw: dict) -> dict:
+    """
+    Converte o dicionário bruto de get_company_details em valores tipados: Decimal para
+    cotações, int para montantes, float para múltiplos, fração para percentuais e date
+    para datas. Indicadores ausentes viram None.
+    """
+    normalized = {}
+    for label, value in raw.items():
+        kind = DETAILS_SCHEMA.get(label)
+        if kind is None:
+            kind = TEXT if value in (None, '', '-') else infer_kind(value)
+        normalized[label] = parse_value(value, kind)
+    return normalized
+
+
+def hydrate(stored: dict) -> dict:
+    """
+    Reconstrói os tipos de um dicionário normalizado lido do JSONField, onde Decimal e
+    date foram gravados como texto (DjangoJSONEncoder).
+    """
+    hydrated = {}
+    for label, value in stored.items():
+        kind = DETAILS_SCHEMA.get(label)
+        if isinstance(value, str):
+            if kind == DECIMAL:
+                value = Decimal(value)
+            elif (kind == DATE or kind is None) and _ISO_DATE.match(value):
+                value = date.fromisoformat(value)
+        hydrated[label] = value
+    return hydrated
+
+
+def as_float(value) -> float | None:
+    """
+    Valor normalizado como float (Decimal/int incluídos), ou None se não for numérico.
+    """
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def json_ready(details: dict) -> dict:
+    """
+    Detalhes normalizados prontos para a resposta JSON: Decimal vira número (float), em
+    vez do texto que o DjangoJSONEncoder emitiria. Os demais valores não mudam.
+    """
+    return {label: float(value) if isinstance(value, Decimal) else value for label, value in details.items()}
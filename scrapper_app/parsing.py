@@ -0,0 +1,179 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+from django.conf import settings
+
+from .records import DividendEvent, YearlyDividend
+
+# --- Etapa de Parsing em Processos ---
+# O parsing com BeautifulSoup é Python puro e segura o GIL, então em um crawl com
+# muitas threads de download ele fica limitado a um núcleo. O ParsePipeline manda o
+# HTML bruto para um pool de processos que roda a mesma extração do
+# FundamentusScraper e devolve só os dados extraídos (tuplas, reconstruídas em
+# registros aqui). Um semáforo limita as páginas na fila do pool: quando ela enche,
+# as threads de download esperam (backpressure) em vez de acumular HTML em memória.
+# Com WORKERS = 0, ou em requisições individuais, o parsing continua na própria thread.
+
+DEFAULT_PARSING = {
+    'WORKERS': min(4, os.cpu_count() or 1),
+    # Páginas aguardando ou em parsing no pool; None usa 2 x WORKERS.
+    'QUEUE_SIZE': None,
+}
+
+KINDS = ('details', 'proventos')
+
+_worker_scraper = None
+
+
+def get_parsing_config() -> dict:
+    config = dict(DEFAULT_PARSING)
+    config.update(getattr(settings, 'SCRAPER_PARSING', {}))
+    return config
+
+
+def _init_worker(ignorable_classes):
+    """
+    Prepara o processo de parsing: configura o Django (necessário quando o processo é
+    iniciado por spawn) e cria um scraper só para extração, sem cache em disco.
+    """
+    global _worker_scraper
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from .cache import TTLCache
+    from .scrapper import FundamentusScraper
+    _worker_scraper = FundamentusScraper(ignorable_classes=ignorable_classes, cache=TTLCache(maxsize=1))
+
+
+def _noop():
+    return os.getpid()
+
+
+def _compact(kind: str, result):
+    if kind == 'details':
+        return result
+    return {
+        name: None if rows is None else [tuple(getattr(row, field) for field in row.__slots__) for row in rows]
+        for name, rows in result.items()
+    }
+
+
+def _expand(kind: str, result):
+    if kind == 'details':
+        return result
+    return {
+        'yearly': None if result['yearly'] is None else [YearlyDividend(*row) for row in result['yearly']],
+        'monthly': None if result['monthly'] is None else [DividendEvent(*row) for row in result['monthly']],
+    }
+
+
+def parse_content(scraper, kind: str, content: bytes, ticker: str):
+    """
+    Extrai `kind` ('details' ou 'proventos') do HTML bruto com os métodos
+    parse_*_content do scraper.
+    """
+    if kind == 'details':
+        return scraper.parse_details_content(content, ticker)
+    return scraper.parse_proventos_content(content, ticker)
+
+
+def _parse_in_worker(kind: str, content: bytes, ticker: str):
+    return _compact(kind, parse_content(_worker_scraper, kind, content, ticker))
+
+
+class ParsePipeline:
+    """
+    Parsing do HTML bruto em um pool de processos, com fila limitada. Use como
+    gerenciador de contexto: o pool é criado na entrada (antes das threads de
+    download) e encerrado na saída.
+    """
+    def __init__(self, scraper, workers: int = None, queue_size: int = None):
+        config = get_parsing_config()
+        self.scraper = scraper
+        self.workers = config['WORKERS'] if workers is None else workers
+        self.queue_size = queue_size or config['QUEUE_SIZE'] or 2 * max(self.workers, 1)
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def offloaded(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> 'ParsePipeline':
+        if self.workers > 0 and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.scraper.ignorable_classes,)
+            )
+            # Cria os processos agora, antes que as threads de download existam.
+            wait([self._executor.submit(_noop) for _ in range(self.workers)])
+        return self
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, kind: str, content: bytes, ticker: str) -> Future:
+        """
+        Agenda a extração e retorna um Future com o resultado de parse_content.
+        Bloqueia enquanto a fila do pool estiver cheia. Sem pool, extrai na hora.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Tipo de página desconhecido: '{kind}'.")
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(parse_content(self.scraper, kind, content, ticker))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._slots.acquire()
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            raw = self._executor.submit(_parse_in_worker, kind, content, ticker)
+        except BaseException:
+            self._release()
+            raise
+        future = Future()
+
+        def done(raw_future):
+            self._release()
+            try:
+                future.set_result(_expand(kind, raw_future.result()))
+            except BaseException as e:
+                future.set_exception(e)
+
+        raw.add_done_callback(done)
+        return future
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def parse(self, kind: str, content: bytes, ticker: str):
+        return self.submit(kind, content, ticker).result()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self.offloaded else 0,
+            "queue_size": self.queue_size,
+            "submitted": self.submitted,
+            "peak_in_flight": self.peak_in_flight,
+        }
@@ -0,0 +1,184 @@
+import time
+from datetime import date, datetime
+
+import numpy as np
+from django.conf import settings
+
+from .batch import run_batch
+from .calculator import months_ago
+
+# --- Projeção de Renda de Carteiras ---
+# Os proventos de todas as posições vão para arrays colunares (posição, data-com,
+# pagamento, valor por ação) e a renda de cada janela é calculada para a carteira
+# inteira com um único bincount. Os valores do Fundamentus são "por quantas ações"
+# (ex: R$ 1,50 a cada 1000 ações), então cada provento é dividido por essa proporção.
+
+DEFAULT_PORTFOLIO = {
+    'MAX_POSITIONS': 100,
+    # Janelas de renda passada, em meses.
+    'MONTHS': [1, 3, 6, 12, 24, 60],
+    # Tempo máximo (segundos) para resolver as séries; posições que não chegarem a
+    # tempo saem do total e recebem status 504.
+    'BUDGET': 5.0,
+}
+
+
+def get_portfolio_config() -> dict:
+    config = dict(DEFAULT_PORTFOLIO)
+    config.update(getattr(settings, 'SCRAPER_PORTFOLIO', {}))
+    return config
+
+
+def parse_portfolio(payload) -> dict:
+    """
+    Valida o corpo de /portfolio/income: "positions" (lista de {"ticker", "quantity"}),
+    e opcionais "months" (janelas) e "budget" (segundos, até o BUDGET configurado).
+    Levanta ValueError se algo for inválido.
+    """
+    config = get_portfolio_config()
+    if not isinstance(payload, dict):
+        raise ValueError("O corpo deve ser um objeto JSON.")
+    positions = payload.get('positions')
+    if not isinstance(positions, list) or not positions:
+        raise ValueError("'positions' deve ser uma lista não vazia de {\"ticker\", \"quantity\"}.")
+    if len(positions) > config['MAX_POSITIONS']:
+        raise ValueError(f"No máximo {config['MAX_POSITIONS']} posições por carteira.")
+    parsed = []
+    for position in positions:
+        ticker = position.get('ticker') if isinstance(position, dict) else None
+        quantity = position.get('quantity') if isinstance(position, dict) else None
+        if not isinstance(ticker, str) or not ticker.strip():
+            raise ValueError(f"Posição inválida: {position!r}")
+        if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity < 0:
+            raise ValueError(f"Quantidade inválida para {ticker}: {quantity!r}")
+        parsed.append((ticker.strip().upper(), float(quantity)))
+
+    months = payload.get('months', config['MONTHS'])
+    if (not isinstance(months, list) or not months
+            or any(isinstance(m, bool) or not isinstance(m, int) or m <= 0 for m in months)):
+        raise ValueError("'months' deve ser uma lista de inteiros positivos.")
+    budget = payload.get('budget', config['BUDGET'])
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or budget <= 0:
+        raise ValueError("'budget' deve ser um número positivo de segundos.")
+    return {'positions': parsed, 'months': sorted(set(months)), 'budget': min(float(budget), config['BUDGET'])}
+
+
+class PortfolioIncome:
+    """
+    Proventos de todas as posições de uma carteira em arrays colunares, com a renda
+    de várias janelas calculada em uma única passada vetorizada.
+    """
+    def __init__(self, quantities, position_ids, ex_ordinals, payment_ordinals, per_share):
+        self.quantities = np.asarray(quantities, dtype=np.float64)
+        self.position_ids = np.asarray(position_ids, dtype=np.int64)
+        self.ex_ordinals = np.asarray(ex_ordinals, dtype=np.int64)
+        # Pagamento sem data conhecida fica como 0 (anterior a qualquer data-com).
+        self.payment_ordinals = np.asarray(payment_ordinals, dtype=np.int64)
+        self.amounts = np.asarray(per_share, dtype=np.float64) * self.quantities[self.position_ids]
+
+    @classmethod
+    def from_series(cls, positions: list[tuple[str, float]], monthly_by_ticker: dict) -> 'PortfolioIncome':
+        """
+        Constrói a carteira a partir das posições (ticker, quantidade) e de
+        {ticker: get_monthly_dividends(ticker)}. Posições sem série não geram renda.
+        """
+        position_ids, ex_ordinals, payment_ordinals, per_share = [], [], [], []
+        for position_id, (ticker, _) in enumerate(positions):
+            for event in monthly_by_ticker.get(ticker, ()):
+                if event.ex_date is None:
+                    continue
+                position_ids.append(position_id)
+                ex_ordinals.append(event.ex_date.toordinal())
+                payment_ordinals.append(event.payment_date.toordinal() if event.payment_date else 0)
+                per_share.append(event.value / (event.shares_ratio or 1))
+        return cls([quantity for _, quantity in positions], position_ids, ex_ordinals, payment_ordinals, per_share)
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def income(self, months: list[int], today: date = None) -> np.ndarray:
+        """
+        Matriz (posições x janelas) com a renda de cada posição nos últimos N meses
+        (data-com entre months_ago(hoje, N) e hoje, como em trailing_months), seguida de
+        duas colunas de projeção: a renda esperada nos próximos 12 meses se os últimos 12
+        se repetirem, e os proventos já anunciados e ainda não pagos.
+        """
+        today = today or datetime.now().date()
+        today_ordinal = today.toordinal()
+        starts = np.array([months_ago(today, m).toordinal() for m in [*months, 12]], dtype=np.int64)
+        in_window = (self.ex_ordinals[None, :] >= starts[:, None]) & (self.ex_ordinals[None, :] <= today_ordinal)
+        announced = (self.ex_ordinals > today_ordinal) | (self.payment_ordinals > today_ordinal)
+        columns = np.vstack([in_window, announced[None, :]])
+
+        window_ids, event_ids = np.nonzero(columns)
+        flat = self.position_ids[event_ids] * columns.shape[0] + window_ids
+        sums = np.bincount(flat, weights=self.amounts[event_ids], minlength=len(self) * columns.shape[0])
+        return sums.reshape(len(self), columns.shape[0])
+
+
+def resolve_series(service, tickers: list[str], budget: float) -> tuple[dict, dict, dict]:
+    """
+    Busca as séries mensais de `tickers`: primeiro todas do banco em lote, depois as que
+    faltarem pelo scraper, em paralelo e dentro do tempo restante de `budget`.
+    Retorna ({ticker: eventos}, {ticker: origem}, {ticker: entrada de erro}).
+    """
+    started = time.monotonic()
+    series = service.load_monthly_dividends_many(tickers, stale_kind='monthly')
+    origins = {ticker: 'stored' for ticker in series}
+    errors = {}
+    misses = [ticker for ticker in tickers if ticker not in series]
+    if misses:
+        remaining = max(0.0, budget - (time.monotonic() - started))
+        for entry in run_batch(service.get_monthly_dividends, misses, deadline=remaining):
+            ticker = entry["ticker"]
+            if "data" in entry:
+                series[ticker] = entry["data"]
+                origins[ticker] = 'fetched'
+            else:
+                errors[ticker] = {"error": entry["error"], "status": entry["status"]}
+    return series, origins, errors
+
+
+def project_income(service, positions: list[tuple[str, float]], months: list[int], budget: float,
+                   today: date = None) -> dict:
+    """
+    Renda passada por janela e projetada de cada posição e da carteira. Posições cujo
+    ticker não pôde ser resolvido aparecem com "error"/"status" e ficam fora do total.
+    """
+    started = time.perf_counter()
+    tickers = list(dict.fromkeys(ticker for ticker, _ in positions))
+    series, origins, errors = resolve_series(service, tickers, budget)
+    resolved_at = time.perf_counter()
+
+    engine = PortfolioIncome.from_series(positions, series)
+    matrix = engine.income(months, today)
+    valid = np.array([ticker not in errors for ticker, _ in positions], dtype=bool)
+    totals = matrix[valid].sum(axis=0)
+
+    def split(row):
+        return (
+            {str(m): round(float(value), 2) for m, value in zip(months, row[:len(months)])},
+            {"next_12m": round(float(row[len(months)]), 2), "announced": round(float(row[-1]), 2)},
+        )
+
+    results = []
+    for position_id, (ticker, quantity) in enumerate(positions):
+        if ticker in errors:
+            results.append({"ticker": ticker, "quantity": quantity, **errors[ticker]})
+            continue
+        income, projected = split(matrix[position_id])
+        results.append({
+            "ticker": ticker, "quantity": quantity, "source": origins[ticker],
+            "income": income, "projected": projected,
+        })
+    income, projected = split(totals)
+    return {
+        "months": months,
+        "positions": results,
+        "total": {"income": income, "projected": projected},
+        "partial": bool(errors),
+        "timings_ms": {
+            "resolve": round((resolved_at - started) * 1000, 3),
+            "calc": round((time.perf_counter() - resolved_at) * 1000, 3),
+        },
+    }
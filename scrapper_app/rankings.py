@@ -0,0 +1,222 @@
+import threading
+from datetime import date, datetime
+
+import numpy as np
+from django.db.models import Max, OuterRef, Subquery
+
+from .calculator import months_ago
+from .changes import FEED_NAME
+from .models import Company, CompanySnapshot, DividendEvent, FeedSequence
+from .normalization import as_float, hydrate, normalize_details
+
+# --- Motor Vetorizado de Ranking de Dividendos ---
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def parse_price(raw) -> float:
+    """
+    Converte uma cotação já normalizada (Decimal/float) ou no formato brasileiro
+    ('1.234,56') em float; NaN se inválida.
+    """
+    if raw is None:
+        return float('nan')
+    number = as_float(raw)
+    if number is not None:
+        return number
+    try:
+        return float(str(raw).replace('.', '').replace(',', '.'))
+    except ValueError:
+        return float('nan')
+
+
+def snapshot_price(snapshot: CompanySnapshot) -> float:
+    """
+    Cotação normalizada de um snapshot (texto Decimal no JSONField); snapshots antigos,
+    sem `values`, são normalizados a partir dos dados brutos.
+    """
+    values = hydrate(snapshot.values) if snapshot.values else normalize_details(snapshot.data)
+    return parse_price(values.get('COTAÇÃO'))
+
+
+def percentile_rank(values: np.ndarray) -> np.ndarray:
+    """
+    Percentil (0 a 1) de cada valor entre os valores válidos: fração dos valores
+    menores ou iguais a ele. Valores NaN permanecem NaN.
+    """
+    result = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    if valid.any():
+        ordered = np.sort(values[valid])
+        result[valid] = np.searchsorted(ordered, values[valid], side='right') / ordered.size
+    return result
+
+
+class DividendRankingEngine:
+    """
+    Mantém os proventos de todos os tickers em arrays colunares (id do ticker,
+    ordinal da data-com, valor por ação) e calcula TTM, somas por ano, dividend yield e
+    percentis para o universo inteiro em poucas passadas vetorizadas.
+    Os valores são divididos por `shares_ratio` ("por quantas ações"), como em
+    PortfolioIncome, para que desdobramentos e bonificações não inflem as somas.
+    """
+    def __init__(self, tickers: list[str], ticker_ids, ordinals, values, prices=None, version=None):
+        self.version = version
+        self.tickers = list(tickers)
+        self.ticker_ids = np.asarray(ticker_ids, dtype=np.int64)
+        self.ordinals = np.asarray(ordinals, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.prices = (
+            np.asarray(prices, dtype=np.float64) if prices is not None
+            else np.full(len(self.tickers), np.nan)
+        )
+        # Ano da data-com, derivado uma única vez dos ordinais.
+        days = (self.ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+        self.years = days.astype('datetime64[Y]').astype(np.int64) + 1970
+
+    @classmethod
+    def from_monthly(cls, monthly_by_ticker: dict, prices: dict = None) -> 'DividendRankingEngine':
+        """
+        Constrói o motor a partir de {ticker: get_monthly_dividends(ticker)} e
+        {ticker: cotação}. Linhas sem data-com são ignoradas.
+        """
+        tickers = sorted(monthly_by_ticker)
+        ticker_ids, ordinals, values = [], [], []
+        for ticker_id, ticker in enumerate(tickers):
+            for event in monthly_by_ticker[ticker]:
+                if event.ex_date is None:
+                    continue
+                ticker_ids.append(ticker_id)
+                ordinals.append(event.ex_date.toordinal())
+                values.append(event.value / (event.shares_ratio or 1))
+        prices = prices or {}
+        return cls(tickers, ticker_ids, ordinals, values, [parse_price(prices.get(t)) for t in tickers])
+
+    @classmethod
+    def from_database(cls, version=None) -> 'DividendRankingEngine':
+        """
+        Carrega todos os DividendEvent salvos e a cotação do snapshot mais recente de cada empresa.
+        """
+        latest_snapshot = CompanySnapshot.objects.filter(company=OuterRef('pk')).order_by('-fetched_at')
+        companies = list(
+            Company.objects.order_by('pk')
+            .annotate(snapshot_id=Subquery(latest_snapshot.values('pk')[:1]))
+            .values_list('pk', 'ticker', 'snapshot_id')
+        )
+        index = {pk: position for position, (pk, _, _) in enumerate(companies)}
+        snapshots = CompanySnapshot.objects.in_bulk([snapshot_id for _, _, snapshot_id in companies if snapshot_id])
+        prices = [
+            snapshot_price(snapshots[snapshot_id]) if snapshot_id else float('nan')
+            for _, _, snapshot_id in companies
+        ]
+
+        rows = DividendEvent.objects.values_list('company_id', 'ex_date', 'value', 'shares_ratio')
+        columns = np.array(
+            [
+                (index[company_id], ex_date.toordinal(), value / (shares_ratio or 1))
+                for company_id, ex_date, value, shares_ratio in rows.iterator(chunk_size=5000)
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 3)
+        return cls(
+            [ticker for _, ticker, _ in companies], columns[:, 0], columns[:, 1], columns[:, 2], prices, version,
+        )
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _sum_by_ticker(self, mask: np.ndarray) -> np.ndarray:
+        return np.bincount(self.ticker_ids[mask], weights=self.values[mask], minlength=len(self.tickers))
+
+    def ttm(self, today: date = None) -> np.ndarray:
+        """
+        Proventos dos últimos 12 meses de cada ticker (mesma janela de trailing_months(12)).
+        """
+        today = today or datetime.now().date()
+        start = months_ago(today, 12).toordinal()
+        mask = (self.ordinals >= start) & (self.ordinals <= today.toordinal())
+        return self._sum_by_ticker(mask)
+
+    def yearly_matrix(self, num_years: int, current_year: int = None) -> np.ndarray:
+        """
+        Matriz (tickers x anos) com a soma dos proventos de cada ano civil, do ano corrente
+        (coluna 0) até `num_years` anos atrás.
+        """
+        current_year = current_year or datetime.now().year
+        offset = current_year - self.years
+        mask = (offset >= 0) & (offset <= num_years)
+        flat = self.ticker_ids[mask] * (num_years + 1) + offset[mask]
+        sums = np.bincount(flat, weights=self.values[mask], minlength=len(self.tickers) * (num_years + 1))
+        return sums.reshape(len(self.tickers), num_years + 1)
+
+    def dividend_yield(self, today: date = None) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dy = self.ttm(today) / self.prices
+        dy[~np.isfinite(dy)] = np.nan
+        return dy
+
+    def rank(self, num_years: int = 5, today: date = None) -> list[dict]:
+        """
+        Calcula TTM, soma de N anos, DY, consistência de pagamento (anos com proventos
+        entre os N anos completos anteriores) e os percentis de DY e consistência.
+        Retorna uma linha por ticker, ordenada por DY decrescente (sem DY por último).
+        """
+        today = today or datetime.now().date()
+        ttm = self.ttm(today)
+        matrix = self.yearly_matrix(num_years, today.year)
+        n_year_sum = matrix.sum(axis=1)
+        consistency = (matrix[:, 1:] > 0).sum(axis=1) / num_years if num_years else np.zeros(len(self))
+        dy = self.dividend_yield(today)
+        dy_percentile = percentile_rank(dy)
+        consistency_percentile = percentile_rank(consistency.astype(np.float64))
+        order = np.lexsort((-np.nan_to_num(dy, nan=-np.inf), np.isnan(dy)))
+
+        def clean(value):
+            return None if np.isnan(value) else round(float(value), 6)
+
+        return [
+            {
+                "ticker": self.tickers[i],
+                "cotacao": clean(self.prices[i]),
+                "ttm": round(float(ttm[i]), 6),
+                "soma_anos": round(float(n_year_sum[i]), 6),
+                "dividend_yield": clean(dy[i]),
+                "consistencia": round(float(consistency[i]), 6),
+                "percentil_dy": clean(dy_percentile[i]),
+                "percentil_consistencia": clean(consistency_percentile[i]),
+            }
+            for i in order
+        ]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def engine_version() -> tuple:
+    """
+    Versão dos dados do ranking: a posição do feed de alterações de proventos (avança a
+    cada evento novo ou corrigido, em qualquer processo) e o maior id de snapshot (cotações).
+    """
+    feed = FeedSequence.objects.filter(name=FEED_NAME).values_list('value', flat=True).first()
+    return feed or 0, CompanySnapshot.objects.aggregate(version=Max('pk'))['version']
+
+
+def get_ranking_engine() -> DividendRankingEngine:
+    """
+    Retorna o motor do processo, reconstruindo-o quando o feed de alterações ou os
+    snapshots avançam desde a última carga.
+    """
+    global _engine
+    version = engine_version()
+    if _engine is not None and _engine.version == version:
+        return _engine
+    with _engine_lock:
+        if _engine is None or _engine.version != version:
+            _engine = DividendRankingEngine.from_database(version)
+    return _engine
+
+
+def reset_ranking_engine():
+    global _engine
+    _engine = None
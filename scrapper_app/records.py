@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from datetime import date
+
+# --- Registros Tipados de Proventos ---
+# O scraper, o cache, o serviço e o calculador trocam estes registros imutáveis;
+# a conversão para o formato JSON da API (chaves em português e datas ISO)
+# acontece apenas nas views, via to_dict/serialize.
+
+
+@dataclass(frozen=True, slots=True)
+class DividendEvent:
+    """
+    Uma linha da tabela de proventos detalhada (id='resultado').
+    """
+    ex_date: date | None
+    value: float
+    dividend_type: str
+    payment_date: date | None
+    shares_ratio: int
+
+    def to_dict(self) -> dict:
+        return {
+            "Data": self.ex_date.isoformat() if self.ex_date else None,
+            "Valor": self.value,
+            "Tipo": self.dividend_type,
+            "Data de Pagamento": self.payment_date.isoformat() if self.payment_date else None,
+            "Por quantas ações": self.shares_ratio,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DividendEvent':
+        """
+        Inverso de to_dict.
+        """
+        ex_date, payment_date = data["Data"], data["Data de Pagamento"]
+        return cls(
+            date.fromisoformat(ex_date) if ex_date else None,
+            float(data["Valor"]),
+            data["Tipo"],
+            date.fromisoformat(payment_date) if payment_date else None,
+            int(data["Por quantas ações"]),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class YearlyDividend:
+    """
+    Uma linha da tabela de proventos anual (id='resultado-anual').
+    """
+    year: int
+    value: float
+
+    def to_dict(self) -> dict:
+        return {"Ano": self.year, "Valor": self.value}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'YearlyDividend':
+        return cls(int(data["Ano"]), float(data["Valor"]))
+
+
+def serialize(records) -> list[dict]:
+    return [record.to_dict() for record in records]
+
+
+def parse_br_date(value: str) -> date | None:
+    """
+    Converte 'DD/MM/AAAA' em date, ou None se o texto não for uma data (ex: '-').
+    """
+    try:
+        day, month, year = value.split('/')
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
@@ -0,0 +1,171 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# --- Atualização em Segundo Plano (stale-while-revalidate) ---
+
+DEFAULT_SCHEDULER = {
+    'WORKERS': 2,
+    # Por quanto tempo além da idade máxima um dado ainda pode ser servido enquanto é atualizado.
+    'STALE_MAX_AGE': {
+        'DETAILS': 60 * 60,
+        'DIVIDENDS': 7 * 24 * 60 * 60,
+    },
+    'TIMEZONE': 'America/Sao_Paulo',
+    'HOT_TICKERS': [],
+    'JOBS': [
+        # Detalhes a cada 15 minutos durante o pregão; proventos uma vez por noite.
+        {'kind': 'details', 'every': 15 * 60, 'hours': (10, 18), 'weekdays': (0, 4)},
+        {'kind': 'dividends', 'at': '02:00'},
+    ],
+    'TICK': 30,
+}
+
+
+def get_scheduler_config() -> dict:
+    config = dict(DEFAULT_SCHEDULER)
+    config.update(getattr(settings, 'SCRAPER_SCHEDULER', {}))
+    return config
+
+
+class RefreshScheduler:
+    """
+    Pool de workers que atualiza dados em segundo plano, deduplicando pedidos
+    pendentes por (tipo, ticker). `refreshers` mapeia cada tipo para a função de
+    atualização, ex: {'details': service.refresh_details}.
+    """
+    def __init__(self, refreshers: dict, workers: int = None):
+        self.refreshers = refreshers
+        self.workers = workers or get_scheduler_config()['WORKERS']
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.failed = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scraper-refresh')
+        return self._executor
+
+    def enqueue(self, kind: str, ticker: str) -> bool:
+        """
+        Agenda a atualização do (tipo, ticker). Retorna False se já houver uma pendente.
+        """
+        key = (kind, ticker.upper())
+        with self._lock:
+            if key in self._pending:
+                self.deduplicated += 1
+                return False
+            self._pending.add(key)
+            self.enqueued += 1
+            executor = self._get_executor()
+        executor.submit(self._run, key)
+        return True
+
+    def _run(self, key):
+        kind, ticker = key
+        try:
+            self.refreshers[kind](ticker)
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Falha ao atualizar %s de %s em segundo plano: %s", kind, ticker, e)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+            connection.close()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "deduplicated": self.deduplicated,
+            "failed": self.failed,
+            "pending": self.pending(),
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+class ScheduledJob:
+    """
+    Tarefa periódica com regras simples no estilo cron: `every` (segundos) dentro de
+    uma faixa de horas e dias da semana, ou uma vez por dia em `at` ('HH:MM').
+    """
+    def __init__(self, kind: str, every: int = None, at: str = None, hours: tuple = None, weekdays: tuple = None):
+        if (every is None) == (at is None):
+            raise ValueError("Defina exatamente um entre 'every' e 'at'.")
+        self.kind = kind
+        self.every = every
+        self.at = tuple(int(part) for part in at.split(':')) if at else None
+        self.hours = hours
+        self.weekdays = weekdays
+        self.last_run = None
+
+    def is_due(self, now: datetime) -> bool:
+        if self.weekdays and not (self.weekdays[0] <= now.weekday() <= self.weekdays[1]):
+            return False
+        if self.at is not None:
+            scheduled = now.replace(hour=self.at[0], minute=self.at[1], second=0, microsecond=0)
+            return now >= scheduled and (self.last_run is None or self.last_run < scheduled)
+        if self.hours and not (self.hours[0] <= now.hour < self.hours[1]):
+            return False
+        return self.last_run is None or now - self.last_run >= timedelta(seconds=self.every)
+
+
+class PrewarmLoop:
+    """
+    Laço que, a cada `tick` segundos, enfileira a atualização do conjunto de tickers
+    populares para cada tarefa que estiver vencida.
+    """
+    def __init__(self, scheduler: RefreshScheduler, config: dict = None):
+        config = config or get_scheduler_config()
+        self.scheduler = scheduler
+        self.tickers = [ticker.upper() for ticker in config['HOT_TICKERS']]
+        self.jobs = [ScheduledJob(**job) for job in config['JOBS']]
+        self.timezone = ZoneInfo(config['TIMEZONE'])
+        self.tick = config['TICK']
+        self._stop = threading.Event()
+
+    def run_pending(self, now: datetime = None) -> int:
+        """
+        Enfileira as tarefas vencidas e retorna quantos pedidos foram agendados.
+        """
+        now = now or datetime.now(self.timezone)
+        queued = 0
+        for job in self.jobs:
+            if not job.is_due(now):
+                continue
+            job.last_run = now
+            kinds = ('yearly', 'monthly') if job.kind == 'dividends' else (job.kind,)
+            for ticker in self.tickers:
+                for kind in kinds:
+                    queued += self.scheduler.enqueue(kind, ticker)
+        return queued
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.tick)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run_forever, name='scraper-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
@@ -1,9 +1,20 @@
 import requests
-from .errors import ScrapingError, TickerNotFoundError, TableNotFoundError, ColumnNotFoundError, DataParsingError
-from bs4 import BeautifulSoup
-from datetime import datetime
+from .transport import get_session, get_timeout
+from .cache import MISSING, TTLCache, build_page_cache, build_recorder, build_validator_cache, content_hash
+from .extraction import DETAILS_STRAINER, LISTING_STRAINER, PROVENTOS_STRAINER, extract_label_data_pairs, parse_html
+from .errors import (
+    ScrapingError, TickerNotFoundError, TableNotFoundError, ColumnNotFoundError, DataParsingError,
+    RateLimitedError, UpstreamUnavailableError,
+)
+from .records import DividendEvent, YearlyDividend, parse_br_date
+from .singleflight import SingleFlight
+from .metrics import count_error, page_name, record_bytes, stage
+from .throttle import get_upstream_guard
+from bs4 import BeautifulSoup, SoupStrainer
 from abc import ABC, abstractmethod
-import re # Para expressões regulares, útil para limpar strings
+import re
+
+TICKER_LINK_RE = re.compile(r'detalhes\.php\?papel=([A-Za-z0-9]+)')
 
 # --- Interface Genérica para Web Scrapers ---
 class GenericWebScraper(ABC):
@@ -16,19 +27,121 @@ class GenericWebScraper(ABC):
         self.headers = headers if headers is not None else {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/555.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/555.36'
         }
+        self.validators = build_validator_cache()
+        self.guard = get_upstream_guard(base_url)
+        self.recorder = build_recorder()
+        self.not_modified = 0
+        self.unchanged = 0
+        self.served_stale = 0
+
+    def _fetch_page(self, path: str) -> tuple[requests.Response | None, dict]:
+        """
+        Faz a requisição HTTP usando a Session compartilhada do processo (pool keep-alive
+        com retries) e retorna (resposta, validadores anteriores ou MISSING).
+        Revalida páginas já vistas com If-None-Match/If-Modified-Since; a resposta é None
+        quando o resultado da extração anterior continua valendo: o servidor respondeu
+        304 ou o circuit breaker está aberto e há uma versão anterior para servir.
+        Levanta ScrapingError em caso de erro na requisição.
+        """
+        entry = self.validators.get((path, ''))
+        conditional = {}
+        if entry is not MISSING:
+            if entry['etag']:
+                conditional['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                conditional['If-Modified-Since'] = entry['last_modified']
+
+        page = page_name(path)
+        try:
+            with stage('fetch', page, count_errors=True):
+                response = self._request(path, conditional)
+        except UpstreamUnavailableError:
+            if entry is MISSING:
+                raise
+            self.served_stale += 1
+            return None, entry
+        record_bytes(page, len(response.content))
+        if response.status_code == 304 and entry is not MISSING:
+            self.not_modified += 1
+            return None, entry
+        return response, entry
 
-    def _fetch_html(self, path: str) -> BeautifulSoup:
+    def _extract_page(self, path: str, fetched: tuple, extract, parse_only: SoupStrainer = None):
+        """
+        Retorna extract(soup) para uma página obtida por _fetch_page. `parse_only`
+        restringe o parsing às tags necessárias. Se a página não mudou (304, mesmo hash
+        de conteúdo ou versão anterior servida com o circuit breaker aberto), reaproveita
+        o resultado da extração anterior sem parsear de novo.
+        Os validadores guardam só ETag, Last-Modified, hash e esse resultado, nunca a
+        árvore do BeautifulSoup, que é mutável e seria compartilhada entre threads.
         """
-        Método auxiliar para fazer a requisição HTTP e parsear o HTML.
-        Levanta requests.exceptions.RequestException em caso de erro na requisição.
+        response, entry = fetched
+        if response is None:
+            return entry['rows']
+        digest = content_hash(response.content)
+        if entry is not MISSING and entry['hash'] == digest:
+            self.unchanged += 1
+            rows = entry['rows']
+        else:
+            with stage('parse', page_name(path)):
+                soup = self._parse_html(response.content, parse_only)
+            rows = extract(soup)
+        self.validators.set((path, ''), {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'hash': digest,
+            'rows': rows,
+        })
+        return rows
+
+    def _fetch_extracted(self, path: str, extract, parse_only: SoupStrainer = None):
+        """
+        Atalho para _fetch_page seguido de _extract_page.
+        """
+        return self._extract_page(path, self._fetch_page(path), extract, parse_only)
+
+    def _fetch_content(self, path: str) -> bytes:
+        """
+        Faz a requisição HTTP e retorna o corpo bruto da resposta.
+        """
+        return self._request(path).content
+
+    def _request(self, path: str, extra_headers: dict = None) -> requests.Response:
+        """
+        Faz a requisição GET; respostas 304 são retornadas como estão.
+        Passa pelo guarda do host (circuit breaker, limite de taxa compartilhado entre
+        processos e concorrência adaptativa), que pode levantar UpstreamUnavailableError
+        ou RateLimitedError antes de qualquer acesso à rede.
         """
         url = f"{self.base_url}{path}"
+        if self.recorder is not None and self.recorder.replaying:
+            return self.recorder.replay(url)
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
+        ticket = self.guard.acquire()
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            response = get_session().get(url, headers=headers, timeout=get_timeout())
         except requests.exceptions.RequestException as e:
+            self.guard.release(ticket, failed=True)
             raise ScrapingError(f"Erro ao acessar a URL {url}: {e}") from e
+        self.guard.release(ticket, status=response.status_code)
+        try:
+            if response.status_code != 304:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise ScrapingError(f"Erro ao acessar a URL {url}: {e}") from e
+        if self.recorder is not None and response.status_code == 200:
+            self.recorder.record(url, response.content, response.headers)
+        return response
+
+    def revalidation_stats(self) -> dict:
+        return {
+            "not_modified": self.not_modified, "unchanged": self.unchanged,
+            "served_stale": self.served_stale, "tracked": len(self.validators),
+        }
+
+    @staticmethod
+    def _parse_html(content: bytes, parse_only: SoupStrainer = None) -> BeautifulSoup:
+        return parse_html(content, parse_only)
 
     @abstractmethod
     def get_company_details(self, ticker: str) -> dict:
@@ -39,7 +152,7 @@ class GenericWebScraper(ABC):
         pass
 
     @abstractmethod
-    def get_yearly_dividends(self, ticker: str) -> list[dict]:
+    def get_yearly_dividends(self, ticker: str) -> list[YearlyDividend]:
         """
         Método abstrato para extrair dados de dividendos anuais.
         Deve ser implementado por classes concretas.
@@ -47,7 +160,7 @@ class GenericWebScraper(ABC):
         pass
 
     @abstractmethod
-    def get_monthly_dividends(self, ticker: str) -> list[dict]:
+    def get_monthly_dividends(self, ticker: str) -> list[DividendEvent]:
         """
         Método abstrato para extrair dados de dividendos mensais (detalhados).
         Deve ser implementado por classes concretas.
@@ -59,10 +172,19 @@ class FundamentusScraper(GenericWebScraper):
     """
     Classe para realizar o scraping de dados do site Fundamentus.
     Encapsula a lógica para extrair detalhes de empresas e proventos anuais/mensais.
+    Os detalhes e as tabelas de proventos já extraídos ficam em um cache LRU+TTL por
+    ticker (com segundo nível em disco, se configurado), e chamadas concorrentes para a
+    mesma página e ticker compartilham um único download (single-flight).
     """
-    def __init__(self, ignorable_classes: list = None):
+    DETAILS_KEY = 'detalhes.php'
+    YEARLY_KEY = 'proventos.php#resultado-anual'
+    MONTHLY_KEY = 'proventos.php#resultado'
+
+    def __init__(self, ignorable_classes: list = None, cache: TTLCache = None, base_url: str = "http://fundamentus.com.br/"):
         self.ignorable_classes = ignorable_classes if ignorable_classes is not None else ['nivel1', 'nivel2', 'oscil']
-        super().__init__(base_url="http://fundamentus.com.br/")
+        self.cache = cache if cache is not None else build_page_cache(base_url)
+        self.flight = SingleFlight()
+        super().__init__(base_url=base_url)
 
     def get_company_details(self, ticker: str) -> dict:
         """
@@ -70,70 +192,129 @@ class FundamentusScraper(GenericWebScraper):
         no Fundamentus e os retorna como um dicionário.
         Lida com múltiplas colunas label-data por linha e ignora linhas com classe 'nivel'.
         """
+        cached = self.cache.get((self.DETAILS_KEY, ticker.upper()))
+        if cached is not MISSING:
+            return dict(cached)
+        return dict(self.flight.do(('detalhes.php', ticker.upper()), lambda: self._load_details(ticker)))
+
+    def _load_details(self, ticker: str) -> dict:
         path = f"detalhes.php?papel={ticker.upper()}"
         try:
-            soup = self._fetch_html(path)
+            fetched = self._fetch_page(path)
+        except (UpstreamUnavailableError, RateLimitedError):
+            # O site de origem está protegido pelo guarda: não é um ticker inexistente.
+            raise
         except ScrapingError as e:
             raise TickerNotFoundError(f"Não foi possível acessar a página para o ticker '{ticker}'.") from e
 
-        company_details = {}
-        all_tables = soup.find_all('table')
-        if not all_tables:
-            raise TableNotFoundError(f"Nenhuma tabela encontrada na página de detalhes para '{ticker}'.")
+        def extract(soup):
+            with stage('extract', 'detalhes.php', count_errors=True):
+                return self._parse_company_details(soup, ticker)
 
-        for table in all_tables:
-            for row in table.find_all('tr'):
-                if 'class' in row.attrs and 'nivel' in row['class']:
-                    continue
-
-                cols = row.find_all('td')
-                for i in range(0, len(cols), 2):
-                    if i + 1 < len(cols):
-                        first_col = cols[i]
-                        second_col = cols[i + 1]
+        details = self._extract_page(path, fetched, extract, DETAILS_STRAINER)
+        self.cache.set((self.DETAILS_KEY, ticker.upper()), details)
+        return details
 
-                        if self._has_ignorable_class(first_col) or self._has_ignorable_class(second_col):
-                            continue
-                        
-                        label_raw = first_col.get_text(strip=True)
-                        data_raw = second_col.get_text(strip=True)
-
-                        label = re.sub(r'[^\w\sÀ-ÿ]', '', label_raw).strip()
-                        label = re.sub(r'\s+', '_', label).upper() 
+    def _parse_company_details(self, soup: BeautifulSoup, ticker: str) -> dict:
+        """
+        Extrai os pares label/data de uma página de detalhes já parseada.
+        """
+        if not soup.find('table'):
+            raise TableNotFoundError(f"Nenhuma tabela encontrada na página de detalhes para '{ticker}'.")
 
-                        if label:
-                            company_details[label] = data_raw
-        
+        company_details = extract_label_data_pairs(soup, self.ignorable_classes)
         if not company_details:
             raise TableNotFoundError(f"Nenhum dado no padrão 'label' e 'data' encontrado para '{ticker}'.")
 
         return company_details
 
-    # Check if first_col or second_col or any of their children have ignorable classes
-    def _has_ignorable_class(self, tag):
-        if not tag:
-            return False
-        # Check the tag itself
-        if 'class' in tag.attrs and any(cls in self.ignorable_classes for cls in tag['class']):
-            return True
-        # Check all descendants
-        for descendant in tag.descendants:
-            if hasattr(descendant, 'attrs') and 'class' in descendant.attrs:
-                if any(cls in self.ignorable_classes for cls in descendant['class']):
-                    return True
-        return False
-
-    def get_yearly_dividends(self, ticker: str) -> list[dict]:
+    def get_yearly_dividends(self, ticker: str) -> list[YearlyDividend]:
         """
         Busca os dados de proventos anuais de uma empresa no Fundamentus.
-        Retorna uma lista de dicionários com 'Ano' e 'Valor'.
+        Retorna uma lista de YearlyDividend (ano e valor).
+        """
+        cached = self.cache.get((self.YEARLY_KEY, ticker.upper()))
+        if cached is not MISSING:
+            return list(cached)
+        return list(self._load_proventos(ticker, want=self.YEARLY_KEY))
+
+    def get_monthly_dividends(self, ticker: str) -> list[DividendEvent]:
+        """
+        Busca os dados de proventos mensais (detalhados) de uma empresa no Fundamentus.
+        Retorna uma lista de DividendEvent (data-com, valor, tipo, pagamento e proporção).
+        """
+        cached = self.cache.get((self.MONTHLY_KEY, ticker.upper()))
+        if cached is not MISSING:
+            return list(cached)
+        return list(self._load_proventos(ticker, want=self.MONTHLY_KEY))
+
+    def _load_proventos(self, ticker: str, want: str) -> list:
         """
+        Baixa e parseia a página proventos.php uma única vez, preenchendo no cache
+        tanto a tabela anual quanto a detalhada. Retorna as linhas da tabela `want`;
+        se a extração dela falhar, a exceção é propagada e nada é cacheado para ela.
+        Chamadas concorrentes para o mesmo ticker (anual ou detalhada) aguardam o mesmo download.
+        """
+        tables = self.flight.do(('proventos.php', ticker.upper()), lambda: self._load_proventos_tables(ticker))
+        return self.pick_table(tables, want)
+
+    def _load_proventos_tables(self, ticker: str) -> dict:
         path = f"proventos.php?papel={ticker.upper()}"
         try:
-            soup = self._fetch_html(path)
+            fetched = self._fetch_page(path)
+        except (UpstreamUnavailableError, RateLimitedError):
+            # O site de origem está protegido pelo guarda: não é um ticker inexistente.
+            raise
         except ScrapingError as e:
             raise TickerNotFoundError(f"Não foi possível acessar a página de proventos para o ticker '{ticker}'.") from e
 
+        def extract(soup):
+            with stage('extract', 'proventos.php'):
+                return self._extract_proventos_tables(soup, ticker)
+
+        tables = self._extract_page(path, fetched, extract, PROVENTOS_STRAINER)
+        self._cache_proventos(tables, ticker)
+        return tables
+
+    def _extract_proventos(self, soup: BeautifulSoup, ticker: str) -> dict:
+        """
+        Extrai as duas tabelas de uma página de proventos já parseada, guardando no cache
+        as que foram extraídas. Retorna {chave: linhas ou a exceção da extração}.
+        """
+        tables = self._extract_proventos_tables(soup, ticker)
+        self._cache_proventos(tables, ticker)
+        return tables
+
+    def _extract_proventos_tables(self, soup: BeautifulSoup, ticker: str) -> dict:
+        parsers = {
+            self.YEARLY_KEY: self._parse_yearly_dividends,
+            self.MONTHLY_KEY: self._parse_monthly_dividends,
+        }
+        tables = {}
+        for key, parser in parsers.items():
+            try:
+                tables[key] = parser(soup, ticker)
+            except ScrapingError as e:
+                tables[key] = e
+                count_error(e)
+        return tables
+
+    def _cache_proventos(self, tables: dict, ticker: str):
+        for key, rows in tables.items():
+            if not isinstance(rows, Exception):
+                self.cache.set((key, ticker.upper()), rows)
+
+    @staticmethod
+    def pick_table(tables: dict, want: str) -> list:
+        result = tables[want]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _parse_yearly_dividends(self, soup: BeautifulSoup, ticker: str) -> list[YearlyDividend]:
+        """
+        Extrai as linhas 'Ano'/'Valor' da tabela de proventos anual (id='resultado-anual').
+        """
         dividends_table = soup.find('table', id='resultado-anual')
         if not dividends_table:
             raise TableNotFoundError(f"Não foi possível encontrar a tabela de proventos anual (id='resultado-anual') para '{ticker}'.")
@@ -159,23 +340,16 @@ class FundamentusScraper(GenericWebScraper):
                 try:
                     year = int(ano_str)
                     value = float(valor_str.replace('.', '').replace(',', '.'))
-                    yearly_data.append({"Ano": year, "Valor": value})
+                    yearly_data.append(YearlyDividend(year, value))
                 except (ValueError, IndexError) as e:
                     print(f"Aviso: Não foi possível processar a linha anual de provento: {e} - Ano: '{ano_str}', Valor: '{valor_str}'")
                     continue
         return yearly_data
 
-    def get_monthly_dividends(self, ticker: str) -> list[dict]:
+    def _parse_monthly_dividends(self, soup: BeautifulSoup, ticker: str) -> list[DividendEvent]:
         """
-        Busca os dados de proventos mensais (detalhados) de uma empresa no Fundamentus.
-        Retorna uma lista de dicionários com 'Data', 'Valor', 'Tipo', etc.
+        Extrai as linhas da tabela de proventos detalhada (id='resultado').
         """
-        path = f"proventos.php?papel={ticker.upper()}"
-        try:
-            soup = self._fetch_html(path)
-        except ScrapingError as e:
-            raise TickerNotFoundError(f"Não foi possível acessar a página de proventos para o ticker '{ticker}'.") from e
-
         dividends_table = soup.find('table', id='resultado') # The detailed table
         if not dividends_table:
             raise TableNotFoundError(f"Não foi possível encontrar a tabela de proventos detalhada (id='resultado') para '{ticker}'.")
@@ -206,29 +380,76 @@ class FundamentusScraper(GenericWebScraper):
                     por_acoes_str = cols[header_map['Por quantas ações']].get_text(strip=True)
 
                     value = float(valor_str.replace('.', '').replace(',', '.'))
-                    
-                    # Handle date parsing for 'Data' (Ex-Date)
-                    try:
-                        ex_date = datetime.strptime(data_str, '%d/%m/%Y').strftime('%Y-%m-%d')
-                    except ValueError:
-                        ex_date = None # Or raise DataParsingError
-
-                    # Handle date parsing for 'Data de Pagamento'
-                    try:
-                        payment_date = datetime.strptime(data_pagamento_str, '%d/%m/%Y').strftime('%Y-%m-%d')
-                    except ValueError:
-                        payment_date = None # Or raise DataParsingError if critical
+
+                    # Datas inválidas (ex: '-') viram None
+                    ex_date = parse_br_date(data_str)
+                    payment_date = parse_br_date(data_pagamento_str)
 
                     shares_per_action = int(por_acoes_str)
 
-                    monthly_data.append({
-                        "Data": ex_date,
-                        "Valor": value,
-                        "Tipo": tipo,
-                        "Data de Pagamento": payment_date,
-                        "Por quantas ações": shares_per_action
-                    })
+                    monthly_data.append(DividendEvent(ex_date, value, tipo, payment_date, shares_per_action))
                 except (ValueError, IndexError) as e:
                     print(f"Aviso: Não foi possível processar a linha mensal de provento: {e} - Data: '{data_str}', Valor: '{valor_str}'")
                     continue
         return monthly_data
+
+    def get_ticker_list(self) -> list[str]:
+        """
+        Descobre o universo de tickers a partir da página de listagem (resultado.php).
+        """
+        try:
+            tickers = self._fetch_extracted("resultado.php", self._extract_tickers, LISTING_STRAINER)
+        except (UpstreamUnavailableError, RateLimitedError):
+            raise
+        except ScrapingError as e:
+            raise ScrapingError("Não foi possível acessar a página de listagem de tickers.") from e
+        if not tickers:
+            raise TableNotFoundError("Nenhum ticker encontrado na página de listagem.")
+        # A lista também fica nos validadores da página; quem chama recebe uma cópia.
+        return list(tickers)
+
+    @staticmethod
+    def _extract_tickers(soup: BeautifulSoup) -> list[str]:
+        tickers = []
+        for link in soup.find_all('a', href=True):
+            match = TICKER_LINK_RE.search(link['href'])
+            if match and match.group(1).upper() not in tickers:
+                tickers.append(match.group(1).upper())
+        return tickers
+
+    def parse_details_content(self, content: bytes, ticker: str) -> dict:
+        """
+        Extrai os detalhes a partir do HTML bruto de detalhes.php.
+        """
+        return self._parse_company_details(self._parse_html(content, DETAILS_STRAINER), ticker)
+
+    def parse_proventos_content(self, content: bytes, ticker: str) -> dict:
+        """
+        Extrai as duas tabelas a partir do HTML bruto de proventos.php, sem passar pelo cache.
+        Retorna {"yearly": linhas ou None, "monthly": linhas ou None}; levanta o erro da
+        tabela detalhada se nenhuma das duas puder ser extraída.
+        """
+        soup = self._parse_html(content, PROVENTOS_STRAINER)
+        result = {}
+        error = None
+        for name, parser in (('yearly', self._parse_yearly_dividends), ('monthly', self._parse_monthly_dividends)):
+            try:
+                result[name] = parser(soup, ticker)
+            except ScrapingError as e:
+                result[name] = None
+                error = e
+        if result['yearly'] is None and result['monthly'] is None:
+            raise error
+        return result
+
+    def invalidate(self, ticker: str) -> int:
+        """
+        Descarta as entradas em cache de um ticker.
+        """
+        return self.cache.invalidate_ticker(ticker)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    def flight_stats(self) -> dict:
+        return self.flight.stats()
@@ -0,0 +1,260 @@
+import base64
+import json
+import threading
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from django.db.models import Max, OuterRef, Subquery
+
+from .extraction import normalize_label
+from .models import Company, CompanySnapshot
+from .normalization import hydrate, normalize_details
+
+# --- Screener sobre o Snapshot Normalizado de Todas as Empresas ---
+# O índice guarda, em arrays colunares, o snapshot mais recente de cada empresa:
+# colunas numéricas (datas como ordinais) em float64, com NaN para valores ausentes.
+# Filtros e ordenação são passadas vetorizadas; a paginação é por keyset
+# (valor da coluna de ordenação + ticker), então páginas seguintes não reprocessam
+# as anteriores e continuam estáveis quando o índice é reconstruído.
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+OPERATORS = {
+    'gt': np.greater,
+    'gte': np.greater_equal,
+    'lt': np.less,
+    'lte': np.less_equal,
+    'eq': np.equal,
+    'ne': np.not_equal,
+}
+# Parâmetros da query string que não são filtros.
+RESERVED_PARAMS = {'order', 'limit', 'cursor', 'fields', 'debug'}
+
+
+def _encode_cursor(value, ticker: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, ticker]).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(token: str):
+    try:
+        value, ticker = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return (None if value is None else float(value)), str(ticker)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido: use o valor de 'next' da página anterior.") from e
+
+
+def parse_filter_value(raw: str, is_date: bool = False) -> float:
+    """
+    Converte o valor de um filtro: '6%' vira 0.06, '0,06' e '0.06' viram 0.06 e,
+    em colunas de data, 'AAAA-MM-DD' vira o ordinal da data.
+    Percentuais passam por Decimal, como em normalization.parse_value, para que '14,8%'
+    resulte exatamente no float salvo (0.148, e não 0.14800000000000002).
+    """
+    raw = raw.strip()
+    try:
+        if is_date:
+            return float(date.fromisoformat(raw).toordinal())
+        if raw.endswith('%'):
+            return float(Decimal(raw[:-1].strip().replace(',', '.')) / 100)
+        return float(raw.replace(',', '.'))
+    except (ValueError, InvalidOperation) as e:
+        raise ValueError(f"Valor de filtro inválido: '{raw}'.") from e
+
+
+class ScreenerIndex:
+    """
+    Índice colunar em memória do snapshot normalizado mais recente de cada empresa.
+    """
+    def __init__(self, tickers: list[str], details: list[dict], version=None):
+        order = sorted(range(len(tickers)), key=tickers.__getitem__)
+        self.tickers = [tickers[i] for i in order]
+        self._ticker_array = np.array(self.tickers, dtype=str)
+        self.details = [details[i] for i in order]
+        self.version = version
+        self.built_at = time.time()
+        self.numeric = {}
+        self.dates = set()
+        self.text = {}
+
+        labels = {label for entry in self.details for label in entry}
+        for label in sorted(labels):
+            column = [entry.get(label) for entry in self.details]
+            present = [value for value in column if value is not None]
+            if present and all(isinstance(value, date) for value in present):
+                self.dates.add(label)
+                self.numeric[label] = np.array(
+                    [value.toordinal() if value is not None else np.nan for value in column], dtype=np.float64
+                )
+            elif present and all(isinstance(value, (int, float, Decimal)) for value in present):
+                self.numeric[label] = np.array(
+                    [float(value) if value is not None else np.nan for value in column], dtype=np.float64
+                )
+            else:
+                self.text[label] = np.array([str(value or '').upper() for value in column], dtype=object)
+
+    @classmethod
+    def from_database(cls, version=None) -> 'ScreenerIndex':
+        latest_snapshot = CompanySnapshot.objects.filter(company=OuterRef('pk')).order_by('-fetched_at')
+        companies = list(
+            Company.objects.annotate(snapshot_id=Subquery(latest_snapshot.values('pk')[:1]))
+            .filter(snapshot_id__isnull=False)
+            .values_list('ticker', 'snapshot_id')
+        )
+        snapshots = CompanySnapshot.objects.in_bulk([snapshot_id for _, snapshot_id in companies])
+        details = [
+            hydrate(snapshots[snapshot_id].values) if snapshots[snapshot_id].values
+            else normalize_details(snapshots[snapshot_id].data)
+            for _, snapshot_id in companies
+        ]
+        return cls([ticker for ticker, _ in companies], details, version)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def parse_query(self, params) -> dict:
+        """
+        Valida os parâmetros do screener a partir de um dicionário (ex: request.GET):
+        filtros `<indicador>__<op>=<valor>` (op: gt, gte, lt, lte, eq, ne; sem op vale eq),
+        `order` (ex: -div_yield), `limit` e `cursor`. Levanta ValueError se algum for inválido.
+        """
+        filters = []
+        for name, raw in params.items():
+            if name in RESERVED_PARAMS:
+                continue
+            field, _, op = name.rpartition('__') if '__' in name else (name, '', 'eq')
+            label = normalize_label(field)
+            if op not in OPERATORS:
+                raise ValueError(f"Operador inválido em '{name}': use {', '.join(OPERATORS)}.")
+            if label in self.numeric:
+                filters.append((label, op, parse_filter_value(raw, label in self.dates)))
+            elif label in self.text and op in ('eq', 'ne'):
+                filters.append((label, op, raw.strip().upper()))
+            elif label in self.text:
+                raise ValueError(f"O indicador '{field}' é texto e aceita apenas eq e ne.")
+            else:
+                raise ValueError(f"Indicador desconhecido: '{field}'.")
+
+        order = params.get('order') or 'ticker'
+        descending = order.startswith('-')
+        order_label = normalize_label(order.lstrip('-'))
+        if order_label != 'TICKER' and order_label not in self.numeric:
+            raise ValueError(f"Não é possível ordenar por '{order}': use 'ticker' ou um indicador numérico.")
+
+        try:
+            limit = int(params.get('limit') or DEFAULT_LIMIT)
+        except ValueError as e:
+            raise ValueError("O parâmetro 'limit' deve ser um inteiro.") from e
+        if not 0 < limit <= MAX_LIMIT:
+            raise ValueError(f"O parâmetro 'limit' deve estar entre 1 e {MAX_LIMIT}.")
+
+        cursor = _decode_cursor(params['cursor']) if params.get('cursor') else None
+        return {
+            'filters': filters, 'order': order_label, 'descending': descending,
+            'limit': limit, 'cursor': cursor,
+        }
+
+    def _sort_key(self, label: str, descending: bool):
+        """
+        Chave numérica de ordenação (invertida quando decrescente) e máscara de ausentes,
+        que ficam sempre no fim.
+        """
+        if label == 'TICKER':
+            key = np.arange(len(self), dtype=np.float64)
+            missing = np.zeros(len(self), dtype=bool)
+        else:
+            column = self.numeric[label]
+            missing = np.isnan(column)
+            key = np.where(missing, 0.0, column)
+        return (-key if descending else key), missing
+
+    def query(self, filters, order='TICKER', descending=False, limit=DEFAULT_LIMIT, cursor=None):
+        """
+        Aplica os filtros, ordena por `order` e retorna (linhas, próximo cursor ou None,
+        total de empresas que passam nos filtros, plano de execução com tempos).
+        """
+        plan = {"rows": len(self), "filters": [], "timings_ms": {}}
+        started = time.perf_counter()
+        mask = np.ones(len(self), dtype=bool)
+        for label, op, value in filters:
+            if label in self.numeric:
+                with np.errstate(invalid='ignore'):
+                    matched = OPERATORS[op](self.numeric[label], value)
+            else:
+                matched = (self.text[label] == value) if op == 'eq' else (self.text[label] != value)
+            mask &= matched
+            plan["filters"].append({
+                "field": label, "op": op, "value": value,
+                "matched": int(matched.sum()), "remaining": int(mask.sum()),
+            })
+        total = int(mask.sum())
+        filtered_at = time.perf_counter()
+
+        key, missing = self._sort_key(order, descending)
+        if cursor is not None:
+            mask &= self._after_cursor(key, missing, order, descending, cursor)
+        candidates = np.flatnonzero(mask)
+        ranked = candidates[np.lexsort((candidates, key[candidates], missing[candidates]))]
+        page = ranked[:limit]
+        sorted_at = time.perf_counter()
+
+        rows = [{"ticker": self.tickers[i], **self.details[i]} for i in page]
+        next_cursor = None
+        if len(ranked) > limit:
+            last = page[-1]
+            value = None if order == 'TICKER' or missing[last] else float(self.numeric[order][last])
+            next_cursor = _encode_cursor(value, self.tickers[last])
+
+        plan["order"] = {"field": order, "descending": descending}
+        plan["timings_ms"] = {
+            "filter": round((filtered_at - started) * 1000, 3),
+            "sort": round((sorted_at - filtered_at) * 1000, 3),
+            "page": round((time.perf_counter() - sorted_at) * 1000, 3),
+        }
+        return rows, next_cursor, total, plan
+
+    def _after_cursor(self, key, missing, order, descending, cursor):
+        value, ticker = cursor
+        positions = np.arange(len(self))
+        after_ticker = positions >= np.searchsorted(self._ticker_array, ticker, side='right')
+        if order == 'TICKER':
+            return positions < np.searchsorted(self._ticker_array, ticker, side='left') if descending else after_ticker
+        if value is None:
+            return missing & after_ticker
+        cursor_key = -value if descending else value
+        return missing | (key > cursor_key) | ((key == cursor_key) & after_ticker)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_version():
+    """
+    Versão dos dados salvos: o maior id de snapshot, que cresce a cada coleta de detalhes
+    em qualquer processo.
+    """
+    return CompanySnapshot.objects.aggregate(version=Max('pk'))['version']
+
+
+def get_screener_index() -> tuple[ScreenerIndex, bool]:
+    """
+    Retorna o índice do processo, reconstruindo-o quando há snapshots novos no banco.
+    O segundo valor indica se houve reconstrução nesta chamada.
+    """
+    global _index
+    version = index_version()
+    if _index is not None and _index.version == version:
+        return _index, False
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = ScreenerIndex.from_database(version)
+            return _index, True
+    return _index, False
+
+
+def reset_screener_index():
+    global _index
+    _index = None
@@ -0,0 +1,456 @@
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from . import records
+from .cache import MISSING, TTLCache
+from .calculator import SERIES_BUILDERS, DividendSeries
+from .changes import reserve_sequence
+from .errors import UpstreamUnavailableError
+from .normalization import hydrate, normalize_details
+from .models import Company, CompanySnapshot, DividendChange, DividendEvent, YearlyDividend
+from .scheduler import RefreshScheduler, get_scheduler_config
+from .scrapper import GenericWebScraper
+
+# --- Serviço de Leitura com Persistência (read-through) ---
+
+DEFAULT_MAX_AGE = {
+    'DETAILS': 15 * 60,
+    'DIVIDENDS': 24 * 60 * 60,
+}
+
+
+def get_max_age(kind: str) -> timedelta:
+    """
+    Idade máxima (settings.STOCK_DATA_MAX_AGE) para considerar um dado salvo como fresco.
+    """
+    config = dict(DEFAULT_MAX_AGE)
+    config.update(getattr(settings, 'STOCK_DATA_MAX_AGE', {}))
+    return timedelta(seconds=config[kind])
+
+
+def get_stale_max_age(kind: str) -> timedelta:
+    """
+    Janela extra (SCRAPER_SCHEDULER['STALE_MAX_AGE']) em que um dado vencido ainda é servido.
+    """
+    stale = get_scheduler_config()['STALE_MAX_AGE']
+    return timedelta(seconds=stale['DETAILS' if kind == 'details' else 'DIVIDENDS'])
+
+
+class StockDataService:
+    """
+    Serve detalhes e proventos a partir do banco quando estão frescos o suficiente,
+    e recorre ao scraper apenas em caso de ausência ou dado vencido. Com um
+    RefreshScheduler, dados pouco vencidos são servidos na hora e atualizados em
+    segundo plano (stale-while-revalidate).
+    Cada atualização grava com um único bulk upsert por tabela.
+    As séries de proventos indexadas (DividendSeries) ficam em memória por ticker,
+    marcadas com o instante da coleta de que vieram, e só são reconstruídas quando
+    uma nova coleta é salva (por qualquer processo).
+    """
+    def __init__(self, scraper: GenericWebScraper, scheduler: RefreshScheduler = None):
+        self.scraper = scraper
+        self.scheduler = scheduler
+        self.stale_served = 0
+        self.series = TTLCache(
+            maxsize=getattr(settings, 'SCRAPER_CACHE', {}).get('MAXSIZE', 512),
+            ttl=get_max_age('DIVIDENDS').total_seconds(),
+        )
+
+    @classmethod
+    def with_background_refresh(cls, scraper: GenericWebScraper, workers: int = None) -> 'StockDataService':
+        """
+        Cria um serviço que serve dados vencidos (dentro de STALE_MAX_AGE) imediatamente
+        e agenda a atualização deles em um RefreshScheduler próprio.
+        """
+        service = cls(scraper)
+        service.scheduler = RefreshScheduler({
+            'details': service.refresh_details,
+            'yearly': service.refresh_yearly_dividends,
+            'monthly': service.refresh_monthly_dividends,
+        }, workers=workers)
+        return service
+
+    # --- Leitura ---
+
+    def get_company_details(self, ticker: str, raw: bool = False) -> dict:
+        """
+        Indicadores normalizados (ver normalization.py); com `raw`, os textos originais da página.
+        """
+        details = self.load_details(ticker, stale_kind='details', raw=raw)
+        if details is None:
+            details = self._refresh_or_stored(self.refresh_details, self.load_details, ticker, raw=raw)
+        return details
+
+    def get_yearly_dividends(self, ticker: str) -> list[records.YearlyDividend]:
+        yearly_data = self.load_yearly_dividends(ticker, stale_kind='yearly')
+        if yearly_data is None:
+            yearly_data = self._refresh_or_stored(self.refresh_yearly_dividends, self.load_yearly_dividends, ticker)
+        return yearly_data
+
+    def get_monthly_dividends(self, ticker: str) -> list[records.DividendEvent]:
+        monthly_data = self.load_monthly_dividends(ticker, stale_kind='monthly')
+        if monthly_data is None:
+            monthly_data = self._refresh_or_stored(self.refresh_monthly_dividends, self.load_monthly_dividends, ticker)
+        return monthly_data
+
+    def get_yearly_series(self, ticker: str) -> DividendSeries:
+        return self._get_series(ticker, 'yearly', self.get_yearly_dividends)
+
+    def get_monthly_series(self, ticker: str) -> DividendSeries:
+        return self._get_series(ticker, 'monthly', self.get_monthly_dividends)
+
+    def _get_series(self, ticker: str, kind: str, load) -> DividendSeries:
+        series = self.load_series(ticker, kind)
+        if series is None:
+            # A versão é lida depois de `load`, que pode ter acabado de coletar e salvar os dados.
+            data = load(ticker)
+            series = self.build_series(ticker, kind, data, self.fetched_at(ticker, kind))
+        return series
+
+    def load_series(self, ticker: str, kind: str) -> DividendSeries | None:
+        """
+        Série indexada de `kind` ('yearly' ou 'monthly') já construída a partir dos dados
+        salvos atuais, ou None se não houver, se uma coleta mais nova foi salva desde
+        então ou se os dados estiverem vencidos (ver load_monthly_dividends).
+        """
+        cached = self.series.get((kind, ticker.upper()))
+        if cached is MISSING:
+            return None
+        version, series = cached
+        field = f'{kind}_fetched_at'
+        company = self._fresh_company(ticker, field, get_max_age('DIVIDENDS'), stale_kind=kind)
+        if company is None or getattr(company, field) != version:
+            return None
+        return series
+
+    def build_series(self, ticker: str, kind: str, data: list, version) -> DividendSeries:
+        """
+        Indexa `data` e guarda a série do ticker marcada com `version` (o instante da coleta).
+        """
+        series = SERIES_BUILDERS[kind](data)
+        self.series.set((kind, ticker.upper()), (version, series))
+        return series
+
+    def _refresh_or_stored(self, refresh, load, ticker: str, **kwargs):
+        """
+        Atualiza pelo scraper; se o site de origem estiver indisponível (circuit breaker
+        aberto), serve o último dado salvo, de qualquer idade, em vez de falhar.
+        """
+        try:
+            return refresh(ticker, **kwargs)
+        except UpstreamUnavailableError:
+            stored = load(ticker, max_age=timedelta.max, **kwargs)
+            if stored is None:
+                raise
+            self.stale_served += 1
+            return stored
+
+    def load_details(self, ticker: str, max_age: timedelta = None, stale_kind: str = None,
+                     raw: bool = False) -> dict | None:
+        """
+        Retorna o snapshot salvo mais recente (normalizado, ou bruto com `raw`), ou None
+        se não existir ou estiver vencido.
+        Com `stale_kind` e um scheduler configurado, um dado vencido há pouco é retornado
+        mesmo assim e sua atualização é agendada em segundo plano.
+        """
+        company = self._fresh_company(ticker, 'details_fetched_at', max_age or get_max_age('DETAILS'), stale_kind)
+        if company is None:
+            return None
+        snapshot = company.snapshots.order_by('-fetched_at').first()
+        if snapshot is None:
+            return None
+        if raw:
+            return snapshot.data
+        # Snapshots gravados antes da normalização não têm `values`.
+        return hydrate(snapshot.values) if snapshot.values else normalize_details(snapshot.data)
+
+    def load_yearly_dividends(self, ticker: str, max_age: timedelta = None,
+                              stale_kind: str = None) -> list[records.YearlyDividend] | None:
+        company = self._fresh_company(ticker, 'yearly_fetched_at', max_age or get_max_age('DIVIDENDS'), stale_kind)
+        if company is None:
+            return None
+        return [
+            records.YearlyDividend(year, value)
+            for year, value in company.yearly_dividends.order_by('-year').values_list('year', 'value')
+        ]
+
+    def load_monthly_dividends(self, ticker: str, max_age: timedelta = None,
+                               stale_kind: str = None) -> list[records.DividendEvent] | None:
+        company = self._fresh_company(ticker, 'monthly_fetched_at', max_age or get_max_age('DIVIDENDS'), stale_kind)
+        if company is None:
+            return None
+        rows = company.dividend_events.order_by('-ex_date', 'occurrence').values_list(
+            'ex_date', 'value', 'dividend_type', 'payment_date', 'shares_ratio'
+        )
+        return [records.DividendEvent(*row) for row in rows]
+
+    def fetched_at(self, ticker: str, kind: str):
+        """
+        Instante da última coleta salva de `kind` ('details', 'yearly' ou 'monthly'), ou None.
+        """
+        return Company.objects.filter(ticker=ticker.upper()).values_list(f'{kind}_fetched_at', flat=True).first()
+
+    def load_monthly_dividends_many(self, tickers: list[str], max_age: timedelta = None,
+                                    stale_kind: str = None) -> dict[str, list[records.DividendEvent]]:
+        """
+        Versão em lote de load_monthly_dividends: duas consultas para todos os tickers.
+        Retorna {ticker: eventos} apenas dos tickers com dados salvos frescos (ou pouco
+        vencidos, com `stale_kind` e um scheduler); os demais ficam de fora.
+        """
+        max_age = max_age or get_max_age('DIVIDENDS')
+        companies = {
+            company.pk: company.ticker
+            for company in Company.objects.filter(ticker__in={ticker.upper() for ticker in tickers})
+            if self._is_fresh(company, 'monthly_fetched_at', max_age, stale_kind)
+        }
+        loaded = {ticker: [] for ticker in companies.values()}
+        rows = DividendEvent.objects.filter(company_id__in=companies).order_by(
+            'company_id', '-ex_date', 'occurrence'
+        ).values_list('company_id', 'ex_date', 'value', 'dividend_type', 'payment_date', 'shares_ratio')
+        for company_id, *row in rows:
+            loaded[companies[company_id]].append(records.DividendEvent(*row))
+        return loaded
+
+    def _fresh_company(self, ticker: str, field: str, max_age: timedelta, stale_kind: str = None) -> Company | None:
+        company = Company.objects.filter(ticker=ticker.upper()).first()
+        if company is None or not self._is_fresh(company, field, max_age, stale_kind):
+            return None
+        return company
+
+    def _is_fresh(self, company: Company, field: str, max_age: timedelta, stale_kind: str = None) -> bool:
+        fetched_at = getattr(company, field)
+        if fetched_at is None:
+            return False
+        age = timezone.now() - fetched_at
+        if age <= max_age:
+            return True
+        if stale_kind is not None and self.scheduler is not None and age <= max_age + get_stale_max_age(stale_kind):
+            self.scheduler.enqueue(stale_kind, company.ticker)
+            self.stale_served += 1
+            return True
+        return False
+
+    # --- Atualização ---
+
+    def refresh_details(self, ticker: str, raw: bool = False) -> dict:
+        details = self.scraper.get_company_details(ticker)
+        normalized = self.store_details(ticker, details)
+        return details if raw else normalized
+
+    def refresh_yearly_dividends(self, ticker: str) -> list[records.YearlyDividend]:
+        yearly_data = self.scraper.get_yearly_dividends(ticker)
+        self.store_yearly_dividends(ticker, yearly_data)
+        return yearly_data
+
+    def refresh_monthly_dividends(self, ticker: str) -> list[records.DividendEvent]:
+        monthly_data = self.scraper.get_monthly_dividends(ticker)
+        self.store_monthly_dividends(ticker, monthly_data)
+        return monthly_data
+
+    @transaction.atomic
+    def store_details(self, ticker: str, details: dict) -> dict:
+        """
+        Grava o snapshot bruto junto com sua versão normalizada, que é retornada.
+        Se a página não mudou desde o último snapshot, só o fetched_at dele avança: a
+        tabela guarda uma linha por versão dos indicadores, não uma por coleta.
+        """
+        now = timezone.now()
+        normalized = normalize_details(details)
+        company = self._company_for_update(ticker)
+        latest = company.snapshots.order_by('-fetched_at').only('pk', 'data').first()
+        # Compara na forma em que o JSONField devolve os dados (Decimal e date como texto).
+        if latest is not None and latest.data == json.loads(json.dumps(details, cls=DjangoJSONEncoder)):
+            CompanySnapshot.objects.filter(pk=latest.pk).update(fetched_at=now)
+        else:
+            CompanySnapshot.objects.create(company=company, data=details, values=normalized, fetched_at=now)
+        Company.objects.filter(pk=company.pk).update(details_fetched_at=now)
+        return normalized
+
+    @transaction.atomic
+    def store_yearly_dividends(self, ticker: str, yearly_data: list[records.YearlyDividend]):
+        company = self._company_for_update(ticker)
+        YearlyDividend.objects.bulk_create(
+            [YearlyDividend(company=company, year=entry.year, value=entry.value) for entry in yearly_data],
+            update_conflicts=True,
+            unique_fields=['company', 'year'],
+            update_fields=['value'],
+        )
+        Company.objects.filter(pk=company.pk).update(yearly_fetched_at=timezone.now())
+
+    @transaction.atomic
+    def store_monthly_dividends(self, ticker: str, monthly_data: list[records.DividendEvent]) -> list[DividendChange]:
+        """
+        Compara os eventos coletados com os salvos e grava apenas os novos e os
+        corrigidos, registrando cada um no feed de alterações (DividendChange).
+        A empresa fica travada durante a comparação, para que ingestões concorrentes do
+        mesmo ticker (view, scheduler, crawler, lote) não registrem a mesma alteração.
+        Retorna as alterações registradas.
+        """
+        now = timezone.now()
+        company = self._company_for_update(ticker)
+        stored = {
+            (ex_date, dividend_type, occurrence): (payment_date, value, shares_ratio)
+            for ex_date, dividend_type, occurrence, payment_date, value, shares_ratio
+            in company.dividend_events.values_list(
+                'ex_date', 'dividend_type', 'occurrence', 'payment_date', 'value', 'shares_ratio'
+            )
+        }
+        changed, changes = diff_dividend_events(stored, build_dividend_events(company, monthly_data), now)
+        if changed:
+            DividendEvent.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['company', 'ex_date', 'dividend_type', 'occurrence'],
+                update_fields=['payment_date', 'value', 'shares_ratio'],
+            )
+            first = reserve_sequence(len(changes))
+            for offset, change in enumerate(changes):
+                change.seq = first + offset
+            DividendChange.objects.bulk_create(changes)
+        Company.objects.filter(pk=company.pk).update(monthly_fetched_at=now)
+        return changes
+
+    def _company_for_update(self, ticker: str) -> Company:
+        """
+        Empresa do ticker (criada se preciso), com a linha travada até o fim da transação.
+        """
+        company, _ = Company.objects.get_or_create(ticker=ticker.upper())
+        return Company.objects.select_for_update().get(pk=company.pk)
+
+
+class AsyncStockDataService:
+    """
+    Contraparte assíncrona do StockDataService: o acesso ao banco roda em threads via
+    sync_to_async e o scraping usa um AsyncGenericWebScraper.
+    """
+    def __init__(self, service: StockDataService, scraper):
+        self.service = service
+        self.scraper = scraper
+
+    async def get_company_details(self, ticker: str, raw: bool = False) -> dict:
+        details = await sync_to_async(self.service.load_details)(ticker, stale_kind='details', raw=raw)
+        if details is None:
+            scraped = await self.scraper.get_company_details(ticker)
+            normalized = await sync_to_async(self.service.store_details)(ticker, scraped)
+            details = scraped if raw else normalized
+        return details
+
+    async def get_yearly_dividends(self, ticker: str) -> list[records.YearlyDividend]:
+        yearly_data = await sync_to_async(self.service.load_yearly_dividends)(ticker, stale_kind='yearly')
+        if yearly_data is None:
+            yearly_data = await self.scraper.get_yearly_dividends(ticker)
+            await sync_to_async(self.service.store_yearly_dividends)(ticker, yearly_data)
+        return yearly_data
+
+    async def get_monthly_dividends(self, ticker: str) -> list[records.DividendEvent]:
+        monthly_data = await sync_to_async(self.service.load_monthly_dividends)(ticker, stale_kind='monthly')
+        if monthly_data is None:
+            monthly_data = await self.scraper.get_monthly_dividends(ticker)
+            await sync_to_async(self.service.store_monthly_dividends)(ticker, monthly_data)
+        return monthly_data
+
+    async def fetched_at(self, ticker: str, kind: str):
+        return await sync_to_async(self.service.fetched_at)(ticker, kind)
+
+    async def get_yearly_series(self, ticker: str) -> DividendSeries:
+        return await self._get_series(ticker, 'yearly', self.get_yearly_dividends)
+
+    async def get_monthly_series(self, ticker: str) -> DividendSeries:
+        return await self._get_series(ticker, 'monthly', self.get_monthly_dividends)
+
+    async def _get_series(self, ticker: str, kind: str, load) -> DividendSeries:
+        series = await sync_to_async(self.service.load_series)(ticker, kind)
+        if series is None:
+            data = await load(ticker)
+            version = await self.fetched_at(ticker, kind)
+            series = self.service.build_series(ticker, kind, data, version)
+        return series
+
+
+def build_dividend_events(company: Company, monthly_data: list[records.DividendEvent]) -> list[DividendEvent]:
+    """
+    Converte os registros de get_monthly_dividends em DividendEvent (modelo) não salvos.
+    Eventos sem data-com válida são descartados, pois não têm chave natural.
+    """
+    events = []
+    occurrences = {}
+    for event in monthly_data:
+        if event.ex_date is None:
+            continue
+        key = (event.ex_date, event.dividend_type)
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        events.append(DividendEvent(
+            company=company,
+            ex_date=event.ex_date,
+            payment_date=event.payment_date,
+            dividend_type=event.dividend_type,
+            value=event.value,
+            shares_ratio=event.shares_ratio,
+            occurrence=occurrence,
+        ))
+    return events
+
+
+def diff_dividend_events(stored: dict, events: list[DividendEvent], recorded_at) -> tuple[list[DividendEvent], list[DividendChange]]:
+    """
+    Separa, entre os eventos de build_dividend_events, os que não existem em `stored`
+    ((data-com, tipo, ocorrência) -> (pagamento, valor, proporção)) e os que mudaram.
+    Dentro de cada (data-com, tipo) as linhas são comparadas como multiconjunto: se a
+    página só reordenar linhas idênticas, nada muda. As linhas sem correspondente exato
+    são pareadas, em ordem, com as salvas que sobraram (correções, que mantêm a ocorrência
+    salva) e o restante vira inserção em uma ocorrência ainda livre.
+    Retorna esses eventos e as entradas de DividendChange correspondentes, ainda não salvas.
+    Eventos salvos que sumiram da página não são removidos nem registrados.
+    """
+    stored_groups = {}
+    for (ex_date, dividend_type, occurrence), row in sorted(stored.items(), key=lambda item: item[0][2]):
+        stored_groups.setdefault((ex_date, dividend_type), []).append((occurrence, row))
+    scraped_groups = {}
+    for event in events:
+        scraped_groups.setdefault((event.ex_date, event.dividend_type), []).append(event)
+
+    changed = []
+    changes = []
+    for key, group in scraped_groups.items():
+        unmatched = list(stored_groups.get(key, ()))
+        next_free = max((occurrence for occurrence, _ in unmatched), default=-1) + 1
+        pending = []
+        for event in group:
+            current = (event.payment_date, event.value, event.shares_ratio)
+            match = next((i for i, (_, row) in enumerate(unmatched) if row == current), None)
+            if match is None:
+                pending.append(event)
+            else:
+                del unmatched[match]
+        for event in pending:
+            if unmatched:
+                event.occurrence, previous = unmatched.pop(0)
+            else:
+                event.occurrence, previous = next_free, None
+                next_free += 1
+            current = (event.payment_date, event.value, event.shares_ratio)
+            changed.append(event)
+            changes.append(DividendChange(
+                company=event.company,
+                kind=DividendChange.INSERT if previous is None else DividendChange.UPDATE,
+                ex_date=event.ex_date,
+                dividend_type=event.dividend_type,
+                occurrence=event.occurrence,
+                payment_date=event.payment_date,
+                value=event.value,
+                shares_ratio=event.shares_ratio,
+                previous={} if previous is None else {
+                    field: old
+                    for field, old, new in zip(('payment_date', 'value', 'shares_ratio'), previous, current)
+                    if old != new
+                },
+                recorded_at=recorded_at,
+            ))
+    return changed, changes
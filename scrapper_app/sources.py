@@ -0,0 +1,295 @@
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .errors import ScrapingError, TickerNotFoundError
+from .records import DividendEvent, YearlyDividend
+from .scrapper import GenericWebScraper
+
+# --- Registro de Fontes de Dados com Requisições Hedged ---
+# Cada tipo de dado ('details', 'yearly', 'monthly') tem uma lista de fontes
+# (implementações de GenericWebScraper) ordenada por prioridade. A busca começa pela
+# fonte principal; se ela não responder dentro do p95 da sua própria latência, a
+# próxima fonte é disparada em paralelo e vale a primeira resposta bem-sucedida.
+# Todas as fontes devolvem o mesmo formato: registros de records.py para proventos e
+# rótulos de normalization.DETAILS_SCHEMA para detalhes.
+
+KINDS = ('details', 'yearly', 'monthly')
+METHODS = {
+    'details': 'get_company_details',
+    'yearly': 'get_yearly_dividends',
+    'monthly': 'get_monthly_dividends',
+}
+
+DEFAULT_SOURCES = {
+    'SOURCES': [
+        {'NAME': 'fundamentus', 'CLASS': 'scrapper_app.scrapper.FundamentusScraper', 'PRIORITY': 0},
+    ],
+    'HEDGE': True,
+    'HEDGE_PERCENTILE': 95,
+    # Atraso usado enquanto a fonte não tem HEDGE_MIN_SAMPLES latências registradas.
+    'HEDGE_DEFAULT_DELAY': 1.0,
+    'HEDGE_MIN_DELAY': 0.05,
+    'HEDGE_MIN_SAMPLES': 20,
+    'WORKERS': 8,
+}
+
+
+def get_sources_config() -> dict:
+    config = dict(DEFAULT_SOURCES)
+    config.update(getattr(settings, 'SCRAPER_SOURCES', {}))
+    return config
+
+
+class LatencyTracker:
+    """
+    Janela deslizante das últimas `size` latências de sucesso de uma fonte.
+    """
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, percent: float) -> float | None:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class Source:
+    """
+    Uma fonte registrada: o scraper, sua prioridade (menor vem primeiro) e os tipos de
+    dado que ela atende, com latências e contadores por tipo.
+    """
+    def __init__(self, name: str, scraper, priority: int = 0, kinds=KINDS):
+        self.name = name
+        self.scraper = scraper
+        self.priority = priority
+        self.kinds = tuple(kinds)
+        self.latency = {kind: LatencyTracker() for kind in self.kinds}
+        self.stats = {kind: {"calls": 0, "wins": 0, "errors": 0, "hedged": 0} for kind in self.kinds}
+        self._lock = threading.Lock()
+
+    def count(self, kind: str, counter: str):
+        with self._lock:
+            self.stats[kind][counter] += 1
+
+    def call(self, kind: str, ticker: str):
+        self.count(kind, "calls")
+        started = time.perf_counter()
+        try:
+            result = getattr(self.scraper, METHODS[kind])(ticker)
+        except Exception:
+            self.count(kind, "errors")
+            raise
+        self.latency[kind].observe(time.perf_counter() - started)
+        return result
+
+    def snapshot(self, kind: str, hedge_delay: float) -> dict:
+        p95 = self.latency[kind].percentile(95)
+        return dict(
+            self.stats[kind],
+            p95_ms=round(p95 * 1000, 1) if p95 is not None else None,
+            hedge_delay_ms=round(hedge_delay * 1000, 1),
+        )
+
+
+class SourceRegistry:
+    """
+    Fontes configuradas por tipo de dado, com a mesma interface de GenericWebScraper
+    (get_company_details, get_yearly_dividends, get_monthly_dividends), de modo que o
+    StockDataService a usa como se fosse um único scraper.
+    """
+    def __init__(self, config: dict = None):
+        self.config = config if config is not None else get_sources_config()
+        self.sources = []
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> 'SourceRegistry':
+        """
+        Instancia as fontes de settings.SCRAPER_SOURCES['SOURCES'] (NAME, CLASS,
+        PRIORITY e, opcionais, KINDS e OPTIONS com os argumentos do construtor).
+        """
+        registry = cls()
+        for entry in registry.config['SOURCES']:
+            scraper = import_string(entry['CLASS'])(**entry.get('OPTIONS', {}))
+            registry.register(entry['NAME'], scraper, entry.get('PRIORITY', 0), entry.get('KINDS', KINDS))
+        return registry
+
+    def register(self, name: str, scraper, priority: int = 0, kinds=KINDS) -> Source:
+        if any(source.name == name for source in self.sources):
+            raise ValueError(f"Fonte já registrada: '{name}'.")
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Tipos de dado desconhecidos: {', '.join(sorted(unknown))}.")
+        source = Source(name, scraper, priority, kinds)
+        self.sources.append(source)
+        self.sources.sort(key=lambda entry: entry.priority)
+        return source
+
+    def get(self, name: str):
+        """
+        Scraper registrado com `name`, ou None.
+        """
+        return next((source.scraper for source in self.sources if source.name == name), None)
+
+    def first_of(self, scraper_class):
+        """
+        Scraper de maior prioridade que é instância de `scraper_class`, ou None.
+        """
+        return next((source.scraper for source in self.sources if isinstance(source.scraper, scraper_class)), None)
+
+    def for_kind(self, kind: str) -> list[Source]:
+        return [source for source in self.sources if kind in source.kinds]
+
+    def hedge_delay(self, source: Source, kind: str) -> float:
+        """
+        Quanto esperar pela fonte antes de disparar a próxima: o percentil configurado
+        (p95) das latências recentes dela, ou HEDGE_DEFAULT_DELAY sem amostras suficientes.
+        """
+        tracker = source.latency[kind]
+        if len(tracker) < self.config['HEDGE_MIN_SAMPLES']:
+            return self.config['HEDGE_DEFAULT_DELAY']
+        return max(self.config['HEDGE_MIN_DELAY'], tracker.percentile(self.config['HEDGE_PERCENTILE']))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.config['WORKERS'], thread_name_prefix='source-hedge'
+                    )
+        return self._executor
+
+    def fetch(self, kind: str, ticker: str):
+        """
+        Busca `kind` de `ticker` nas fontes do tipo, em ordem de prioridade. Uma fonte
+        que falha passa a vez para a próxima na hora; uma que demora mais que seu
+        hedge_delay ganha a concorrência da próxima. Se todas falharem, levanta o erro
+        da fonte de maior prioridade.
+        """
+        sources = self.for_kind(kind)
+        if not sources:
+            raise ScrapingError(f"Nenhuma fonte configurada para '{kind}'.")
+        if len(sources) == 1:
+            result = sources[0].call(kind, ticker)
+            sources[0].count(kind, "wins")
+            return result
+
+        executor = self._get_executor()
+        pending = {}
+        errors = []
+        queue = list(sources)
+
+        def launch():
+            source = queue.pop(0)
+            # Com uma cópia do contexto, as etapas da fonte entram no Server-Timing da requisição.
+            pending[executor.submit(contextvars.copy_context().run, source.call, kind, ticker)] = source
+            return source
+
+        current = launch()
+        while pending:
+            timeout = self.hedge_delay(current, kind) if queue and self.config['HEDGE'] else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Nenhuma resposta dentro do p95: dispara a próxima fonte (hedge).
+                current.count(kind, "hedged")
+                current = launch()
+                continue
+            failed = False
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append((source.priority, e))
+                    failed = True
+                    continue
+                source.count(kind, "wins")
+                return result
+            if failed and queue:
+                # A falha passa a vez na hora, mesmo com outra fonte ainda em andamento, e
+                # o próximo hedge_delay é o da fonte recém-disparada, não o da que falhou.
+                current = launch()
+
+        errors.sort(key=lambda entry: entry[0])
+        raise errors[0][1]
+
+    def get_company_details(self, ticker: str) -> dict:
+        return self.fetch('details', ticker)
+
+    def get_yearly_dividends(self, ticker: str) -> list[YearlyDividend]:
+        return self.fetch('yearly', ticker)
+
+    def get_monthly_dividends(self, ticker: str) -> list[DividendEvent]:
+        return self.fetch('monthly', ticker)
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "name": source.name,
+                "priority": source.priority,
+                "kinds": {kind: source.snapshot(kind, self.hedge_delay(source, kind)) for kind in source.kinds},
+            }
+            for source in self.sources
+        ]
+
+
+# --- Fonte Local (fixtures) ---
+class LocalFixtureScraper(GenericWebScraper):
+    """
+    Fonte que lê os dados de arquivos `<TICKER>.expected.json` (chaves 'details',
+    'yearly' e 'monthly', no mesmo formato da API) em vez de acessar a rede.
+    `latency` simula a demora de um site e `failures` força erros, para testar o
+    roteamento e o hedging sem depender do Fundamentus.
+    """
+    def __init__(self, directory: str = None, data: dict = None, latency: float = 0.0, failures: int = 0):
+        super().__init__(base_url='local://fixtures')
+        self.directory = Path(directory) if directory else None
+        self.data = {ticker.upper(): entry for ticker, entry in (data or {}).items()}
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+
+    def _entry(self, ticker: str) -> dict:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failures:
+            self.failures -= 1
+            raise ScrapingError(f"Falha simulada da fonte local para {ticker}.")
+        ticker = ticker.upper()
+        if ticker not in self.data and self.directory is not None:
+            path = self.directory / f"{ticker}.expected.json"
+            if path.exists():
+                self.data[ticker] = json.loads(path.read_text(encoding='utf-8'))
+        if ticker not in self.data:
+            raise TickerNotFoundError(f"Ticker {ticker} não encontrado na fonte local.")
+        return self.data[ticker]
+
+    def get_company_details(self, ticker: str) -> dict:
+        return dict(self._entry(ticker)['details'])
+
+    def get_yearly_dividends(self, ticker: str) -> list[YearlyDividend]:
+        return [YearlyDividend.from_dict(entry) for entry in self._entry(ticker)['yearly']]
+
+    def get_monthly_dividends(self, ticker: str) -> list[DividendEvent]:
+        return [DividendEvent.from_dict(entry) for entry in self._entry(ticker)['monthly']]
@@ -1,3 +1,1284 @@
-from django.test import TestCase
+import asyncio
+import dataclasses
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from . import benchmarks, records, views
+from .async_scrapper import AsyncFundamentusScraper, get_async_client
+from .batch import error_entry, run_batch
+from .benchmarks import CORPUS, BenchmarkError, ScraperOnlyService, bench_parsing, bench_views, compare
+from .cache import MISSING, DiskCache, TieredCache, TTLCache
+from .calculator import DividendSeries, months_ago
+from .errors import DataParsingError, ScrapingError, TableNotFoundError, TickerNotFoundError, UpstreamUnavailableError
+from . import metrics
+from .extraction import DETAILS_STRAINER, PROVENTOS_STRAINER, parse_html
+from .crawler import CrawlCheckpoint
+from .models import Company, CompanySnapshot, DividendEvent, FeedSequence
+from .normalization import normalize_details
+from .parsing import ParsePipeline
+from .portfolio import PortfolioIncome
+from .rankings import DividendRankingEngine, get_ranking_engine, reset_ranking_engine
+from .records import DividendEvent as DividendRecord, YearlyDividend as YearlyRecord, serialize
+from .scheduler import RefreshScheduler, ScheduledJob
+from .screener import reset_screener_index
+from .scrapper import FundamentusScraper
+from .services import AsyncStockDataService, StockDataService
+from .singleflight import SingleFlight
+from .sources import DEFAULT_SOURCES, LocalFixtureScraper, SourceRegistry
+from .throttle import DEFAULT_THROTTLE, AdaptiveConcurrencyLimiter, CircuitBreaker, SharedTokenBucket, UpstreamGuard
+from . import scrapper
+
+TESTDATA_DIR = Path(__file__).resolve().parent / 'testdata'
+
+
+def load_fixture(name: str) -> str:
+    return (TESTDATA_DIR / name).read_text(encoding='utf-8')
+
+
+def load_expected_records():
+    expected = json.loads(load_fixture('PETR4.expected.json'))
+    return (
+        [DividendRecord.from_dict(entry) for entry in expected['monthly']],
+        [YearlyRecord.from_dict(entry) for entry in expected['yearly']],
+    )
+
+
+class FixtureHTTPServer:
+    """
+    Servidor HTTP local que serve as páginas gravadas em testdata/ no lugar do Fundamentus.
+    Tickers em `missing` recebem 404; If-None-Match com o ETag atual recebe 304.
+    """
+    pages = {
+        '/resultado.php': 'resultado.html',
+        '/detalhes.php': 'detalhes_PETR4.html',
+        '/proventos.php': 'proventos_PETR4.html',
+    }
+
+    def __init__(self, missing=('XXXX3',)):
+        server = self
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                page = server.pages.get(self.path.split('?')[0])
+                if page is None or any(ticker in self.path for ticker in missing):
+                    self.send_error(404)
+                    return
+                body = load_fixture(page).encode('utf-8')
+                etag = f'"{len(body)}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}/"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FixtureScraperMixin:
+    """
+    Substitui o _fetch_page do scraper por páginas gravadas em testdata/.
+    """
+    pages = {
+        'detalhes.php': 'detalhes_PETR4.html',
+        'proventos.php': 'proventos_PETR4.html',
+    }
+
+    def make_scraper(self, **kwargs):
+        scraper = FundamentusScraper(**kwargs)
+        self.fetch_count = 0
+
+        def fake_fetch(path):
+            self.fetch_count += 1
+            response = requests.Response()
+            response.status_code = 200
+            response._content = load_fixture(self.pages[path.split('?')[0]]).encode('utf-8')
+            return response, MISSING
+
+        scraper._fetch_page = fake_fetch
+        return scraper
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(('a', 'PETR4'), 1)
+        cache.set(('b', 'PETR4'), 2)
+        self.assertEqual(cache.get(('a', 'PETR4')), 1)
+        cache.set(('c', 'VALE3'), 3)
+        self.assertIs(cache.get(('b', 'PETR4')), MISSING)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 1, 1))
+
+    def test_ttl_expiration(self):
+        now = [0.0]
+        cache = TTLCache(maxsize=10, ttl=5, clock=lambda: now[0])
+        cache.set(('a', 'PETR4'), 1)
+        now[0] = 6.0
+        self.assertIs(cache.get(('a', 'PETR4')), MISSING)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_invalidate_ticker(self):
+        cache = TTLCache()
+        cache.set(('a', 'PETR4'), 1)
+        cache.set(('b', 'PETR4'), 2)
+        cache.set(('a', 'VALE3'), 3)
+        self.assertEqual(cache.invalidate_ticker('petr4'), 2)
+        self.assertEqual(len(cache), 1)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = f"{tmp.name}/cache.sqlite3"
+
+    def test_disk_tier_is_shared_and_warms_a_new_process(self):
+        first = TieredCache(TTLCache(), DiskCache(self.path, 'fundamentus.com.br'))
+        first.set(('detalhes.php', 'PETR4'), {'PAPEL': 'PETR4'})
+        first.set(('detalhes.php', 'VALE3'), {'PAPEL': 'VALE3'})
+
+        # Outro worker (ou o mesmo após um deploy) começa com a memória pré-carregada.
+        second = TieredCache(TTLCache(), DiskCache(self.path, 'fundamentus.com.br'))
+        self.assertEqual(second.warm(limit=10), 2)
+        self.assertEqual(second.get(('detalhes.php', 'PETR4')), {'PAPEL': 'PETR4'})
+        self.assertEqual(second.stats()['disk']['hits'], 0)
+
+        other_host = TieredCache(TTLCache(), DiskCache(self.path, '127.0.0.1:8000'))
+        self.assertIs(other_host.get(('detalhes.php', 'PETR4')), MISSING)
+        self.assertEqual(first.invalidate_ticker('petr4'), 1)
+        self.assertIs(DiskCache(self.path, 'fundamentus.com.br').get(('detalhes.php', 'PETR4')), MISSING)
+
+    def test_promotion_keeps_the_remaining_disk_ttl(self):
+        now = [0.0]
+        disk = DiskCache(self.path, 'fundamentus.com.br', clock=lambda: now[0])
+        disk.set(('detalhes.php', 'PETR4'), {'PAPEL': 'PETR4'}, ttl=60)
+        now[0] += 50
+        cache = TieredCache(TTLCache(ttl=900, clock=lambda: now[0]), disk)
+        self.assertEqual(cache.get(('detalhes.php', 'PETR4')), {'PAPEL': 'PETR4'})
+        now[0] += 11
+        self.assertIs(cache.memory.get(('detalhes.php', 'PETR4')), MISSING)
+        self.assertIs(cache.get(('detalhes.php', 'PETR4')), MISSING)
+
+    def test_unreadable_entries_are_dropped_instead_of_failing(self):
+        # Entrada gravada por uma versão anterior com uma classe que não existe mais.
+        Legacy = type('Legacy', (), {'__module__': records.__name__})
+        disk = DiskCache(self.path, 'fundamentus.com.br')
+        with mock.patch.object(records, 'Legacy', Legacy, create=True):
+            disk.set(('proventos.php', 'PETR4'), [Legacy()])
+        disk.set(('detalhes.php', 'PETR4'), {'PAPEL': 'PETR4'})
+
+        cache = TieredCache(TTLCache(), disk)
+        self.assertEqual(cache.warm(limit=10), 1)
+        self.assertEqual(disk.stats()['entries'], 1)
+        disk.set(('proventos.php', 'PETR4'), b'ok')
+        disk._connection().execute("UPDATE cache_entries SET value = ? WHERE key LIKE '%proventos%'", (b'corrupted',))
+        self.assertIs(cache.get(('proventos.php', 'PETR4')), MISSING)
+        self.assertEqual(disk.stats()['entries'], 1)
+
+    def test_disk_eviction_is_size_bounded_and_keeps_pinned_entries(self):
+        now = [0.0]
+        disk = DiskCache(self.path, max_bytes=2000, clock=lambda: now[0])
+        disk.set(('page', 'pinned'), bytes(range(256)) * 4, pinned=True)
+        for i in range(20):
+            now[0] += 1
+            disk.set(('detalhes.php', f'T{i}'), bytes(range(256)) * 2 + bytes([i]), ttl=60)
+        disk.evict()
+        stats = disk.stats()
+        self.assertLessEqual(stats['bytes'], 2000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNot(disk.get(('page', 'pinned')), MISSING)
+        self.assertIsNot(disk.get(('detalhes.php', 'T19')), MISSING)
+        self.assertIs(disk.get(('detalhes.php', 'T0')), MISSING)
+
+        now[0] += 120
+        self.assertIs(disk.get(('detalhes.php', 'T19')), MISSING)
+
+    def test_record_then_replay_offline(self):
+        with self.settings(SCRAPER_CACHE={'DISK_PATH': self.path, 'MODE': 'record'}):
+            with FixtureHTTPServer() as server:
+                base_url = server.base_url
+                recorded = FundamentusScraper(cache=TTLCache(), base_url=base_url).get_company_details('PETR4')
+        with self.settings(SCRAPER_CACHE={'DISK_PATH': self.path, 'MODE': 'replay'}):
+            # O servidor já foi encerrado: tudo vem das páginas gravadas.
+            scraper = FundamentusScraper(cache=TTLCache(), base_url=base_url)
+            self.assertEqual(scraper.get_company_details('PETR4'), recorded)
+            with self.assertRaises(TickerNotFoundError):
+                scraper.get_company_details('VALE3')
+
+
+class ProventosCacheTests(FixtureScraperMixin, SimpleTestCase):
+    def test_single_fetch_fills_yearly_and_monthly(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        monthly = scraper.get_monthly_dividends('petr4')
+        yearly = scraper.get_yearly_dividends('PETR4')
+        scraper.get_monthly_dividends('PETR4')
+        self.assertEqual(self.fetch_count, 1)
+        self.assertTrue(monthly and yearly)
+        self.assertEqual(monthly[0].ex_date, date(2026, 8, 20))
+
+    def test_failed_table_is_not_cached(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        with mock.patch.object(scraper, '_parse_yearly_dividends', side_effect=TableNotFoundError('x')):
+            scraper.get_monthly_dividends('PETR4')
+            with self.assertRaises(TableNotFoundError):
+                scraper.get_yearly_dividends('PETR4')
+        self.assertEqual(self.fetch_count, 2)
+
+
+class SingleFlightTests(FixtureScraperMixin, SimpleTestCase):
+    def test_concurrent_callers_share_one_fetch(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        fetch = scraper._fetch_page
+        release = threading.Event()
+
+        def slow_fetch(path):
+            release.wait(5)
+            return fetch(path)
+
+        scraper._fetch_page = slow_fetch
+        results = []
+        threads = [
+            threading.Thread(target=lambda method=method: results.append(method('PETR4')))
+            for method in (scraper.get_monthly_dividends, scraper.get_yearly_dividends) * 3
+        ]
+        for thread in threads:
+            thread.start()
+        while scraper.flight_stats()['calls'] < len(threads):
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.fetch_count, 1)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(scraper.flight_stats()['coalesced'], 5)
+
+    def test_error_is_shared_by_waiters(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise TickerNotFoundError('XXXX3')
+
+        def call():
+            try:
+                flight.do('key', failing)
+            except TickerNotFoundError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=call)
+        follower.start()
+        while flight.stats()['coalesced'] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_async_callers_share_one_fetch(self):
+        flight = SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        async def run():
+            return await asyncio.gather(*(flight.do_async('key', work) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(run()), [42] * 4)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(flight.stats()['coalesced'], 3)
+
+
+class StockDataServiceTests(FixtureScraperMixin, TestCase):
+    def test_read_through_serves_from_db_when_fresh(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        service = StockDataService(scraper)
+        scraped = service.get_monthly_dividends('PETR4')
+        scraper.invalidate('PETR4')
+        self.assertEqual(service.get_monthly_dividends('PETR4'), scraped)
+        self.assertEqual(self.fetch_count, 1)
+        self.assertEqual(DividendEvent.objects.filter(company__ticker='PETR4').count(), len(scraped))
+
+    def test_stale_data_is_refreshed_with_upsert(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        service = StockDataService(scraper)
+        service.get_yearly_dividends('PETR4')
+        service.get_monthly_dividends('PETR4')
+        Company.objects.update(yearly_fetched_at=None, monthly_fetched_at=None)
+        scraper.invalidate('PETR4')
+        service.get_monthly_dividends('PETR4')
+        self.assertEqual(self.fetch_count, 2)
+        self.assertEqual(DividendEvent.objects.count(), 13)
+
+    def test_details_snapshot(self):
+        service = StockDataService(self.make_scraper(cache=TTLCache()))
+        details = service.get_company_details('PETR4')
+        self.assertEqual(service.load_details('petr4'), details)
+
+    def test_unchanged_details_do_not_add_snapshots(self):
+        service = StockDataService(scraper=None)
+        raw = json.loads(load_fixture('PETR4.expected.json'))['details']
+        service.store_details('PETR4', raw)
+        first = CompanySnapshot.objects.get()
+        service.store_details('PETR4', dict(raw))
+        self.assertEqual(CompanySnapshot.objects.count(), 1)
+        self.assertGreater(CompanySnapshot.objects.get().fetched_at, first.fetched_at)
+        service.store_details('PETR4', dict(raw, COTAÇÃO='39,10'))
+        self.assertEqual(CompanySnapshot.objects.count(), 2)
+        self.assertEqual(service.load_details('PETR4')['COTAÇÃO'], Decimal('39.10'))
+
+    def test_series_is_reused_until_new_data_is_stored(self):
+        service = StockDataService(self.make_scraper(cache=TTLCache()))
+        series = service.get_monthly_series('PETR4')
+        self.assertIs(service.get_monthly_series('petr4'), series)
+        self.assertIs(service.get_yearly_series('PETR4'), service.get_yearly_series('PETR4'))
+        # Uma nova coleta salva avança monthly_fetched_at e invalida a série.
+        service.store_monthly_dividends('PETR4', service.load_monthly_dividends('PETR4'))
+        rebuilt = service.get_monthly_series('PETR4')
+        self.assertIsNot(rebuilt, series)
+        self.assertEqual(rebuilt.trailing_months(12), series.trailing_months(12))
+
+
+class DividendChangeFeedTests(TestCase):
+    def test_ingest_records_only_inserts_and_corrections(self):
+        service = StockDataService(scraper=None)
+        history = [
+            DividendRecord(date(2026, 8, 20), 0.5, 'DIVIDENDO', date(2026, 9, 1), 1),
+            DividendRecord(date(2026, 5, 20), 0.4, 'JRS CAP PROPRIO', None, 1),
+        ]
+        self.assertEqual(len(service.store_monthly_dividends('PETR4', history)), 2)
+        service.store_monthly_dividends('VALE3', history[:1])
+        first = self.client.get('/api/dividends/changes').json()
+        self.assertEqual([change['kind'] for change in first['changes']], ['insert'] * 3)
+        # A sequência vem do contador travado na transação, não do id autoincremental.
+        self.assertEqual([change['seq'] for change in first['changes']], [1, 2, 3])
+        self.assertEqual(FeedSequence.objects.get(name='dividend_changes').value, 3)
+
+        self.assertEqual(service.store_monthly_dividends('PETR4', history), [])
+        corrected = [
+            DividendRecord(date(2026, 11, 20), 0.6, 'DIVIDENDO', None, 1),
+            dataclasses.replace(history[0], value=0.55),
+            history[1],
+        ]
+        service.store_monthly_dividends('PETR4', corrected)
+        self.assertEqual(DividendEvent.objects.get(company__ticker='PETR4', ex_date=date(2026, 8, 20)).value, 0.55)
+
+        delta = self.client.get('/api/dividends/changes', {'since': first['next'], 'tickers': 'petr4'}).json()
+        self.assertEqual([change['kind'] for change in delta['changes']], ['insert', 'update'])
+        self.assertEqual(delta['changes'][1]['previous'], {'Valor': 0.5})
+        self.assertEqual(delta['changes'][1]['event']['Valor'], 0.55)
+        self.assertGreater(delta['next'], first['next'])
+        self.assertFalse(delta['has_more'])
+
+        page = self.client.get('/api/dividends/changes', {'limit': 2}).json()
+        self.assertTrue(page['has_more'])
+        self.assertEqual(self.client.get('/api/dividends/changes', {'since': 'x'}).status_code, 400)
+
+
+    def test_reordered_identical_rows_are_not_corrections(self):
+        service = StockDataService(scraper=None)
+        first = DividendRecord(date(2026, 8, 20), 0.5, 'DIVIDENDO', date(2026, 9, 1), 1)
+        second = dataclasses.replace(first, value=0.3, payment_date=date(2026, 10, 1))
+        service.store_monthly_dividends('PETR4', [first, second])
+        self.assertEqual(service.store_monthly_dividends('PETR4', [second, first]), [])
+
+        corrected = dataclasses.replace(first, value=0.55)
+        changes = service.store_monthly_dividends('PETR4', [second, corrected, first])
+        self.assertEqual([(change.kind, change.occurrence) for change in changes], [('insert', 2)])
+        self.assertEqual(service.store_monthly_dividends('PETR4', [corrected, first, second]), [])
+        changes = service.store_monthly_dividends('PETR4', [dataclasses.replace(second, value=0.35), first, corrected])
+        self.assertEqual([(change.kind, change.occurrence, change.previous) for change in changes], [('update', 1, {'value': 0.3})])
+
+
+class PortfolioIncomeTests(TestCase):
+    history = [
+        DividendRecord(date(2026, 11, 3), 0.3, 'DIVIDENDO', date(2026, 12, 15), 1),
+        DividendRecord(date(2026, 8, 20), 0.5, 'DIVIDENDO', date(2026, 9, 1), 1),
+        DividendRecord(date(2025, 12, 1), 2000.0, 'JRS CAP PROPRIO', date(2026, 1, 10), 1000),
+        DividendRecord(date(2024, 5, 20), 1.0, 'DIVIDENDO', date(2024, 6, 1), 1),
+    ]
+
+    def test_windows_are_adjusted_by_share_ratio(self):
+        positions = [('PETR4', 100), ('VALE3', 10), ('PETR4', 50)]
+        engine = PortfolioIncome.from_series(positions, {'PETR4': self.history, 'VALE3': self.history[1:2]})
+        matrix = engine.income([3, 12, 60], today=date(2026, 10, 16))
+        # Colunas: 3, 12 e 60 meses, próximos 12 meses e anunciados.
+        self.assertEqual(matrix.shape, (3, 5))
+        self.assertAlmostEqual(matrix[0, 0], 50.0)
+        self.assertAlmostEqual(matrix[0, 1], 50.0 + 200.0)
+        self.assertAlmostEqual(matrix[0, 2], 50.0 + 200.0 + 100.0)
+        self.assertAlmostEqual(matrix[0, 3], matrix[0, 1])
+        self.assertAlmostEqual(matrix[0, 4], 30.0)
+        self.assertAlmostEqual(matrix[1, 1], 5.0)
+        self.assertAlmostEqual(matrix[2, 1], 125.0)
+
+    def test_endpoint_combines_stored_and_fetched_series(self):
+        stored_service = StockDataService(scraper=None)
+        stored_service.store_monthly_dividends('PETR4', self.history)
+        self.assertEqual(list(stored_service.load_monthly_dividends_many(['petr4', 'VALE3'])), ['PETR4'])
+
+        class Service:
+            load_monthly_dividends_many = stored_service.load_monthly_dividends_many
+
+            @staticmethod
+            def get_monthly_dividends(ticker):
+                if ticker == 'XXXX3':
+                    raise TickerNotFoundError("Ticker XXXX3 não encontrado.")
+                return self.history[1:2]
+
+        body = {
+            'positions': [{'ticker': 'petr4', 'quantity': 100}, {'ticker': 'VALE3', 'quantity': 10},
+                          {'ticker': 'XXXX3', 'quantity': 5}],
+            'months': [12],
+        }
+        with mock.patch.object(views, 'service', Service()), \
+                mock.patch('scrapper_app.portfolio.run_batch', lambda func, tickers, deadline: [
+                    {"ticker": ticker, **self._call(func, ticker)} for ticker in tickers
+                ]):
+            response = self.client.post('/api/portfolio/income', json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual([p.get('source') for p in payload['positions']], ['stored', 'fetched', None])
+        self.assertEqual(payload['positions'][2]['status'], 404)
+        self.assertTrue(payload['partial'])
+        self.assertEqual(
+            payload['total']['income']['12'],
+            payload['positions'][0]['income']['12'] + payload['positions'][1]['income']['12'],
+        )
+
+        body['positions'] = [{'ticker': 'PETR4', 'quantity': -1}]
+        response = self.client.post('/api/portfolio/income', json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @staticmethod
+    def _call(func, ticker):
+        try:
+            return {"data": func(ticker)}
+        except Exception as e:
+            return error_entry(e)
+
+
+class BatchTests(SimpleTestCase):
+    def fake_details(self, ticker):
+        if ticker == 'XXXX3':
+            raise TickerNotFoundError(f"Ticker '{ticker}' não encontrado.")
+        return {"PAPEL": ticker}
+
+    def test_partial_failures_are_reported_per_ticker(self):
+        with mock.patch.object(views.service, 'get_company_details', side_effect=self.fake_details):
+            response = self.client.post(
+                '/api/batch/details', {"tickers": ["petr4", "XXXX3", "VALE3", "PETR4"]},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['ticker'] for r in results], ['PETR4', 'XXXX3', 'VALE3'])
+        self.assertEqual(results[0]['data'], {"PAPEL": "PETR4"})
+        self.assertEqual(results[1]['status'], 404)
+
+    def test_deadline(self):
+        release = threading.Event()
+        try:
+            results = run_batch(lambda ticker: release.wait(5), ['PETR4'], deadline=0.05)
+        finally:
+            release.set()
+        self.assertEqual(results[0]['status'], 504)
+
+    def test_invalid_body(self):
+        response = self.client.post('/api/batch/dividends', {"tickers": []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncScraperTests(SimpleTestCase):
+    def test_async_scraper_matches_sync_output(self):
+        sync_scraper = FixtureScraperMixin().make_scraper(cache=TTLCache())
+        async_scraper = AsyncFundamentusScraper(FundamentusScraper(cache=TTLCache()))
+        fetched = []
+
+        async def fake_fetch(path):
+            fetched.append(path)
+            page = 'detalhes_PETR4.html' if path.startswith('detalhes') else 'proventos_PETR4.html'
+            return load_fixture(page).encode('utf-8')
+
+        async_scraper._fetch_content = fake_fetch
+
+        async def run():
+            return await asyncio.gather(
+                async_scraper.get_company_details('PETR4'),
+                async_scraper.get_monthly_dividends('PETR4'),
+            )
+
+        details, monthly = asyncio.run(run())
+        self.assertEqual(details, sync_scraper.get_company_details('PETR4'))
+        self.assertEqual(monthly, sync_scraper.get_monthly_dividends('PETR4'))
+        asyncio.run(async_scraper.get_yearly_dividends('PETR4'))
+        self.assertEqual(len(fetched), 2)
+
+
+    def test_shared_client_is_closed_with_its_event_loop(self):
+        async def client():
+            shared = get_async_client()
+            self.assertIs(get_async_client(), shared)
+            return shared
+
+        # async_to_sync (views síncronas sob WSGI) roda cada chamada em um loop novo.
+        first, second = async_to_sync(client)(), asyncio.run(client())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed and second.is_closed)
+
+
+class ExtractionEquivalenceTests(SimpleTestCase):
+    """
+    Compara a saída do motor de extração, em cada backend de parser, com a saída
+    gravada da implementação original (testdata/PETR4.expected.json).
+    """
+    def test_output_matches_recorded_fixture(self):
+        expected = json.loads(load_fixture('PETR4.expected.json'))
+        scraper = FundamentusScraper(cache=TTLCache())
+        details_html = load_fixture('detalhes_PETR4.html').encode('utf-8')
+        proventos_html = load_fixture('proventos_PETR4.html').encode('utf-8')
+        for backend in ('html.parser', 'lxml'):
+            with self.subTest(backend=backend):
+                details = scraper._parse_company_details(parse_html(details_html, DETAILS_STRAINER, backend), 'PETR4')
+                soup = parse_html(proventos_html, PROVENTOS_STRAINER, backend)
+                self.assertEqual(details, expected['details'])
+                self.assertEqual(list(details), list(expected['details']))
+                self.assertEqual(serialize(scraper._parse_yearly_dividends(soup, 'PETR4')), expected['yearly'])
+                self.assertEqual(serialize(scraper._parse_monthly_dividends(soup, 'PETR4')), expected['monthly'])
+
+
+class SummaryViewTests(FixtureScraperMixin, SimpleTestCase):
+    def test_summary_fetches_each_page_once(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        # O scraper expõe a mesma interface de leitura do StockDataService.
+        with mock.patch.object(views, 'service', scraper):
+            response = self.client.get('/api/summary/PETR4/', {'years': '1,5', 'months': '12'})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(self.fetch_count, 2)
+        self.assertEqual(payload['details']['PAPEL'], 'PETR4')
+        self.assertEqual(set(payload['accumulated']['yearly']), {'1', '5'})
+        self.assertEqual(list(payload['accumulated']['monthly']), ['12'])
+
+    def test_invalid_windows(self):
+        response = self.client.get('/api/summary/PETR4/', {'years': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(FixtureScraperMixin, TestCase):
+    def test_details_etag_and_projection(self):
+        service = StockDataService(self.make_scraper(cache=TTLCache()))
+        with mock.patch.object(views, 'service', service):
+            response = self.client.get('/api/details/PETR4/', {'fields': 'papel,cotação'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(response.json()), {'PAPEL', 'COTAÇÃO'})
+            self.assertTrue(response.has_header('Last-Modified'))
+            etag = response['ETag']
+            response = self.client.get('/api/details/PETR4/', {'fields': 'papel,cotação'}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            response = self.client.get('/api/details/PETR4/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_async_views_match_sync_etag_and_projection(self):
+        service = StockDataService(self.make_scraper(cache=TTLCache()))
+        async_service = AsyncStockDataService(service, AsyncFundamentusScraper(FundamentusScraper(cache=TTLCache())))
+        with mock.patch.object(views, 'service', service), mock.patch.object(views, 'async_service', async_service):
+            for path in ('details/PETR4/', 'monthly_dividends/PETR4/', 'accumulated_yearly_dividends/PETR4/3/'):
+                sync = self.client.get(f'/api/{path}', {'fields': 'papel,cotação'})
+                response = self.client.get(f'/api/async/{path}', {'fields': 'papel,cotação'})
+                self.assertEqual(response.json(), sync.json(), path)
+                self.assertEqual(response['ETag'], sync['ETag'])
+                self.assertEqual(response['Last-Modified'], sync['Last-Modified'])
+                response = self.client.get(f'/api/async/{path}', {'fields': 'papel,cotação'}, HTTP_IF_NONE_MATCH=sync['ETag'])
+                self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.fetch_count, 2)
+
+    def test_upstream_revalidation_reuses_parsed_page(self):
+        with FixtureHTTPServer() as server:
+            scraper = FundamentusScraper(cache=TTLCache(), base_url=server.base_url)
+            first = scraper.get_company_details('PETR4')
+            scraper.invalidate('PETR4')
+            second = scraper.get_company_details('PETR4')
+        self.assertEqual(first, second)
+        self.assertEqual(scraper.revalidation_stats()['not_modified'], 1)
+
+    def test_validators_keep_extracted_rows_and_reparse_on_change(self):
+        scraper = FundamentusScraper(cache=TTLCache())
+        page = load_fixture('detalhes_PETR4.html')
+        pages = [page, page, page.replace('PETR4', 'PETR3')]
+
+        def fake_request(path, extra_headers=None):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = pages.pop(0).encode('utf-8')
+            return response
+
+        with mock.patch.object(scraper, '_request', side_effect=fake_request), \
+                mock.patch.object(scraper, '_parse_html', wraps=scraper._parse_html) as parse:
+            first = scraper._load_details('PETR4')
+            self.assertEqual(scraper._load_details('PETR4'), first)
+            changed = scraper._load_details('PETR4')
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual(scraper.revalidation_stats()['unchanged'], 1)
+        self.assertEqual((first['PAPEL'], changed['PAPEL']), ('PETR4', 'PETR3'))
+        # Nada de árvores do BeautifulSoup guardadas: só validadores e o resultado extraído.
+        entry = scraper.validators.get(('detalhes.php?papel=PETR4', ''))
+        self.assertEqual(set(entry), {'etag', 'last_modified', 'hash', 'rows'})
+
+
+class NormalizationTests(FixtureScraperMixin, TestCase):
+    def test_schema_types(self):
+        raw = json.loads(load_fixture('PETR4.expected.json'))['details']
+        details = normalize_details(dict(raw, EV_EBIT='-', NOVO_INDICADOR='3,5%'))
+        self.assertEqual(details['COTAÇÃO'], Decimal('38.45'))
+        self.assertEqual(details['VALOR_DE_MERCADO'], 501_234_000_000)
+        self.assertEqual(details['PL'], 4.12)
+        self.assertEqual(details['DIV_YIELD'], 0.148)
+        self.assertEqual(details['DATA_ÚLT_COT'], date(2026, 10, 14))
+        self.assertEqual(details['SETOR'], 'Petróleo, Gás e Biocombustíveis')
+        self.assertIsNone(details['EV_EBIT'])
+        self.assertEqual(details['NOVO_INDICADOR'], 0.035)
+
+    def test_stored_values_round_trip_and_raw_view(self):
+        service = StockDataService(self.make_scraper(cache=TTLCache()))
+        scraped = service.get_company_details('PETR4')
+        self.assertEqual(service.load_details('PETR4'), scraped)
+        self.assertEqual(service.load_details('PETR4', raw=True)['COTAÇÃO'], '38,45')
+        with mock.patch.object(views, 'service', service):
+            payload = self.client.get('/api/details/PETR4/', {'fields': 'cotação,roe'}).json()
+            self.assertEqual(payload, {'COTAÇÃO': 38.45, 'ROE': 0.294})
+            payload = self.client.get('/api/details/PETR4/', {'fields': 'roe', 'raw': '1'}).json()
+            self.assertEqual(payload, {'ROE': '29,4%'})
+        self.assertEqual(self.fetch_count, 1)
+
+
+class ScreenerTests(TestCase):
+    def setUp(self):
+        reset_screener_index()
+        self.addCleanup(reset_screener_index)
+        raw = json.loads(load_fixture('PETR4.expected.json'))['details']
+        service = StockDataService(mock.Mock())
+        for ticker, dy, pl, roe in [
+            ('PETR4', '14,8%', '4,12', '29,4%'), ('VALE3', '9,1%', '6,50', '18,0%'),
+            ('ITUB4', '7,2%', '9,80', '21,3%'), ('MGLU3', '0,0%', '-', '-3,5%'), ('BBAS3', '9,1%', '4,30', '20,1%'),
+        ]:
+            service.store_details(ticker, dict(raw, PAPEL=ticker, DIV_YIELD=dy, PL=pl, ROE=roe))
+
+    def screen(self, **params):
+        response = self.client.get('/api/screener/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_filters_and_sorting(self):
+        payload = self.screen(div_yield__gt='6%', pl__lt='10', roe__gt='0.15', order='-div_yield', fields='div_yield')
+        self.assertEqual(payload['count'], 4)
+        self.assertEqual([row['ticker'] for row in payload['data']], ['PETR4', 'BBAS3', 'VALE3', 'ITUB4'])
+        self.assertEqual(payload['data'][0], {'ticker': 'PETR4', 'DIV_YIELD': 0.148})
+        # Cotações (Decimal) saem como número JSON, não como texto.
+        self.assertEqual(self.screen(fields='cotação')['data'][0]['COTAÇÃO'], 38.45)
+        self.assertIsNone(payload['next'])
+        # Valores ausentes (P/L '-') ficam no fim, em qualquer direção.
+        self.assertEqual(self.screen(order='pl')['data'][-1]['ticker'], 'MGLU3')
+
+    def test_percent_filters_match_stored_values_exactly(self):
+        for params in ({'div_yield__gte': '14,8%'}, {'div_yield': '14.8%'}, {'div_yield__lte': '14,8%', 'div_yield__gt': '9,1%'}):
+            self.assertEqual([row['ticker'] for row in self.screen(**params)['data']], ['PETR4'], params)
+        self.assertEqual(self.screen(div_yield='9,1%')['count'], 2)
+
+    def test_keyset_pagination_and_debug(self):
+        seen = []
+        params = {'order': '-div_yield', 'limit': 2, 'debug': 1}
+        while True:
+            payload = self.screen(**params)
+            seen += [row['ticker'] for row in payload['data']]
+            if not payload['next']:
+                break
+            params['cursor'] = payload['next']
+        self.assertEqual(seen, ['PETR4', 'BBAS3', 'VALE3', 'ITUB4', 'MGLU3'])
+        self.assertIn('filter', payload['debug']['timings_ms'])
+        self.assertFalse(payload['debug']['index']['rebuilt'])
+
+    def test_index_rebuilt_after_refresh_and_bad_params(self):
+        self.assertEqual(self.screen(setor__ne='Petróleo, Gás e Biocombustíveis')['count'], 0)
+        StockDataService(mock.Mock()).store_details('TAEE11', {'PAPEL': 'TAEE11', 'SETOR': 'Energia Elétrica'})
+        self.assertEqual(self.screen(setor='energia elétrica')['data'][0]['ticker'], 'TAEE11')
+        for params in ({'pl__between': '1'}, {'foo__gt': '1'}, {'order': 'setor'}, {'limit': '0'}, {'cursor': 'x'}):
+            self.assertEqual(self.client.get('/api/screener/', params).status_code, 400)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottleTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state_path = str(Path(directory.name) / 'throttle.sqlite3')
+
+    def test_token_bucket_is_shared_through_the_state_file(self):
+        clock = FakeClock()
+        first, second = (SharedTokenBucket(self.state_path, 'host', rate=1.0, burst=2, clock=clock) for _ in range(2))
+        self.assertTrue(first.acquire(timeout=0))
+        self.assertTrue(second.acquire(timeout=0))
+        self.assertFalse(first.acquire(timeout=0.5))
+        clock.now += 1
+        self.assertTrue(second.acquire(timeout=0))
+        self.assertEqual(first.state()['rejected'], 1)
+
+    def test_aimd_and_breaker_transitions(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=8, latency_factor=3.0, clock=FakeClock())
+        for _ in range(4):
+            limiter.acquire(0)
+            limiter.release(latency=0.1)
+        self.assertEqual(limiter.state()['limit'], 4)
+        limiter.acquire(0)
+        limiter.release(latency=1.0)  # 10x a latência típica
+        self.assertEqual(limiter.state()['limit'], 2)
+
+        clock = FakeClock()
+        breaker = CircuitBreaker('host', failures=2, reset_timeout=30, clock=clock)
+        with self.assertLogs('scrapper_app.throttle', 'WARNING'):
+            for _ in range(2):
+                breaker.before_call()
+                breaker.record_failure()
+        with self.assertRaises(UpstreamUnavailableError):
+            breaker.before_call()
+        clock.now += 30
+        breaker.before_call()  # chamada de teste do meio-aberto
+        with self.assertRaises(UpstreamUnavailableError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.snapshot(), {"state": "closed", "consecutive_failures": 0, "trips": 1, "rejected": 2})
+
+    def test_open_breaker_serves_last_parsed_page(self):
+        config = dict(DEFAULT_THROTTLE, STATE_PATH=self.state_path, BREAKER_FAILURES=2)
+        with FixtureHTTPServer() as server:
+            scraper = FundamentusScraper(cache=TTLCache(), base_url=server.base_url)
+            scraper.guard = UpstreamGuard('fixture', config)
+            details = scraper.get_company_details('PETR4')
+        down = mock.Mock()
+        down.get.side_effect = requests.ConnectionError("conexão recusada")
+        with mock.patch.object(scrapper, 'get_session', return_value=down):
+            with self.assertLogs('scrapper_app.throttle', 'WARNING'):
+                for _ in range(2):
+                    with self.assertRaises(ScrapingError):
+                        scraper._fetch_page('detalhes.php?papel=PETR4')
+            self.assertEqual(scraper.guard.state()['breaker']['state'], 'open')
+            self.assertEqual(scraper._load_details('PETR4'), details)
+            self.assertEqual(down.get.call_count, 2)
+            self.assertEqual(scraper.revalidation_stats()['served_stale'], 1)
+            with self.assertRaises(UpstreamUnavailableError):
+                scraper._fetch_page('proventos.php?papel=PETR4')
+
+    def test_probe_and_tickets_are_returned_on_any_error(self):
+        config = dict(DEFAULT_THROTTLE, STATE_PATH=self.state_path, BREAKER_FAILURES=1, BREAKER_RESET=0)
+        guard = UpstreamGuard('fundamentus.invalid', config)
+        with self.assertLogs('scrapper_app.throttle', 'WARNING'):
+            guard.release(guard.acquire(), failed=True)
+        with mock.patch.object(guard.bucket, 'acquire', side_effect=sqlite3.OperationalError("database is locked")):
+            with self.assertRaises(sqlite3.OperationalError):
+                guard.acquire()  # chamada de teste do meio-aberto
+        guard.release(guard.acquire(), status=200)
+        self.assertEqual(guard.state()['breaker']['state'], 'closed')
+
+        scraper = AsyncFundamentusScraper(FundamentusScraper(cache=TTLCache(), base_url='http://fundamentus.invalid/'))
+        scraper.guard = guard
+        client = mock.Mock()
+
+        async def hang(*args, **kwargs):
+            await asyncio.Event().wait()
+
+        async def cancel_request():
+            task = asyncio.ensure_future(scraper._fetch_content('detalhes.php?papel=PETR4'))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        client.get.side_effect = hang
+        with mock.patch('scrapper_app.async_scrapper.get_async_client', return_value=client):
+            asyncio.run(cancel_request())
+            client.get.side_effect = httpx.TooManyRedirects("redirecionamentos demais")
+            with self.settings(SCRAPER_TRANSPORT={'MAX_RETRIES': 0}), self.assertLogs('scrapper_app.throttle', 'WARNING'):
+                with self.assertRaises(ScrapingError):
+                    asyncio.run(scraper._fetch_content('detalhes.php?papel=PETR4'))
+        self.assertEqual(guard.state()['concurrency']['in_flight'], 0)
+
+    def test_open_breaker_is_not_reported_as_unknown_ticker(self):
+        config = dict(DEFAULT_THROTTLE, STATE_PATH=self.state_path, BREAKER_FAILURES=1)
+        scraper = FundamentusScraper(cache=TTLCache(), base_url='http://fundamentus.invalid/')
+        scraper.guard = UpstreamGuard('fundamentus.invalid', config)
+        down = mock.Mock()
+        down.get.side_effect = requests.ConnectionError("conexão recusada")
+        with mock.patch.object(scrapper, 'get_session', return_value=down):
+            with self.assertLogs('scrapper_app.throttle', 'WARNING'), self.assertRaises(TickerNotFoundError):
+                scraper.get_company_details('PETR4')
+            with self.assertRaises(UpstreamUnavailableError):
+                scraper.get_company_details('VALE3')
+            with self.assertRaises(UpstreamUnavailableError):
+                scraper.get_monthly_dividends('VALE3')
+            with mock.patch.object(views, 'service', ScraperOnlyService(scraper)):
+                response = self.client.get('/api/details/VALE3/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+
+class SourceRegistryTests(TestCase):
+    def make_registry(self, primary, secondary, **config):
+        registry = SourceRegistry(dict(DEFAULT_SOURCES, **config))
+        registry.register('secundaria', secondary, priority=1)
+        registry.register('principal', primary, priority=0)
+        return registry
+
+    def test_failover_and_common_output(self):
+        primary = LocalFixtureScraper(TESTDATA_DIR, failures=1)
+        registry = self.make_registry(primary, LocalFixtureScraper(TESTDATA_DIR))
+        monthly, yearly = load_expected_records()
+        self.assertEqual(registry.get_monthly_dividends('PETR4'), monthly)
+        self.assertEqual(registry.get_yearly_dividends('PETR4'), yearly)
+        stats = {entry['name']: entry['kinds'] for entry in registry.stats()}
+        self.assertEqual(stats['principal']['monthly']['errors'], 1)
+        self.assertEqual(stats['secundaria']['monthly']['wins'], 1)
+        self.assertEqual(stats['principal']['yearly']['wins'], 1)
+        with self.assertRaises(TickerNotFoundError):
+            registry.get_company_details('XXXX3')
+
+        # Uma fonte que já entrega valores tipados produz os mesmos dados normalizados.
+        raw = json.loads(load_fixture('PETR4.expected.json'))['details']
+        typed = dict(normalize_details(raw))
+        service = StockDataService(self.make_registry(LocalFixtureScraper(data={'PETR4': {'details': typed}}), primary))
+        self.assertEqual(service.get_company_details('PETR4'), normalize_details(raw))
+
+    def test_hedged_request_after_p95_delay(self):
+        slow = LocalFixtureScraper(TESTDATA_DIR, latency=0.5)
+        registry = self.make_registry(slow, LocalFixtureScraper(TESTDATA_DIR), HEDGE_DEFAULT_DELAY=0.05)
+        started = time.perf_counter()
+        self.assertEqual(registry.get_company_details('PETR4')['PAPEL'], 'PETR4')
+        self.assertLess(time.perf_counter() - started, 0.4)
+        principal = registry.stats()[0]['kinds']['details']
+        self.assertEqual((principal['hedged'], principal['wins']), (1, 0))
+
+        registry = self.make_registry(LocalFixtureScraper(), LocalFixtureScraper(), HEDGE_MIN_DELAY=0.001)
+        source = registry.for_kind('details')[0]
+        for latency in [0.01] * 19 + [0.2]:
+            source.latency['details'].observe(latency)
+        self.assertEqual(registry.hedge_delay(source, 'details'), 0.01)
+        source.latency['details'].observe(0.3)
+        self.assertEqual(registry.hedge_delay(source, 'details'), 0.2)
+
+    def test_failure_before_hedge_delay_hands_over_to_the_launched_source(self):
+        def hedge_counts(registry):
+            return {entry['name']: (entry['kinds']['details']['hedged'], entry['kinds']['details']['wins'])
+                    for entry in registry.stats()}
+
+        # A principal falha antes do seu atraso: a secundária entra na hora e o hedge
+        # seguinte mede a secundária, não a fonte que falhou.
+        registry = self.make_registry(
+            LocalFixtureScraper(TESTDATA_DIR, failures=1), LocalFixtureScraper(TESTDATA_DIR, latency=0.5),
+            HEDGE_DEFAULT_DELAY=0.1,
+        )
+        registry.register('terciaria', LocalFixtureScraper(TESTDATA_DIR), priority=2)
+        self.assertEqual(registry.get_company_details('PETR4')['PAPEL'], 'PETR4')
+        self.assertEqual(hedge_counts(registry), {'principal': (0, 0), 'secundaria': (1, 0), 'terciaria': (0, 1)})
+
+        # Uma fonte disparada por hedge que falha também passa a vez na hora.
+        registry = self.make_registry(
+            LocalFixtureScraper(TESTDATA_DIR, latency=0.5), LocalFixtureScraper(TESTDATA_DIR, failures=1),
+            HEDGE_DEFAULT_DELAY=0.1,
+        )
+        registry.register('terciaria', LocalFixtureScraper(TESTDATA_DIR), priority=2)
+        self.assertEqual(registry.get_company_details('PETR4')['PAPEL'], 'PETR4')
+        self.assertEqual(hedge_counts(registry), {'principal': (1, 0), 'secundaria': (0, 0), 'terciaria': (0, 1)})
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_parsing_benchmark_covers_corpus(self):
+        results = bench_parsing(repeat=1)
+        self.assertEqual(len(results), 3 * len(CORPUS))
+        self.assertTrue(all(result['seconds'] > 0 and result['peak_bytes'] > 0 for result in results.values()))
+
+    def test_compare_reports_regressions(self):
+        baseline = {"results": {"a": {"relative": 1.0, "peak_bytes": 100}, "b": {"relative": 1.0, "peak_bytes": 100}}}
+        current = {"results": {"a": {"relative": 1.2, "peak_bytes": 100}, "b": {"relative": 1.0, "peak_bytes": 300}}}
+        regressions = compare(current, baseline, tolerance=0.5)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('b: peak_bytes'))
+
+    def test_view_benchmark_rejects_error_responses(self):
+        # O executor de testes já preparou o ambiente que bench_views prepara.
+        with mock.patch.object(benchmarks, 'setup_test_environment'), \
+                mock.patch.object(benchmarks, 'teardown_test_environment'), \
+                mock.patch.object(ScraperOnlyService, 'get_company_details', side_effect=TypeError):
+            with self.assertRaisesMessage(BenchmarkError, 'view.details.small'):
+                bench_views(repeat=1)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.set_enabled(True)
+        metrics.reset_metrics()
+        self.addCleanup(metrics.set_enabled, None)
+        self.addCleanup(metrics.reset_metrics)
+
+    def test_server_timing_and_prometheus_export(self):
+        with FixtureHTTPServer() as server:
+            scraper = FundamentusScraper(cache=TTLCache(), base_url=server.base_url)
+            with mock.patch.object(views, 'service', StockDataService(scraper)), \
+                    mock.patch.object(views, 'scraper', scraper):
+                response = self.client.get('/api/accumulated_monthly_dividends/PETR4/12/')
+                self.assertEqual(self.client.get('/api/details/XXXX3/').status_code, 404)
+                exported = self.client.get('/metrics').content.decode()
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(stages, ['fetch', 'parse', 'extract', 'calc', 'total'])
+        self.assertIn('scraper_stage_seconds_count{stage="fetch",target="proventos.php"} 1', exported)
+        self.assertIn('scraper_stage_seconds_bucket{stage="calc",target="calculate_accumulated_monthly",le="+Inf"} 1', exported)
+        self.assertIn('scraper_errors_total{exception="ScrapingError"} 1', exported)
+        self.assertIn('scraper_cache_misses_total 2', exported)
+
+    def test_server_timing_includes_stages_run_in_pool_threads(self):
+        with FixtureHTTPServer() as server:
+            scraper = FundamentusScraper(cache=TTLCache(), base_url=server.base_url)
+            # Sem o banco: as threads do pool não enxergam a transação do TestCase.
+            with mock.patch.object(views, 'service', scraper):
+                response = self.client.get('/api/summary/PETR4/')
+        self.assertEqual(response.status_code, 200)
+        stages = {entry.split(';')[0] for entry in response['Server-Timing'].split(', ')}
+        self.assertLessEqual({'fetch', 'parse', 'total'}, stages)
+
+    def test_middleware_stays_async_for_async_views(self):
+        async def get_response(request):
+            with metrics.stage('fetch', 'detalhes.php'):
+                pass
+            return views.JsonResponse({})
+
+        middleware = metrics.ServerTimingMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(mock.Mock()))
+        self.assertTrue(response['Server-Timing'].startswith('fetch;dur='))
+
+    def test_disabled_instrumentation_is_inert(self):
+        metrics.set_enabled(False)
+        with metrics.stage('fetch', 'detalhes.php'):
+            pass
+        self.assertEqual(metrics.STAGE_SECONDS.count('fetch', 'detalhes.php'), 0)
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class ExportTests(FixtureScraperMixin, TestCase):
+    def setUp(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        service = StockDataService(scraper)
+        service.store_monthly_dividends('PETR4', scraper.get_monthly_dividends('PETR4'))
+        service.store_details('PETR4', scraper.get_company_details('PETR4'))
+
+    def read_ndjson(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_ndjson_filters_and_resume(self):
+        response = self.client.get('/api/export/dividends/', {'tickers': 'petr4', 'start': '2025-01-01', 'type': 'dividendo'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = self.read_ndjson(response)
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(row['dividend_type'] == 'DIVIDENDO' and row['ex_date'] >= '2025-01-01' for row in rows))
+
+        resumed = self.read_ndjson(self.client.get('/api/export/dividends/', {'after': rows[1]['id']}))
+        self.assertTrue(all(row['id'] > rows[1]['id'] for row in resumed))
+        self.assertEqual(len(resumed), DividendEvent.objects.filter(id__gt=rows[1]['id']).count())
+
+    def test_csv_and_command(self):
+        response = self.client.get('/api/export/snapshots/', {'format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,ticker,fetched_at,data,values')
+        self.assertEqual(len(lines), 2)
+
+        out = StringIO()
+        call_command('export_dividends', '--format', 'csv', '--end', '2020-12-31', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_invalid_filters(self):
+        self.assertEqual(self.client.get('/api/export/dividends/', {'start': '2020-13-01'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/export/dividends/', {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/export/trades/').status_code, 404)
+        # Snapshots não têm tipo de provento: o filtro é rejeitado em vez de ignorado.
+        self.assertEqual(self.client.get('/api/export/snapshots/', {'type': 'dividendo'}).status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('export_dividends', '--dataset', 'snapshots', '--type', 'DIVIDENDO', stdout=StringIO())
+
+
+class DividendSeriesTests(SimpleTestCase):
+    today = date(2026, 10, 16)
+
+    def setUp(self):
+        self.monthly, self.yearly = load_expected_records()
+
+    def brute_force_months(self, num_months):
+        cut_off = months_ago(self.today, num_months)
+        return sum(
+            event.value for event in self.monthly
+            if cut_off <= event.ex_date <= self.today
+        )
+
+    def test_monthly_windows_match_linear_scan(self):
+        series = DividendSeries.from_monthly(self.monthly)
+        sums = series.trailing_months_many(range(1, 121), today=self.today)
+        for num_months, total in sums.items():
+            self.assertAlmostEqual(total, self.brute_force_months(num_months), places=9)
+
+    def test_yearly_windows(self):
+        series = DividendSeries.from_yearly(self.yearly)
+        expected = sum(entry.value for entry in self.yearly if 2024 <= entry.year <= 2026)
+        self.assertAlmostEqual(series.trailing_years(2, current_year=2026), expected)
+
+    def test_rolling_ttm(self):
+        series = DividendSeries.from_monthly(self.monthly)
+        ttm = series.rolling_ttm(today=self.today)
+        self.assertEqual(ttm[0]['Mes'], '2020-12')
+        self.assertEqual(ttm[-1]['Mes'], '2026-10')
+        last = series.window_sum(date(2025, 11, 1).toordinal(), date(2026, 10, 31).toordinal())
+        self.assertAlmostEqual(ttm[-1]['Valor'], last)
+
+    def test_months_ago_clamps_to_month_end(self):
+        self.assertEqual(months_ago(date(2026, 3, 31), 1), date(2026, 2, 28))
+        self.assertEqual(months_ago(date(2026, 1, 15), 13), date(2024, 12, 15))
+
+    def test_invalid_rows_raise_data_parsing_error(self):
+        with self.assertRaises(DataParsingError):
+            DividendSeries.from_monthly([DividendRecord(None, 1.0, 'DIVIDENDO', None, 1)])
+
+
+class RankingEngineTests(SimpleTestCase):
+    today = date(2026, 10, 16)
+
+    def test_matches_per_ticker_calculator(self):
+        monthly, _ = load_expected_records()
+        half = [dataclasses.replace(event, value=event.value / 2) for event in monthly]
+        engine = DividendRankingEngine.from_monthly(
+            {'PETR4': monthly, 'PETR3': half, 'NOPAY3': []},
+            {'PETR4': '38,45', 'PETR3': '40,00'},
+        )
+        ranking = engine.rank(num_years=3, today=self.today)
+        self.assertEqual([row['ticker'] for row in ranking], ['PETR4', 'PETR3', 'NOPAY3'])
+
+        ttm = DividendSeries.from_monthly(monthly).trailing_months(12, today=self.today)
+        self.assertAlmostEqual(ranking[0]['ttm'], round(ttm, 6))
+        self.assertAlmostEqual(ranking[0]['dividend_yield'], round(ttm / 38.45, 6))
+        self.assertEqual(ranking[0]['percentil_dy'], 1.0)
+        self.assertIsNone(ranking[2]['dividend_yield'])
+        # 2023 não tem proventos no fixture: 2 de 3 anos completos.
+        self.assertAlmostEqual(ranking[0]['consistencia'], round(2 / 3, 6))
+
+    def test_values_are_per_share_like_portfolio_income(self):
+        monthly, _ = load_expected_records()
+        split = [dataclasses.replace(event, value=event.value * 2, shares_ratio=2) for event in monthly]
+        engine = DividendRankingEngine.from_monthly({'PETR4': monthly, 'PETR3': split})
+        ttm = engine.ttm(self.today)  # ordem alfabética: PETR3, PETR4
+        self.assertAlmostEqual(ttm[0], ttm[1])
+        income = PortfolioIncome.from_series([('PETR3', 1)], {'PETR3': split}).income([12], today=self.today)
+        self.assertAlmostEqual(income[0, 0], ttm[0])
+
+
+class RankingsViewTests(FixtureScraperMixin, TestCase):
+    def setUp(self):
+        reset_ranking_engine()
+        self.addCleanup(reset_ranking_engine)
+
+    def test_engine_is_reused_until_the_feed_moves(self):
+        service = StockDataService(scraper=None)
+        history = [DividendRecord(date(2026, 8, 20), 0.5, 'DIVIDENDO', date(2026, 9, 1), 1)]
+        service.store_monthly_dividends('PETR4', history)
+        engine = get_ranking_engine()
+        self.assertIs(get_ranking_engine(), engine)
+        service.store_monthly_dividends('PETR4', history)  # nada mudou
+        self.assertIs(get_ranking_engine(), engine)
+        service.store_monthly_dividends('VALE3', history)
+        self.assertEqual(get_ranking_engine().tickers, ['PETR4', 'VALE3'])
+
+    def test_rankings_from_stored_data(self):
+        service = StockDataService(self.make_scraper(cache=TTLCache()))
+        service.get_company_details('PETR4')
+        service.get_monthly_dividends('PETR4')
+        response = self.client.get('/api/rankings/', {'years': 3})
+        self.assertEqual(response.status_code, 200)
+        row = response.json()['data'][0]
+        self.assertEqual(row['ticker'], 'PETR4')
+        self.assertEqual(row['cotacao'], 38.45)
+
+
+class ParsePipelineTests(SimpleTestCase):
+    def test_process_pool_matches_in_thread_parsing(self):
+        scraper = FundamentusScraper(cache=TTLCache())
+        details = load_fixture('detalhes_PETR4.html').encode('utf-8')
+        proventos = load_fixture('proventos_PETR4.html').encode('utf-8')
+        in_thread = ParsePipeline(scraper, workers=0)
+        with ParsePipeline(scraper, workers=2, queue_size=1) as pipeline:
+            self.assertTrue(pipeline.offloaded)
+            futures = [pipeline.submit('details', details, 'PETR4') for _ in range(3)]
+            futures.append(pipeline.submit('proventos', proventos, 'PETR4'))
+            broken = pipeline.submit('details', b'<html></html>', 'PETR4')
+            self.assertEqual(futures[0].result(), in_thread.parse('details', details, 'PETR4'))
+            self.assertEqual(futures[3].result(), in_thread.parse('proventos', proventos, 'PETR4'))
+            with self.assertRaises(TableNotFoundError):
+                broken.result()
+        self.assertEqual(pipeline.stats()['submitted'], 5)
+        self.assertEqual(pipeline.stats()['peak_in_flight'], 1)
+        self.assertFalse(in_thread.offloaded)
+
+
+class CrawlCommandTests(TestCase):
+    def run_crawl(self, server, checkpoint_path, *args):
+        out = StringIO()
+        call_command(
+            'crawl_fundamentus', '--base-url', server.base_url, '--rps', '0',
+            '--checkpoint', checkpoint_path, *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_crawl_stores_universe_and_skips_unchanged_pages(self):
+        with tempfile.TemporaryDirectory() as tmp, FixtureHTTPServer() as server:
+            checkpoint_path = f"{tmp}/checkpoint.json"
+            output = self.run_crawl(server, checkpoint_path)
+            self.assertIn("3 atualizados, 0 inalterados, 1 com erro", output)
+            self.assertEqual(set(Company.objects.values_list('ticker', flat=True)), {'PETR4', 'VALE3', 'ITUB4'})
+
+            # O checkpoint da execução com erro guarda apenas os tickers pendentes.
+            checkpoint = CrawlCheckpoint(checkpoint_path)
+            self.assertTrue(checkpoint.load())
+            self.assertEqual(checkpoint.pending, ['XXXX3'])
+
+            # Com um checkpoint pendente, --tickers exige --restart em vez de ser ignorado.
+            with self.assertRaises(CommandError):
+                self.run_crawl(server, checkpoint_path, '--tickers', 'PETR4')
+            snapshots = CompanySnapshot.objects.count()
+            output = self.run_crawl(server, checkpoint_path, '--restart', '--tickers', 'PETR4', 'VALE3')
+            self.assertIn("0 atualizados, 2 inalterados, 0 com erro", output)
+            self.assertEqual(CompanySnapshot.objects.count(), snapshots)
+
+    def test_checkpoint_is_saved_in_batches(self):
+        clock = FakeClock()
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = CrawlCheckpoint(f"{tmp}/checkpoint.json", save_every=3, save_interval=60, clock=clock)
+            checkpoint.tickers = ['A', 'B', 'C', 'D', 'E']
+            with mock.patch.object(checkpoint, 'save', wraps=checkpoint.save) as save:
+                for ticker in 'ABCD':
+                    checkpoint.mark_done(ticker)
+                self.assertEqual(save.call_count, 1)
+                clock.now += 60
+                checkpoint.mark_done('E')
+                self.assertEqual(save.call_count, 2)
+                checkpoint.flush()
+                self.assertEqual(save.call_count, 2)
+
+    def test_dry_run_does_not_fetch_ticker_pages(self):
+        with tempfile.TemporaryDirectory() as tmp, FixtureHTTPServer() as server:
+            output = self.run_crawl(server, f"{tmp}/checkpoint.json", '--dry-run')
+        self.assertIn("[dry-run] 4 tickers", output)
+        self.assertEqual([path.split('?')[0] for path in server.requests], ['/resultado.php'])
+        self.assertFalse(Company.objects.exists())
+
+
+class StaleWhileRevalidateTests(FixtureScraperMixin, TestCase):
+    def test_stale_data_is_served_and_refresh_is_queued_once(self):
+        scraper = self.make_scraper(cache=TTLCache())
+        service = StockDataService(scraper)
+        details = service.get_company_details('PETR4')
+        Company.objects.update(details_fetched_at=timezone.now() - timedelta(minutes=20))
+
+        service.scheduler = mock.Mock()
+        self.assertEqual(service.get_company_details('PETR4'), details)
+        service.get_company_details('PETR4')
+        self.assertEqual(self.fetch_count, 1)
+        service.scheduler.enqueue.assert_called_with('details', 'PETR4')
+
+        # Fora da janela de dados vencidos, a busca volta a ser síncrona.
+        Company.objects.update(details_fetched_at=timezone.now() - timedelta(days=2))
+        scraper.invalidate('PETR4')
+        service.get_company_details('PETR4')
+        self.assertEqual(self.fetch_count, 2)
+
+    def test_scheduler_deduplicates_pending_refreshes(self):
+        release = threading.Event()
+        calls = []
+
+        def refresh(ticker):
+            calls.append(ticker)
+            release.wait(5)
+
+        scheduler = RefreshScheduler({'details': refresh}, workers=1)
+        try:
+            self.assertTrue(scheduler.enqueue('details', 'PETR4'))
+            self.assertFalse(scheduler.enqueue('details', 'petr4'))
+        finally:
+            release.set()
+            scheduler.shutdown()
+        self.assertEqual(calls, ['PETR4'])
+        self.assertEqual(scheduler.stats()['deduplicated'], 1)
+
+
+class ScheduledJobTests(SimpleTestCase):
+    def test_trading_hours_job(self):
+        job = ScheduledJob('details', every=900, hours=(10, 18), weekdays=(0, 4))
+        monday = datetime(2026, 10, 12, 11, 0)
+        self.assertTrue(job.is_due(monday))
+        job.last_run = monday
+        self.assertFalse(job.is_due(monday + timedelta(minutes=10)))
+        self.assertTrue(job.is_due(monday + timedelta(minutes=15)))
+        self.assertFalse(job.is_due(datetime(2026, 10, 12, 20, 0)))
+        self.assertFalse(job.is_due(datetime(2026, 10, 17, 11, 0)))
+
+    def test_daily_job(self):
+        job = ScheduledJob('dividends', at='02:00')
+        self.assertFalse(job.is_due(datetime(2026, 10, 12, 1, 59)))
+        self.assertTrue(job.is_due(datetime(2026, 10, 12, 2, 1)))
+        job.last_run = datetime(2026, 10, 12, 2, 1)
+        self.assertFalse(job.is_due(datetime(2026, 10, 12, 23, 0)))
+        self.assertTrue(job.is_due(datetime(2026, 10, 13, 2, 0)))
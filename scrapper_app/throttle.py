@@ -0,0 +1,397 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from .errors import RateLimitedError, UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# --- Proteção do Site de Origem (rate limit, concorrência adaptativa e circuit breaker) ---
+# Cada requisição ao site passa por um UpstreamGuard por host de origem:
+#   1. o circuit breaker rejeita na hora enquanto o site está fora do ar;
+#   2. um token bucket em SQLite, compartilhado por todos os processos da máquina
+#      (ex: workers do gunicorn), limita a taxa total de requisições;
+#   3. um limite de concorrência AIMD por processo cresce devagar enquanto as respostas
+#      vêm rápidas e cai pela metade em 429, 5xx, falhas de conexão ou latência alta.
+
+DEFAULT_THROTTLE = {
+    'ENABLED': True,
+    'RATE': 5.0,
+    'BURST': 10,
+    'STATE_PATH': os.path.join(tempfile.gettempdir(), 'stock_scrapper_throttle.sqlite3'),
+    'ACQUIRE_TIMEOUT': 10.0,
+    'MIN_CONCURRENCY': 1,
+    'MAX_CONCURRENCY': 16,
+    'INITIAL_CONCURRENCY': 4,
+    # Uma resposta é "lenta" quando demora mais que LATENCY_FACTOR x a latência típica.
+    'LATENCY_FACTOR': 3.0,
+    'BREAKER_FAILURES': 5,
+    'BREAKER_RESET': 30.0,
+}
+
+
+def get_throttle_config() -> dict:
+    config = dict(DEFAULT_THROTTLE)
+    config.update(getattr(settings, 'SCRAPER_THROTTLE', {}))
+    return config
+
+
+class SharedTokenBucket:
+    """
+    Token bucket cujo estado (fichas e instante da última recarga) fica em um arquivo
+    SQLite, de modo que todos os processos da máquina dividem a mesma taxa. Cada
+    aquisição é uma transação curta com BEGIN IMMEDIATE, serializada pelo lock do SQLite.
+    """
+    def __init__(self, path: str, name: str, rate: float, burst: int, clock=time.time, sleep=time.sleep):
+        self.path = path
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._local = threading.local()
+        self.waits = 0
+        self.rejected = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets "
+                "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _take(self) -> float:
+        """
+        Tenta retirar uma ficha. Retorna 0 se conseguiu, ou quantos segundos esperar.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = self._clock()
+            row = connection.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = float(self.burst) if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            connection.execute(
+                "INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, tokens, now),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        Bloqueia até obter uma ficha. Retorna False se `timeout` segundos não bastarem.
+        """
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if deadline is not None and self._clock() + wait > deadline:
+                self.rejected += 1
+                return False
+            self.waits += 1
+            self._sleep(wait)
+
+    def tokens(self) -> float:
+        row = self._connection().execute(
+            "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+        ).fetchone()
+        if row is None:
+            return float(self.burst)
+        return min(self.burst, row[0] + max(0.0, self._clock() - row[1]) * self.rate)
+
+    def state(self) -> dict:
+        return {
+            "rate": self.rate, "burst": self.burst, "tokens": round(self.tokens(), 3),
+            "waits": self.waits, "rejected": self.rejected,
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limite de requisições simultâneas com ajuste AIMD: cada resposta saudável soma
+    1/limite (cerca de +1 por "rodada" de requisições) e cada sinal de sobrecarga
+    divide o limite por dois, no máximo uma vez por janela de latência típica.
+    """
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_factor: float, clock=time.monotonic):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_factor = latency_factor
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.latency = None  # EWMA das respostas saudáveis, em segundos
+        self.decreases = 0
+        self._clock = clock
+        self._last_decrease = float('-inf')
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float = None) -> bool:
+        with self._condition:
+            acquired = self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout)
+            if acquired:
+                self.in_flight += 1
+            return acquired
+
+    def release(self, latency: float = None, overloaded: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            if latency is not None and not overloaded and self.latency is not None:
+                overloaded = latency > self.latency * self.latency_factor
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _decrease(self):
+        now = self._clock()
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit / 2)
+        self.decreases += 1
+
+    def state(self) -> dict:
+        return {
+            "limit": int(self.limit), "in_flight": self.in_flight, "min": self.minimum, "max": self.maximum,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "decreases": self.decreases,
+        }
+
+
+class CircuitBreaker:
+    """
+    Abre após `failures` falhas seguidas do site de origem; aberto, rejeita as chamadas
+    por `reset_timeout` segundos e depois deixa passar uma única chamada de teste
+    (meio-aberto), que fecha o circuito se der certo ou o reabre se falhar.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, failures: int, reset_timeout: float, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """
+        Levanta UpstreamUnavailableError se o circuito estiver aberto.
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self.reset_timeout - (self._clock() - self._opened_at)
+                if remaining > 0 or self._probing:
+                    self.rejected += 1
+                    raise UpstreamUnavailableError(
+                        f"{self.name} indisponível; novas tentativas em {max(remaining, 0):.0f}s.",
+                        retry_after=max(remaining, 1.0),
+                    )
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise UpstreamUnavailableError(f"{self.name} indisponível; verificando.", retry_after=1.0)
+                self._probing = True
+
+    def cancel_call(self):
+        """
+        A chamada liberada por before_call não aconteceu (ex: limite de taxa); libera
+        a vaga de teste do meio-aberto sem contar sucesso nem falha.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuito de %s fechado: site de origem respondeu.", self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                    logger.warning("Circuito de %s aberto após %d falhas seguidas.", self.name, self._failures)
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state, "consecutive_failures": self._failures,
+            "trips": self.trips, "rejected": self.rejected,
+        }
+
+
+def is_overload_status(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class UpstreamGuard:
+    """
+    Combina circuit breaker, token bucket compartilhado e concorrência adaptativa para
+    um host de origem. Uso:
+
+        ticket = guard.acquire()
+        try:
+            response = ...
+        except RequestError:
+            guard.release(ticket, failed=True)
+            raise
+        except BaseException:
+            guard.cancel(ticket)  # ex: cancelamento; não conta como sucesso nem falha
+            raise
+        guard.release(ticket, status=response.status_code)
+    """
+    def __init__(self, name: str, config: dict = None):
+        config = config if config is not None else get_throttle_config()
+        self.name = name
+        self.acquire_timeout = config['ACQUIRE_TIMEOUT']
+        self.breaker = CircuitBreaker(name, config['BREAKER_FAILURES'], config['BREAKER_RESET'])
+        self.bucket = SharedTokenBucket(config['STATE_PATH'], name, config['RATE'], config['BURST'])
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            config['INITIAL_CONCURRENCY'], config['MIN_CONCURRENCY'], config['MAX_CONCURRENCY'],
+            config['LATENCY_FACTOR'],
+        )
+
+    def acquire(self) -> float:
+        """
+        Espera a vez de fazer uma requisição e retorna o instante de início (o "ticket").
+        Levanta UpstreamUnavailableError com o circuito aberto e RateLimitedError se a
+        vaga não sair em ACQUIRE_TIMEOUT segundos.
+        """
+        self.breaker.before_call()
+        started = time.monotonic()
+        try:
+            if not self.bucket.acquire(self.acquire_timeout):
+                raise RateLimitedError(f"Limite de requisições para {self.name} atingido; tente novamente.")
+            remaining = self.acquire_timeout - (time.monotonic() - started)
+            if not self.concurrency.acquire(max(remaining, 0.0)):
+                raise RateLimitedError(f"Muitas requisições simultâneas para {self.name}; tente novamente.")
+        except BaseException:
+            # Sem vaga (ou erro no estado compartilhado): a chamada de teste do
+            # meio-aberto não acontece e não pode prender o circuito.
+            self.breaker.cancel_call()
+            raise
+        return time.monotonic()
+
+    def release(self, ticket: float, status: int = None, failed: bool = False):
+        """
+        Registra o resultado da requisição: falha de transporte (`failed`), 429 e 5xx
+        contam como falha para o breaker e como sobrecarga para o AIMD.
+        """
+        overloaded = failed or (status is not None and is_overload_status(status))
+        self.concurrency.release(None if failed else time.monotonic() - ticket, overloaded)
+        if overloaded:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def cancel(self, ticket: float):
+        """
+        Devolve a vaga de uma requisição que não chegou a ter resultado (ex: cancelada),
+        sem mexer no AIMD nem contar sucesso ou falha para o breaker.
+        """
+        self.concurrency.release()
+        self.breaker.cancel_call()
+
+    def state(self) -> dict:
+        return {
+            "upstream": self.name,
+            "breaker": self.breaker.snapshot(),
+            "rate_limit": self.bucket.state(),
+            "concurrency": self.concurrency.state(),
+        }
+
+
+class _NullGuard:
+    """
+    Guarda inativo (SCRAPER_THROTTLE['ENABLED'] falso): não limita nada.
+    """
+    name = None
+
+    def acquire(self) -> float:
+        return 0.0
+
+    def release(self, ticket: float, status: int = None, failed: bool = False):
+        pass
+
+    def cancel(self, ticket: float):
+        pass
+
+    def state(self) -> dict:
+        return {}
+
+
+NULL_GUARD = _NullGuard()
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_upstream_guard(base_url: str):
+    """
+    Retorna o guarda do processo para o host de `base_url`, criando-o na primeira chamada.
+    """
+    config = get_throttle_config()
+    if not config['ENABLED']:
+        return NULL_GUARD
+    host = urlsplit(base_url).netloc or base_url
+    guard = _guards.get(host)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(host)
+            if guard is None:
+                guard = _guards[host] = UpstreamGuard(host, config)
+    return guard
+
+
+def upstream_states() -> list[dict]:
+    return [guard.state() for guard in list(_guards.values())]
+
+
+def reset_guards():
+    with _guards_lock:
+        _guards.clear()
@@ -0,0 +1,101 @@
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Camada de Transporte HTTP Compartilhada ---
+# Uma única Session por processo, com pool de conexões keep-alive, reaproveitada
+# por todas as subclasses de GenericWebScraper.
+
+_session = None
+_session_lock = threading.Lock()
+
+DEFAULT_TRANSPORT = {
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 20,
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10.0,
+    'MAX_RETRIES': 3,
+    'BACKOFF_FACTOR': 0.5,
+    'BACKOFF_JITTER': 0.3,
+    'BACKOFF_MAX': 10.0,
+    'RETRY_STATUSES': (500, 502, 503, 504),
+}
+
+
+def get_transport_config() -> dict:
+    """
+    Retorna a configuração de transporte, mesclando os padrões com
+    settings.SCRAPER_TRANSPORT.
+    """
+    config = dict(DEFAULT_TRANSPORT)
+    config.update(getattr(settings, 'SCRAPER_TRANSPORT', {}))
+    return config
+
+
+def get_timeout() -> tuple[float, float]:
+    """
+    Retorna a tupla (connect, read) de timeouts usada em cada requisição.
+    """
+    config = get_transport_config()
+    return (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+
+
+def build_session(config: dict = None) -> requests.Session:
+    """
+    Cria uma Session com pool de conexões e retries com backoff exponencial (com jitter)
+    para respostas 5xx e timeouts.
+    """
+    config = config if config is not None else get_transport_config()
+    retry = Retry(
+        total=config['MAX_RETRIES'],
+        connect=config['MAX_RETRIES'],
+        read=config['MAX_RETRIES'],
+        status=config['MAX_RETRIES'],
+        status_forcelist=config['RETRY_STATUSES'],
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        backoff_factor=config['BACKOFF_FACTOR'],
+        backoff_jitter=config['BACKOFF_JITTER'],
+        backoff_max=config['BACKOFF_MAX'],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['POOL_CONNECTIONS'],
+        pool_maxsize=config['POOL_MAXSIZE'],
+        max_retries=retry,
+        pool_block=False,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    # requests já descompacta gzip/deflate; deixamos explícito no cabeçalho.
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Retorna a Session compartilhada do processo, criando-a na primeira chamada.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def reset_session():
+    """
+    Fecha e descarta a Session compartilhada (útil em testes ou após um fork).
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
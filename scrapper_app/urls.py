@@ -7,4 +7,18 @@ urlpatterns = [
     path('monthly_dividends/<str:ticker>/', views.get_monthly_dividends_view, name='get_monthly_dividends'),
     path('accumulated_yearly_dividends/<str:ticker>/<int:years>/', views.get_accumulated_yearly_dividends_view, name='get_accumulated_yearly_dividends'),
     path('accumulated_monthly_dividends/<str:ticker>/<int:months>/', views.get_accumulated_monthly_dividends_view, name='get_accumulated_monthly_dividends'),
+    path('summary/<str:ticker>/', views.get_summary_view, name='get_summary'),
+    path('rankings/', views.get_rankings_view, name='get_rankings'),
+    path('dividends/changes', views.dividend_changes_view, name='dividend_changes'),
+    path('screener/', views.screener_view, name='screener'),
+    path('upstream/', views.upstream_status_view, name='upstream_status'),
+    path('export/<str:dataset>/', views.export_view, name='export'),
+    path('async/details/<str:ticker>/', views.async_get_details_view, name='async_get_details'),
+    path('async/yearly_dividends/<str:ticker>/', views.async_get_yearly_dividends_view, name='async_get_yearly_dividends'),
+    path('async/monthly_dividends/<str:ticker>/', views.async_get_monthly_dividends_view, name='async_get_monthly_dividends'),
+    path('async/accumulated_yearly_dividends/<str:ticker>/<int:years>/', views.async_get_accumulated_yearly_dividends_view, name='async_get_accumulated_yearly_dividends'),
+    path('async/accumulated_monthly_dividends/<str:ticker>/<int:months>/', views.async_get_accumulated_monthly_dividends_view, name='async_get_accumulated_monthly_dividends'),
+    path('batch/details', views.batch_details_view, name='batch_details'),
+    path('batch/dividends', views.batch_dividends_view, name='batch_dividends'),
+    path('portfolio/income', views.portfolio_income_view, name='portfolio_income'),
 ]
\ No newline at end of file
@@ -1,26 +1,100 @@
 from django.shortcuts import render
 
-from django.http import JsonResponse
+import hashlib
+import json
+import math
+import time
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from .scrapper import FundamentusScraper
 from .calculator import DividendCalculator
-from .errors import ScrapingError, TickerNotFoundError, TableNotFoundError, ColumnNotFoundError, DataParsingError
+from .services import AsyncStockDataService, StockDataService
+from .async_scrapper import AsyncFundamentusScraper
+from .rankings import get_ranking_engine
+from .screener import get_screener_index
+from .changes import list_changes, parse_change_filters
+from .portfolio import parse_portfolio, project_income
+from .sources import SourceRegistry
+from .batch import error_entry, normalize_tickers, run_batch, submit
+from .errors import (
+    ScrapingError, TickerNotFoundError, TableNotFoundError, ColumnNotFoundError, DataParsingError,
+    RateLimitedError, UpstreamUnavailableError,
+)
+from .extraction import normalize_label
+from .normalization import json_ready
+from .records import serialize
+from .export import DATASETS, FORMATS, parse_export_filters, stream_export
+from .metrics import is_enabled as metrics_enabled, render_metrics
+from .throttle import upstream_states
 
 # Instancie suas classes de serviço
-scraper = FundamentusScraper()
+# Fontes de dados de settings.SCRAPER_SOURCES, consultadas por prioridade com hedging.
+sources = SourceRegistry.from_settings()
+# O Fundamentus segue atendendo as rotas assíncronas e as métricas de cache.
+scraper = sources.first_of(FundamentusScraper) or FundamentusScraper()
 calculator = DividendCalculator()
+service = StockDataService.with_background_refresh(sources)
+async_service = AsyncStockDataService(service, AsyncFundamentusScraper(scraper))
+
+def _conditional_json(request, payload, last_modified=None):
+    """
+    Responde `payload` em JSON com um ETag forte, calculado sobre o conteúdo normalizado
+    (chaves ordenadas), e Last-Modified. Retorna 304 quando If-None-Match ou
+    If-Modified-Since indicam que o cliente já tem essa versão.
+    """
+    normalized = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    etag = quote_etag(hashlib.sha256(normalized.encode('utf-8')).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = JsonResponse(payload, status=200)
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+def _unavailable_response(e):
+    """
+    503 para quando o site de origem está protegido pelo circuit breaker ou pelo limite de taxa.
+    """
+    response = JsonResponse({"error": str(e)}, status=503)
+    if getattr(e, 'retry_after', None):
+        response['Retry-After'] = str(math.ceil(e.retry_after))
+    return response
+
+def _project_fields(details, fields):
+    """
+    Mantém apenas os rótulos pedidos em ?fields= (separados por vírgula, ex: 'cotação,div_yield').
+    """
+    if not fields:
+        return details
+    wanted = {normalize_label(field) for field in fields.split(',') if field.strip()}
+    return {label: value for label, value in details.items() if label in wanted}
+
+def _query_flag(request, name):
+    return request.GET.get(name, '').lower() in ('1', 'true', 'yes')
 
 def get_details_view(request, ticker):
     """
-    View para obter os detalhes de uma empresa do Fundamentus.
-    Exemplo: /details/PETR4
+    View para obter os detalhes de uma empresa do Fundamentus, com os indicadores já
+    normalizados (números JSON, inclusive cotações, frações para percentuais e datas ISO).
+    Aceita ?fields= para retornar apenas alguns rótulos e ?raw=1 para os textos originais.
+    Exemplo: /details/PETR4?fields=cotação,div_yield
     """
     try:
-        details = scraper.get_company_details(ticker)
-        return JsonResponse(details, status=200)
+        details = service.get_company_details(ticker, raw=_query_flag(request, 'raw'))
+        details = json_ready(_project_fields(details, request.GET.get('fields')))
+        return _conditional_json(request, details, service.fetched_at(ticker, 'details'))
     except TickerNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=404)
     except TableNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=404)
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
     except ScrapingError as e:
         return JsonResponse({"error": f"Erro inesperado no scraping: {e}"}, status=500)
     except Exception as e:
@@ -32,14 +106,16 @@ def get_yearly_dividends_view(request, ticker):
     Exemplo: /yearly_dividends/PETR4
     """
     try:
-        yearly_data = scraper.get_yearly_dividends(ticker)
-        return JsonResponse({"ticker": ticker, "data": yearly_data}, status=200)
+        yearly_data = service.get_yearly_dividends(ticker)
+        return _conditional_json(request, {"ticker": ticker, "data": serialize(yearly_data)}, service.fetched_at(ticker, 'yearly'))
     except TickerNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=404)
     except TableNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=404)
     except ColumnNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=400)
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
     except ScrapingError as e:
         return JsonResponse({"error": f"Erro inesperado no scraping: {e}"}, status=500)
     except Exception as e:
@@ -51,14 +127,16 @@ def get_monthly_dividends_view(request, ticker):
     Exemplo: /monthly_dividends/PETR4
     """
     try:
-        monthly_data = scraper.get_monthly_dividends(ticker)
-        return JsonResponse({"ticker": ticker, "data": monthly_data}, status=200)
+        monthly_data = service.get_monthly_dividends(ticker)
+        return _conditional_json(request, {"ticker": ticker, "data": serialize(monthly_data)}, service.fetched_at(ticker, 'monthly'))
     except TickerNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=404)
     except TableNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=404)
     except ColumnNotFoundError as e:
         return JsonResponse({"error": str(e)}, status=400)
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
     except ScrapingError as e:
         return JsonResponse({"error": f"Erro inesperado no scraping: {e}"}, status=500)
     except Exception as e:
@@ -67,13 +145,16 @@ def get_monthly_dividends_view(request, ticker):
 def get_accumulated_yearly_dividends_view(request, ticker, years):
     """
     View para obter o dividendo anual acumulado de uma empresa do Fundamentus.
-    Primeiro busca os dados brutos, depois calcula a soma.
+    Usa a série indexada do ticker (construída uma vez por coleta) para calcular a soma.
     Exemplo: /accumulated_yearly_dividends/PETR4/5
     """
     try:
-        yearly_data = scraper.get_yearly_dividends(ticker)
-        accumulated_dividends = calculator.calculate_accumulated_yearly(yearly_data, years)
-        return JsonResponse({"ticker": ticker, "years": years, "accumulated_dividends": round(accumulated_dividends, 2)}, status=200)
+        series = service.get_yearly_series(ticker)
+        accumulated_dividends = calculator.calculate_accumulated_yearly(series, years)
+        payload = {"ticker": ticker, "years": years, "accumulated_dividends": round(accumulated_dividends, 2)}
+        return _conditional_json(request, payload, service.fetched_at(ticker, 'yearly'))
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
     except ScrapingError as e:
         status_code = 404 if isinstance(e, (TickerNotFoundError, TableNotFoundError)) else 500
         return JsonResponse({"error": str(e)}, status=status_code)
@@ -85,17 +166,364 @@ def get_accumulated_yearly_dividends_view(request, ticker, years):
 def get_accumulated_monthly_dividends_view(request, ticker, months):
     """
     View para obter o dividendo mensal acumulado de uma empresa do Fundamentus.
-    Primeiro busca os dados brutos, depois calcula a soma.
+    Usa a série indexada do ticker (construída uma vez por coleta) para calcular a soma.
     Exemplo: /accumulated_monthly_dividends/ITUB4/60
     """
     try:
-        monthly_data = scraper.get_monthly_dividends(ticker)
-        accumulated_dividends = calculator.calculate_accumulated_monthly(monthly_data, months)
-        return JsonResponse({"ticker": ticker, "months": months, "accumulated_dividends": round(accumulated_dividends, 2)}, status=200)
+        series = service.get_monthly_series(ticker)
+        accumulated_dividends = calculator.calculate_accumulated_monthly(series, months)
+        payload = {"ticker": ticker, "months": months, "accumulated_dividends": round(accumulated_dividends, 2)}
+        return _conditional_json(request, payload, service.fetched_at(ticker, 'monthly'))
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
     except ScrapingError as e:
         status_code = 404 if isinstance(e, (TickerNotFoundError, TableNotFoundError)) else 500
         return JsonResponse({"error": str(e)}, status=status_code)
     except DataParsingError as e:
         return JsonResponse({"error": f"Erro ao calcular proventos mensais: {e}"}, status=500)
     except Exception as e:
-        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+def _parse_batch_request(request):
+    """
+    Lê o corpo JSON de um pedido em lote e retorna a lista normalizada de tickers.
+    Levanta ValueError se o corpo for inválido.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido: {e}") from e
+    if not isinstance(payload, dict):
+        raise ValueError("O corpo deve ser um objeto JSON.")
+    return payload, normalize_tickers(payload.get('tickers'))
+
+@csrf_exempt
+@require_POST
+def batch_details_view(request):
+    """
+    View para obter os detalhes de vários tickers de uma vez.
+    Exemplo: POST /batch/details {"tickers": ["PETR4", "VALE3"]}
+    """
+    try:
+        _, tickers = _parse_batch_request(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    results = run_batch(lambda ticker: json_ready(service.get_company_details(ticker)), tickers)
+    return JsonResponse({"results": results}, status=200)
+
+@csrf_exempt
+@require_POST
+def batch_dividends_view(request):
+    """
+    View para obter os proventos de vários tickers de uma vez.
+    O campo opcional "series" escolhe entre "yearly" e "monthly" (padrão: ambos).
+    Exemplo: POST /batch/dividends {"tickers": ["PETR4", "VALE3"], "series": ["yearly"]}
+    """
+    try:
+        payload, tickers = _parse_batch_request(request)
+        series = payload.get('series', ['yearly', 'monthly'])
+        if not isinstance(series, list) or not series or not set(series) <= {'yearly', 'monthly'}:
+            raise ValueError("'series' deve conter 'yearly' e/ou 'monthly'.")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    def fetch(ticker):
+        data = {}
+        if 'yearly' in series:
+            data['yearly'] = serialize(service.get_yearly_dividends(ticker))
+        if 'monthly' in series:
+            data['monthly'] = serialize(service.get_monthly_dividends(ticker))
+        return data
+
+    results = run_batch(fetch, tickers)
+    return JsonResponse({"results": results}, status=200)
+
+
+@csrf_exempt
+@require_POST
+def portfolio_income_view(request):
+    """
+    View que calcula a renda de proventos de uma carteira: por posição e no total, nas
+    janelas de meses pedidas e projetada (próximos 12 meses e proventos já anunciados),
+    ajustada por "Por quantas ações". As séries vêm do banco em lote; as que faltarem
+    são buscadas em paralelo dentro do orçamento de tempo ("budget", em segundos).
+    Exemplo: POST /portfolio/income {"positions": [{"ticker": "PETR4", "quantity": 100}], "months": [12, 60]}
+    """
+    started = time.perf_counter()
+    try:
+        payload = parse_portfolio(json.loads(request.body or b'{}'))
+    except json.JSONDecodeError as e:
+        return JsonResponse({"error": f"JSON inválido: {e}"}, status=400)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        result = project_income(service, **payload)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+    result["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 3)
+    return JsonResponse(result, status=200)
+
+
+def _parse_windows(request, name, default):
+    """
+    Lê uma lista de janelas inteiras e positivas de um parâmetro como ?years=1,5,10.
+    Levanta ValueError se algum valor for inválido.
+    """
+    raw = request.GET.get(name)
+    if not raw:
+        return list(default)
+    try:
+        windows = [int(value) for value in raw.split(',') if value.strip()]
+    except ValueError as e:
+        raise ValueError(f"Parâmetro '{name}' deve ser uma lista de inteiros separados por vírgula.") from e
+    if not windows or any(window <= 0 for window in windows):
+        raise ValueError(f"Parâmetro '{name}' deve conter apenas inteiros positivos.")
+    return windows
+
+def get_summary_view(request, ticker):
+    """
+    View que monta a página inteira de um ticker em uma única requisição: detalhes,
+    proventos anuais e mensais e os acumulados para cada janela pedida.
+    detalhes.php e proventos.php são buscados em paralelo e parseados uma vez cada.
+    Exemplo: /summary/PETR4/?years=1,5,10&months=12,60
+    """
+    windows = getattr(settings, 'SUMMARY_WINDOWS', {})
+    try:
+        years_windows = _parse_windows(request, 'years', windows.get('YEARS', [1, 5, 10]))
+        months_windows = _parse_windows(request, 'months', windows.get('MONTHS', [12, 60]))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    def fetch_dividends(ticker):
+        # A segunda chamada é servida pelo cache da página de proventos.
+        return service.get_yearly_dividends(ticker), service.get_monthly_dividends(ticker)
+
+    details_future = submit(service.get_company_details, ticker)
+    dividends_future = submit(fetch_dividends, ticker)
+    try:
+        details = details_future.result()
+        yearly_data, monthly_data = dividends_future.result()
+        yearly_sums = calculator.calculate_accumulated_yearly_many(yearly_data, years_windows)
+        monthly_sums = calculator.calculate_accumulated_monthly_many(monthly_data, months_windows)
+        accumulated = {
+            "yearly": {str(years): round(total, 2) for years, total in yearly_sums.items()},
+            "monthly": {str(months): round(total, 2) for months, total in monthly_sums.items()},
+        }
+    except Exception as e:
+        entry = error_entry(e)
+        return JsonResponse({"error": entry["error"]}, status=entry["status"])
+
+    return JsonResponse({
+        "ticker": ticker,
+        "details": json_ready(details),
+        "yearly_dividends": serialize(yearly_data),
+        "monthly_dividends": serialize(monthly_data),
+        "accumulated": accumulated,
+    }, status=200)
+
+def get_rankings_view(request):
+    """
+    View que ranqueia todos os tickers salvos por dividend yield dos últimos 12 meses,
+    com soma e consistência de proventos em N anos e percentis.
+    Exemplo: /rankings/?years=5&limit=50
+    """
+    try:
+        years = int(request.GET.get('years', 5))
+        limit = int(request.GET.get('limit', 100))
+        if years <= 0 or limit <= 0:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({"error": "Parâmetros 'years' e 'limit' devem ser inteiros positivos."}, status=400)
+    try:
+        ranking = get_ranking_engine().rank(years)
+        return JsonResponse({"years": years, "count": len(ranking), "data": ranking[:limit]}, status=200)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+def screener_view(request):
+    """
+    View que filtra, ordena e pagina todas as empresas salvas pelo snapshot normalizado
+    mais recente, sem fazer scraping. Filtros no formato <indicador>__<op>=<valor>
+    (gt, gte, lt, lte, eq, ne); percentuais aceitam '6%' ou 0.06. A próxima página é
+    pedida com ?cursor=<next>. Com ?debug=1, inclui o plano de execução e os tempos.
+    Exemplo: /screener/?div_yield__gt=6%&pl__lt=10&roe__gt=15%&order=-div_yield
+    """
+    started = time.perf_counter()
+    try:
+        index, rebuilt = get_screener_index()
+        indexed_at = time.perf_counter()
+        query = index.parse_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        rows, next_cursor, total, plan = index.query(**query)
+        fields = request.GET.get('fields')
+        if fields:
+            rows = [{"ticker": row["ticker"], **_project_fields(row, fields)} for row in rows]
+        rows = [json_ready(row) for row in rows]
+        payload = {"count": total, "next": next_cursor, "data": rows}
+        if _query_flag(request, 'debug'):
+            plan["index"] = {
+                "version": index.version, "rebuilt": rebuilt, "built_at": http_date(index.built_at),
+                "build_ms": round((indexed_at - started) * 1000, 3),
+            }
+            plan["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 3)
+            payload["debug"] = plan
+        return JsonResponse(payload, status=200)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+def dividend_changes_view(request):
+    """
+    Feed de proventos inseridos ou corrigidos desde a sequência `since`, de todo o
+    mercado ou dos `tickers` pedidos, sem fazer scraping. Repasse o `next` da resposta
+    em `since` para continuar de onde parou.
+    Exemplo: /dividends/changes?since=1200&tickers=PETR4,VALE3
+    """
+    try:
+        filters = parse_change_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        return JsonResponse(list_changes(**filters), status=200)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+def export_view(request, dataset):
+    """
+    View para exportar em streaming o histórico salvo de proventos ou de snapshots.
+    Filtros: tickers, start, end (AAAA-MM-DD), type (só proventos) e after (id da última linha recebida).
+    Exemplo: /export/dividends/?format=csv&tickers=PETR4,VALE3&start=2020-01-01
+    """
+    fmt = request.GET.get('format', 'ndjson')
+    if dataset not in DATASETS:
+        return JsonResponse({"error": f"Conjunto inválido: escolha entre {', '.join(DATASETS)}."}, status=404)
+    if fmt not in FORMATS:
+        return JsonResponse({"error": f"Formato inválido: escolha entre {', '.join(FORMATS)}."}, status=400)
+    try:
+        filters = parse_export_filters(request.GET, dataset)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    response = StreamingHttpResponse(stream_export(dataset, fmt, filters), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+def metrics_view(request):
+    """
+    Exporta as métricas do scraper no formato de texto do Prometheus.
+    Retorna 404 se a instrumentação estiver desligada (SCRAPER_METRICS['ENABLED']).
+    Exemplo: /metrics
+    """
+    if not metrics_enabled():
+        return JsonResponse({"error": "Métricas desativadas."}, status=404)
+    return HttpResponse(render_metrics(scraper.cache_stats(), upstream_states()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def upstream_status_view(request):
+    """
+    Estado do circuit breaker, do limite de taxa compartilhado e da concorrência
+    adaptativa de cada site de origem, e latências/hedges de cada fonte, neste processo.
+    Exemplo: /upstream/
+    """
+    return JsonResponse({"upstreams": upstream_states(), "sources": sources.stats()}, status=200)
+
+# --- Views assíncronas (ASGI) ---
+
+async def async_get_details_view(request, ticker):
+    """
+    Versão assíncrona de get_details_view (mesmos ?fields=, ?raw=1 e ETag).
+    Exemplo: /async/details/PETR4
+    """
+    try:
+        details = await async_service.get_company_details(ticker, raw=_query_flag(request, 'raw'))
+        details = json_ready(_project_fields(details, request.GET.get('fields')))
+        return _conditional_json(request, details, await async_service.fetched_at(ticker, 'details'))
+    except TickerNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except TableNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
+    except ScrapingError as e:
+        return JsonResponse({"error": f"Erro inesperado no scraping: {e}"}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+async def async_get_yearly_dividends_view(request, ticker):
+    """
+    Versão assíncrona de get_yearly_dividends_view.
+    Exemplo: /async/yearly_dividends/PETR4
+    """
+    try:
+        yearly_data = await async_service.get_yearly_dividends(ticker)
+        payload = {"ticker": ticker, "data": serialize(yearly_data)}
+        return _conditional_json(request, payload, await async_service.fetched_at(ticker, 'yearly'))
+    except TickerNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except TableNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except ColumnNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
+    except ScrapingError as e:
+        return JsonResponse({"error": f"Erro inesperado no scraping: {e}"}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+async def async_get_monthly_dividends_view(request, ticker):
+    """
+    Versão assíncrona de get_monthly_dividends_view.
+    Exemplo: /async/monthly_dividends/PETR4
+    """
+    try:
+        monthly_data = await async_service.get_monthly_dividends(ticker)
+        payload = {"ticker": ticker, "data": serialize(monthly_data)}
+        return _conditional_json(request, payload, await async_service.fetched_at(ticker, 'monthly'))
+    except TickerNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except TableNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except ColumnNotFoundError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
+    except ScrapingError as e:
+        return JsonResponse({"error": f"Erro inesperado no scraping: {e}"}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+async def async_get_accumulated_yearly_dividends_view(request, ticker, years):
+    """
+    Versão assíncrona de get_accumulated_yearly_dividends_view.
+    Exemplo: /async/accumulated_yearly_dividends/PETR4/5
+    """
+    try:
+        series = await async_service.get_yearly_series(ticker)
+        accumulated_dividends = calculator.calculate_accumulated_yearly(series, years)
+        payload = {"ticker": ticker, "years": years, "accumulated_dividends": round(accumulated_dividends, 2)}
+        return _conditional_json(request, payload, await async_service.fetched_at(ticker, 'yearly'))
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
+    except ScrapingError as e:
+        status_code = 404 if isinstance(e, (TickerNotFoundError, TableNotFoundError)) else 500
+        return JsonResponse({"error": str(e)}, status=status_code)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
+
+async def async_get_accumulated_monthly_dividends_view(request, ticker, months):
+    """
+    Versão assíncrona de get_accumulated_monthly_dividends_view.
+    Exemplo: /async/accumulated_monthly_dividends/ITUB4/60
+    """
+    try:
+        series = await async_service.get_monthly_series(ticker)
+        accumulated_dividends = calculator.calculate_accumulated_monthly(series, months)
+        payload = {"ticker": ticker, "months": months, "accumulated_dividends": round(accumulated_dividends, 2)}
+        return _conditional_json(request, payload, await async_service.fetched_at(ticker, 'monthly'))
+    except (UpstreamUnavailableError, RateLimitedError) as e:
+        return _unavailable_response(e)
+    except ScrapingError as e:
+        status_code = 404 if isinstance(e, (TickerNotFoundError, TableNotFoundError)) else 500
+        return JsonResponse({"error": str(e)}, status=status_code)
+    except Exception as e:
+        return JsonResponse({"error": f"Ocorreu um erro interno: {e}"}, status=500)
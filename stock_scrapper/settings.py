@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
+import tempfile
 import environ
 from pathlib import Path
 
@@ -34,6 +36,10 @@ DEBUG = env('DEBUG')
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=['127.0.0.1', 'localhost'])
 
+# Execução da suíte de testes (manage.py test, pytest ou DJANGO_TESTING=1): desliga o
+# que compartilharia estado com o ambiente de desenvolvimento (ex: o cache em disco).
+TESTING = env.bool('DJANGO_TESTING', default='test' in sys.argv[1:2] or 'pytest' in sys.modules)
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -49,7 +55,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Cabeçalho Server-Timing por etapa; inativo se SCRAPER_METRICS['ENABLED'] for falso.
+    'scrapper_app.metrics.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Comprime as respostas JSON (gzip) quando o cliente aceita; brotli fica a cargo do proxy reverso.
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -131,4 +141,139 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:4200", # The default Angular development server
     # Adicione outros domínios permitidos aqui
     # "https://your-domain-angular.com",
-]
\ No newline at end of file
+]
+
+# Transporte HTTP compartilhado pelos scrapers (ver scrapper_app/transport.py)
+SCRAPER_TRANSPORT = {
+    'POOL_CONNECTIONS': env.int('SCRAPER_POOL_CONNECTIONS', default=10),
+    'POOL_MAXSIZE': env.int('SCRAPER_POOL_MAXSIZE', default=20),
+    'CONNECT_TIMEOUT': env.float('SCRAPER_CONNECT_TIMEOUT', default=3.05),
+    'READ_TIMEOUT': env.float('SCRAPER_READ_TIMEOUT', default=10.0),
+    'MAX_RETRIES': env.int('SCRAPER_MAX_RETRIES', default=3),
+    'BACKOFF_FACTOR': env.float('SCRAPER_BACKOFF_FACTOR', default=0.5),
+    'BACKOFF_JITTER': env.float('SCRAPER_BACKOFF_JITTER', default=0.3),
+    'BACKOFF_MAX': env.float('SCRAPER_BACKOFF_MAX', default=10.0),
+}
+
+# Cache das tabelas de proventos já extraídas (ver scrapper_app/cache.py)
+SCRAPER_CACHE = {
+    'MAXSIZE': env.int('SCRAPER_CACHE_MAXSIZE', default=512),
+    'TTL': env.int('SCRAPER_CACHE_TTL', default=900),
+    # Por quanto tempo ETag/Last-Modified/hash de cada página são guardados para revalidação.
+    'VALIDATORS_TTL': env.int('SCRAPER_CACHE_VALIDATORS_TTL', default=24 * 60 * 60),
+    # Segundo nível em disco, compartilhado pelos workers da máquina (vazio desativa).
+    'DISK_PATH': env('SCRAPER_CACHE_DISK_PATH', default=os.path.join(BASE_DIR, '.scraper_cache.sqlite3')),
+    'DISK_MAX_BYTES': env.int('SCRAPER_CACHE_DISK_MAX_BYTES', default=256 * 1024 * 1024),
+    # Entradas do disco pré-carregadas na memória ao iniciar.
+    'WARM_ENTRIES': env.int('SCRAPER_CACHE_WARM_ENTRIES', default=256),
+    # 'live', 'record' (grava as páginas baixadas) ou 'replay' (responde só com as gravadas).
+    'MODE': env('SCRAPER_CACHE_MODE', default='live'),
+}
+# Os testes não compartilham o cache em disco do ambiente de desenvolvimento.
+if TESTING:
+    SCRAPER_CACHE['DISK_PATH'] = ''
+
+# Idade máxima (em segundos) dos dados salvos antes de um novo scraping
+STOCK_DATA_MAX_AGE = {
+    'DETAILS': env.int('STOCK_DATA_DETAILS_MAX_AGE', default=15 * 60),
+    'DIVIDENDS': env.int('STOCK_DATA_DIVIDENDS_MAX_AGE', default=24 * 60 * 60),
+}
+
+# Endpoints em lote (ver scrapper_app/batch.py)
+SCRAPER_BATCH = {
+    'MAX_WORKERS': env.int('SCRAPER_BATCH_MAX_WORKERS', default=8),
+    'MAX_TICKERS': env.int('SCRAPER_BATCH_MAX_TICKERS', default=300),
+    'DEADLINE': env.float('SCRAPER_BATCH_DEADLINE', default=30.0),
+}
+
+# Projeção de renda de carteiras (POST /api/portfolio/income, ver scrapper_app/portfolio.py)
+SCRAPER_PORTFOLIO = {
+    'MAX_POSITIONS': env.int('SCRAPER_PORTFOLIO_MAX_POSITIONS', default=100),
+    'MONTHS': env.list('SCRAPER_PORTFOLIO_MONTHS', cast=int, default=[1, 3, 6, 12, 24, 60]),
+    'BUDGET': env.float('SCRAPER_PORTFOLIO_BUDGET', default=5.0),
+}
+
+# Parser do BeautifulSoup: 'auto' (lxml se instalado), 'lxml' ou 'html.parser'
+SCRAPER_HTML_PARSER = env('SCRAPER_HTML_PARSER', default='auto')
+
+# Janelas de acumulado padrão do endpoint /api/summary/<ticker>/
+SUMMARY_WINDOWS = {
+    'YEARS': env.list('SUMMARY_YEARS', cast=int, default=[1, 5, 10]),
+    'MONTHS': env.list('SUMMARY_MONTHS', cast=int, default=[12, 60]),
+}
+
+# Crawler do universo de tickers (manage.py crawl_fundamentus)
+SCRAPER_CRAWLER = {
+    'CONCURRENCY': env.int('SCRAPER_CRAWLER_CONCURRENCY', default=4),
+    'REQUESTS_PER_SECOND': env.float('SCRAPER_CRAWLER_RPS', default=2.0),
+    'CHECKPOINT_PATH': env('SCRAPER_CRAWLER_CHECKPOINT', default=os.path.join(BASE_DIR, '.crawl_checkpoint.json')),
+    'PROGRESS_INTERVAL': env.float('SCRAPER_CRAWLER_PROGRESS_INTERVAL', default=5.0),
+    'CHECKPOINT_EVERY': env.int('SCRAPER_CRAWLER_CHECKPOINT_EVERY', default=50),
+    'CHECKPOINT_INTERVAL': env.float('SCRAPER_CRAWLER_CHECKPOINT_INTERVAL', default=5.0),
+}
+
+# Parsing do HTML do crawler em processos separados (ver scrapper_app/parsing.py)
+SCRAPER_PARSING = {
+    'WORKERS': env.int('SCRAPER_PARSE_WORKERS', default=min(4, os.cpu_count() or 1)),
+    'QUEUE_SIZE': env.int('SCRAPER_PARSE_QUEUE_SIZE', default=None),
+}
+
+# Atualização em segundo plano e pré-aquecimento (ver scrapper_app/scheduler.py).
+# O pré-aquecimento de HOT_TICKERS roda só em um processo dedicado: manage.py prewarm.
+SCRAPER_SCHEDULER = {
+    'WORKERS': env.int('SCRAPER_SCHEDULER_WORKERS', default=2),
+    'STALE_MAX_AGE': {
+        'DETAILS': env.int('SCRAPER_STALE_DETAILS_MAX_AGE', default=60 * 60),
+        'DIVIDENDS': env.int('SCRAPER_STALE_DIVIDENDS_MAX_AGE', default=7 * 24 * 60 * 60),
+    },
+    'TIMEZONE': 'America/Sao_Paulo',
+    'HOT_TICKERS': env.list('SCRAPER_HOT_TICKERS', default=[]),
+    'JOBS': [
+        {'kind': 'details', 'every': 15 * 60, 'hours': (10, 18), 'weekdays': (0, 4)},
+        {'kind': 'dividends', 'at': '02:00'},
+    ],
+    'TICK': 30,
+}
+
+# Instrumentação por etapa: cabeçalho Server-Timing e endpoint /metrics (Prometheus)
+SCRAPER_METRICS = {
+    'ENABLED': env.bool('SCRAPER_METRICS_ENABLED', default=False),
+}
+
+# Proteção do site de origem: rate limit compartilhado entre processos, concorrência
+# adaptativa (AIMD) e circuit breaker (ver scrapper_app/throttle.py)
+SCRAPER_THROTTLE = {
+    'ENABLED': env.bool('SCRAPER_THROTTLE_ENABLED', default=True),
+    'RATE': env.float('SCRAPER_THROTTLE_RATE', default=5.0),
+    'BURST': env.int('SCRAPER_THROTTLE_BURST', default=10),
+    'STATE_PATH': env('SCRAPER_THROTTLE_STATE_PATH', default=os.path.join(tempfile.gettempdir(), 'stock_scrapper_throttle.sqlite3')),
+    'ACQUIRE_TIMEOUT': env.float('SCRAPER_THROTTLE_ACQUIRE_TIMEOUT', default=10.0),
+    'MIN_CONCURRENCY': env.int('SCRAPER_THROTTLE_MIN_CONCURRENCY', default=1),
+    'MAX_CONCURRENCY': env.int('SCRAPER_THROTTLE_MAX_CONCURRENCY', default=16),
+    'INITIAL_CONCURRENCY': env.int('SCRAPER_THROTTLE_INITIAL_CONCURRENCY', default=4),
+    'LATENCY_FACTOR': env.float('SCRAPER_THROTTLE_LATENCY_FACTOR', default=3.0),
+    'BREAKER_FAILURES': env.int('SCRAPER_BREAKER_FAILURES', default=5),
+    'BREAKER_RESET': env.float('SCRAPER_BREAKER_RESET', default=30.0),
+}
+
+# Fontes de dados por prioridade (menor primeiro) e hedging (ver scrapper_app/sources.py).
+# Se a fonte principal não responder dentro do p95 da sua latência, a próxima é disparada.
+SCRAPER_SOURCES = {
+    'SOURCES': [
+        {'NAME': 'fundamentus', 'CLASS': 'scrapper_app.scrapper.FundamentusScraper', 'PRIORITY': 0},
+    ],
+    'HEDGE': env.bool('SCRAPER_HEDGE', default=True),
+    'HEDGE_PERCENTILE': env.float('SCRAPER_HEDGE_PERCENTILE', default=95),
+    'HEDGE_DEFAULT_DELAY': env.float('SCRAPER_HEDGE_DEFAULT_DELAY', default=1.0),
+    'HEDGE_MIN_DELAY': env.float('SCRAPER_HEDGE_MIN_DELAY', default=0.05),
+    'HEDGE_MIN_SAMPLES': env.int('SCRAPER_HEDGE_MIN_SAMPLES', default=20),
+    'WORKERS': env.int('SCRAPER_SOURCES_WORKERS', default=8),
+}
+# Fonte local opcional, lida de arquivos <TICKER>.expected.json (ex: scrapper_app/testdata).
+if env('SCRAPER_LOCAL_SOURCE_DIR', default=''):
+    SCRAPER_SOURCES['SOURCES'].append({
+        'NAME': 'local',
+        'CLASS': 'scrapper_app.sources.LocalFixtureScraper',
+        'PRIORITY': 10,
+        'OPTIONS': {'directory': env('SCRAPER_LOCAL_SOURCE_DIR')},
+    })
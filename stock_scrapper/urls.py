@@ -16,9 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include 
+from scrapper_app.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('scrapper_app.urls')), # Inclui as URLs do seu app sob o prefixo /api/
+    path('metrics', metrics_view, name='metrics'),
 
 ]
@@ -99,4 +99,24 @@ export class StockData {
       }
     });
   }
+
+  fetchSummary(): void {
+    this.loading = true;
+    this.error = null;
+    this.stockDataService.getSummary(this.ticker, [this.years], [this.months]).subscribe({
+      next: (data) => {
+        // Uma única requisição traz detalhes, históricos e acumulados
+        this.companyDetails = data.details;
+        this.yearlyDividends = data.yearly_dividends;
+        this.monthlyDividends = data.monthly_dividends;
+        this.accumulatedYearly = data.accumulated.yearly[this.years];
+        this.accumulatedMonthly = data.accumulated.monthly[this.months];
+        this.loading = false;
+      },
+      error: (err) => {
+        this.error = err.message;
+        this.loading = false;
+      }
+    });
+  }
 }
@@ -40,6 +40,13 @@ export class StockDataService {
     );
   }
 
+  getSummary(ticker: string, years: number[], months: number[]): Observable<any> {
+    const params = { years: years.join(','), months: months.join(',') };
+    return this.http.get(`${this.apiUrl}/summary/${ticker}/`, { params }).pipe(
+      catchError(this.handleError)
+    );
+  }
+
   private handleError(error: any): Observable<never> {
     let errorMessage = 'Ocorreu um erro desconhecido!';
     if (error.error instanceof ErrorEvent) {